@@ -0,0 +1,271 @@
+"""
+LLM analysis providers shared by the processor and the middleware.
+
+Every provider takes a batch of {'id', 'transcript', 'context', 'words'}
+items and returns {id: (concern, mood)}; an empty dict means the provider
+failed. Transcripts are windowed to the provider's prompt token budget.
+HedgedProvider races a secondary provider against a slow primary.
+"""
+
+import os
+import time
+import asyncio
+import logging
+from collections import deque
+
+import aiohttp
+
+from call_analysis import ANALYSIS_SYSTEM_PROMPT, build_batch_prompt, parse_batch_response
+from deadline import DeadlineBudget
+
+logger = logging.getLogger(__name__)
+
+
+class AnalysisProvider:
+    """Base class: request handling, latency tracking and p95 estimate."""
+
+    name = "base"
+    default_token_budget = 1000
+
+    def __init__(self, windower=None):
+        # Defaults to the analyze stage's share of the call deadline budget
+        self.timeout = float(os.getenv('ANALYSIS_TIMEOUT_SECONDS') or DeadlineBudget().stage_seconds('analyze'))
+        self.latencies = deque(maxlen=200)
+        self.windower = windower
+        # Only windowing providers have a prompt budget (the hedged wrapper leaves it to its providers)
+        self.prompt_token_budget = None
+        if windower is not None:
+            self.prompt_token_budget = int(os.getenv(f'{self.name.upper()}_PROMPT_TOKEN_BUDGET',
+                                                     str(self.default_token_budget)))
+
+    @property
+    def configured(self):
+        return False
+
+    async def analyze_batch(self, items, session=None):
+        """Analyze a batch of items, timing successful requests."""
+        if not self.configured or not items:
+            return {}
+
+        items = self.prepare_items(items)
+        started = time.monotonic()
+        try:
+            if session is None:
+                async with aiohttp.ClientSession() as own_session:
+                    results = await self._request(items, own_session)
+            else:
+                results = await self._request(items, session)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.warning(f"Error with {self.name} analysis: {e}")
+            return {}
+
+        if results:
+            self.latencies.append(time.monotonic() - started)
+        return results
+
+    def prepare_items(self, items):
+        """Fit each transcript into this provider's prompt token budget."""
+        if self.windower is None:
+            return items
+        prepared = []
+        for item in items:
+            item = dict(item)
+            item['transcript'] = self.windower.build(item['transcript'], item.get('words'), self.prompt_token_budget)
+            prepared.append(item)
+        return prepared
+
+    async def _request(self, items, session):
+        raise NotImplementedError
+
+    def p95_latency(self, min_samples=20):
+        """95th percentile of recent successful latencies, or None with too few samples."""
+        if len(self.latencies) < min_samples:
+            return None
+        ordered = sorted(self.latencies)
+        return ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))]
+
+
+class OpenAIProvider(AnalysisProvider):
+    """OpenAI chat completions with JSON output."""
+
+    name = "openai"
+    default_token_budget = 1000
+
+    def __init__(self, windower=None):
+        super().__init__(windower)
+        self.api_key = os.getenv('OPENAI_API_KEY')
+        self.model = os.getenv('OPENAI_MODEL', 'gpt-4o-mini')
+
+    @property
+    def configured(self):
+        return bool(self.api_key)
+
+    async def _request(self, items, session):
+        url = "https://api.openai.com/v1/chat/completions"
+
+        headers = {
+            "Authorization": f"Bearer {self.api_key}",
+            "Content-Type": "application/json"
+        }
+
+        payload = {
+            "model": self.model,
+            "messages": [
+                {
+                    "role": "system",
+                    "content": ANALYSIS_SYSTEM_PROMPT
+                },
+                {
+                    "role": "user",
+                    "content": build_batch_prompt(items)
+                }
+            ],
+            "response_format": {"type": "json_object"},
+            "temperature": 0.3,
+            "max_tokens": 150 * len(items)
+        }
+
+        timeout = aiohttp.ClientTimeout(total=self.timeout)
+        async with session.post(url, headers=headers, json=payload, timeout=timeout) as resp:
+            if resp.status == 200:
+                data = await resp.json()
+                return parse_batch_response(data['choices'][0]['message']['content'])
+            else:
+                logger.warning(f"OpenAI API error: {resp.status}")
+                return {}
+
+
+class GeminiProvider(AnalysisProvider):
+    """Google Gemini generateContent with JSON output."""
+
+    name = "gemini"
+    default_token_budget = 2000
+
+    def __init__(self, windower=None):
+        super().__init__(windower)
+        self.api_key = os.getenv('GEMINI_API_KEY')
+        self.model = os.getenv('GEMINI_MODEL', 'gemini-1.5-flash')  # JSON output needs 1.5+
+
+    @property
+    def configured(self):
+        return bool(self.api_key)
+
+    async def _request(self, items, session):
+        url = f"https://generativelanguage.googleapis.com/v1beta/models/{self.model}:generateContent"
+
+        data = {
+            "systemInstruction": {
+                "parts": [{"text": ANALYSIS_SYSTEM_PROMPT}]
+            },
+            "contents": [{
+                "parts": [{"text": build_batch_prompt(items)}]
+            }],
+            "generationConfig": {
+                "temperature": 0.3,
+                "maxOutputTokens": 150 * len(items),
+                "responseMimeType": "application/json"
+            }
+        }
+
+        timeout = aiohttp.ClientTimeout(total=self.timeout)
+        async with session.post(url, params={"key": self.api_key}, json=data, timeout=timeout) as resp:
+            if resp.status == 200:
+                result = await resp.json()
+                content = result.get('candidates', [{}])[0].get('content', {}).get('parts', [{}])[0].get('text', '')
+                return parse_batch_response(content)
+            else:
+                logger.warning(f"Gemini API error: {resp.status} - {await resp.text()}")
+                return {}
+
+
+class HedgedProvider(AnalysisProvider):
+    """
+    Send to the primary provider; if it has not answered within its p95
+    latency (or fails), also send to the secondary and take whichever
+    answers first, cancelling the other.
+    """
+
+    def __init__(self, primary, secondary):
+        self.name = f"{primary.name}+{secondary.name}"
+        super().__init__()
+        self.primary = primary
+        self.secondary = secondary
+        self.default_delay = float(os.getenv('ANALYSIS_HEDGE_DELAY_SECONDS', '3'))
+        self.min_delay = float(os.getenv('ANALYSIS_HEDGE_MIN_DELAY_SECONDS', '0.5'))
+        self.hedges = 0
+        self.hedge_wins = 0
+
+    @property
+    def configured(self):
+        return self.primary.configured or self.secondary.configured
+
+    def hedge_delay(self):
+        """How long to wait for the primary before firing the secondary."""
+        p95 = self.primary.p95_latency()
+        return self.default_delay if p95 is None else max(p95, self.min_delay)
+
+    async def analyze_batch(self, items, session=None):
+        if not self.primary.configured:
+            return await self.secondary.analyze_batch(items, session)
+        if not self.secondary.configured:
+            return await self.primary.analyze_batch(items, session)
+
+        primary_task = asyncio.create_task(self.primary.analyze_batch(items, session))
+        tasks = [primary_task]
+        try:
+            done, _ = await asyncio.wait({primary_task}, timeout=self.hedge_delay())
+            if done and primary_task.result():
+                return primary_task.result()
+
+            # Primary is slow or failed: race the secondary against it
+            self.hedges += 1
+            logger.info(f"Hedging analysis to {self.secondary.name} ({len(items)} calls)")
+            secondary_task = asyncio.create_task(self.secondary.analyze_batch(items, session))
+            tasks.append(secondary_task)
+            pending = {secondary_task} if done else {primary_task, secondary_task}
+
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    results = task.result()
+                    if results:
+                        if task is secondary_task:
+                            self.hedge_wins += 1
+                        return results
+            return {}
+        finally:
+            # Cancel the loser (or both, if we were cancelled ourselves)
+            for task in tasks:
+                if not task.done():
+                    task.cancel()
+
+
+def create_analysis_provider(default_primary='openai', windower=None):
+    """
+    Build the analysis provider from ANALYSIS_PROVIDER / ANALYSIS_SECONDARY_PROVIDER.
+
+    With ANALYSIS_HEDGE_ENABLED=true and both providers configured, returns a
+    HedgedProvider; otherwise the primary alone. The windower (if given) trims
+    transcripts to each provider's <NAME>_PROMPT_TOKEN_BUDGET.
+    """
+    providers = {'openai': OpenAIProvider, 'gemini': GeminiProvider}
+
+    primary_name = os.getenv('ANALYSIS_PROVIDER', default_primary).lower()
+    secondary_name = os.getenv('ANALYSIS_SECONDARY_PROVIDER',
+                               'gemini' if primary_name == 'openai' else 'openai').lower()
+
+    primary = providers.get(primary_name, OpenAIProvider)(windower)
+    if os.getenv('ANALYSIS_HEDGE_ENABLED', 'false').lower() != 'true' or secondary_name == primary_name:
+        return primary
+
+    secondary = providers.get(secondary_name, GeminiProvider)(windower)
+    if not secondary.configured:
+        logger.warning(f"Hedging enabled but {secondary_name} is not configured, using {primary.name} only")
+        return primary
+    if not primary.configured:
+        logger.warning(f"{primary.name} is not configured, using {secondary.name}")
+        return secondary
+
+    return HedgedProvider(primary, secondary)
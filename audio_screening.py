@@ -0,0 +1,131 @@
+"""
+Pre-transcription screening for call recordings.
+
+Classifies recordings that contain no real conversation (dropped calls,
+silence, hold music / IVR prompts) so they can skip Deepgram and the LLM.
+"""
+
+import os
+import shutil
+import subprocess
+import logging
+
+try:
+    import numpy as np
+except ImportError:  # Screening falls back to duration-only checks
+    np = None
+
+logger = logging.getLogger(__name__)
+
+# Verdicts returned by AudioScreener
+CONVERSATION = "conversation"
+DROPPED = "dropped"
+SILENCE = "silence"
+HOLD_MUSIC = "hold_music"
+
+# Ticket text for each no-conversation verdict (matches the Gemini special cases)
+SCREENED_CONCERNS = {
+    DROPPED: "Brief/Dropped call - Insufficient conversation",
+    SILENCE: "Silent call - No conversation recorded",
+    HOLD_MUSIC: "Caller on hold - No conversation recorded",
+}
+
+SAMPLE_RATE = 8000
+FRAME_MS = 30
+
+
+class AudioScreener:
+    """Decide whether a recording is worth transcribing."""
+
+    def __init__(self):
+        self.enabled = os.getenv('SCREENING_ENABLED', 'true').lower() == 'true'
+        self.min_duration = float(os.getenv('SCREENING_MIN_DURATION_SECONDS', '10'))
+        self.min_voiced_seconds = float(os.getenv('SCREENING_MIN_VOICED_SECONDS', '3'))
+        self.min_voiced_ratio = float(os.getenv('SCREENING_MIN_VOICED_RATIO', '0.05'))
+        self.music_max_modulation = float(os.getenv('SCREENING_MUSIC_MAX_MODULATION', '0.35'))
+        # What to do with no-conversation calls: 'ticket' (lightweight ticket) or 'drop'
+        self.action = os.getenv('SCREENING_ACTION', 'ticket').lower()
+        self.ffmpeg = shutil.which('ffmpeg')
+
+        if self.enabled and (np is None or not self.ffmpeg):
+            logger.warning("NumPy or ffmpeg not available, audio screening uses call duration only")
+
+    def screen_duration(self, duration_seconds):
+        """Cheap check using the Exotel Duration before anything is downloaded."""
+        if not self.enabled:
+            return CONVERSATION
+        try:
+            if float(duration_seconds) < self.min_duration:
+                return DROPPED
+        except (TypeError, ValueError):
+            pass
+        return CONVERSATION
+
+    def screen(self, duration_seconds, audio_bytes, timeout=30):
+        """Classify a downloaded recording using duration plus voice activity (ffmpeg gets timeout seconds)."""
+        verdict = self.screen_duration(duration_seconds)
+        if verdict != CONVERSATION or not self.enabled:
+            return verdict
+
+        samples = self.decode_samples(audio_bytes, timeout)
+        if samples is None or len(samples) == 0:
+            return CONVERSATION
+
+        return self.classify_samples(samples)
+
+    def decode_samples(self, audio_bytes, timeout=30):
+        """Decode audio to mono 8 kHz float samples with ffmpeg."""
+        if np is None or not self.ffmpeg or not audio_bytes:
+            return None
+        try:
+            result = subprocess.run(
+                [self.ffmpeg, '-v', 'quiet', '-i', 'pipe:0',
+                 '-f', 's16le', '-ac', '1', '-ar', str(SAMPLE_RATE), 'pipe:1'],
+                input=audio_bytes, capture_output=True, timeout=timeout
+            )
+            if result.returncode != 0:
+                logger.warning(f"ffmpeg could not decode recording (exit {result.returncode})")
+                return None
+            return np.frombuffer(result.stdout, dtype=np.int16).astype(np.float32) / 32768.0
+        except Exception as e:
+            logger.warning(f"Error decoding recording for screening: {e}")
+            return None
+
+    def classify_samples(self, samples):
+        """Energy / voice-activity classification on decoded samples."""
+        frame_len = SAMPLE_RATE * FRAME_MS // 1000
+        n_frames = len(samples) // frame_len
+        if n_frames == 0:
+            return SILENCE
+
+        frames = samples[:n_frames * frame_len].reshape(n_frames, frame_len)
+
+        # Per-frame energy (dB) and zero-crossing rate
+        rms = np.sqrt(np.mean(frames ** 2, axis=1)) + 1e-10
+        energy_db = 20 * np.log10(rms)
+        zcr = np.mean(np.abs(np.diff(np.signbit(frames), axis=1)), axis=1)
+
+        # Adaptive threshold above the noise floor, clamped to [-50, -35] dBFS
+        # so a recording that is loud throughout (music) still counts as active
+        noise_floor = np.percentile(energy_db, 10)
+        threshold = min(max(noise_floor + 12.0, -50.0), -35.0)
+        active = energy_db > threshold
+
+        # Speech-like frames: active with a zero-crossing rate in the voice band
+        voiced = active & (zcr > 0.02) & (zcr < 0.35)
+        voiced_seconds = np.count_nonzero(voiced) * FRAME_MS / 1000
+        voiced_ratio = np.count_nonzero(voiced) / n_frames
+
+        if voiced_seconds < self.min_voiced_seconds or voiced_ratio < self.min_voiced_ratio:
+            return SILENCE
+
+        # Hold music is continuous with a flat loudness envelope; speech has
+        # pauses and syllabic energy modulation.
+        active_ratio = np.count_nonzero(active) / n_frames
+        if active_ratio > 0.9:
+            active_energy = energy_db[active]
+            modulation = np.mean(np.abs(np.diff(active_energy))) / (np.std(active_energy) + 1e-6)
+            if np.std(active_energy) < 4.0 or modulation < self.music_max_modulation:
+                return HOLD_MUSIC
+
+        return CONVERSATION
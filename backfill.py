@@ -0,0 +1,102 @@
+"""
+Historical backfill helpers: date-range windows and a resumable checkpoint.
+"""
+
+import os
+import json
+import argparse
+import logging
+from datetime import datetime, timedelta
+
+logger = logging.getLogger(__name__)
+
+EXOTEL_TIME_FORMAT = '%Y-%m-%d %H:%M:%S'
+
+
+def parse_backfill_time(value, end_of_day=False):
+    """Parse 'YYYY-MM-DD' or 'YYYY-MM-DD HH:MM:SS'; a bare end date covers that whole day."""
+    try:
+        return datetime.strptime(value, EXOTEL_TIME_FORMAT)
+    except ValueError:
+        day = datetime.strptime(value, '%Y-%m-%d')
+        return day + timedelta(days=1) if end_of_day else day
+
+
+def positive_hours(value):
+    """argparse type for --window-hours: a number of hours greater than zero."""
+    hours = float(value)
+    if hours <= 0:
+        raise argparse.ArgumentTypeError(f"must be greater than 0, got {value}")
+    return hours
+
+
+def split_windows(start, end, window_hours):
+    """Split [start, end) into consecutive windows of window_hours."""
+    if window_hours <= 0:
+        raise ValueError(f"window_hours must be positive, got {window_hours}")
+    windows = []
+    step = timedelta(hours=window_hours)
+    current = start
+    while current < end:
+        windows.append((current, min(current + step, end)))
+        current += step
+    return windows
+
+
+def exotel_date_filter(window):
+    """Exotel DateCreated filter for a [start, end) window (Exotel's lte is inclusive)."""
+    start, end = window
+    return f"gte:{start.strftime(EXOTEL_TIME_FORMAT)};lte:{(end - timedelta(seconds=1)).strftime(EXOTEL_TIME_FORMAT)}"
+
+
+class BackfillCheckpoint:
+    """Track completed windows of a backfill run so an interrupted run can resume."""
+
+    def __init__(self, start, end, window_hours, path=None):
+        self.path = path or os.getenv('BACKFILL_CHECKPOINT_FILE', 'backfill_checkpoint.json')
+        self.key = f"{start.strftime(EXOTEL_TIME_FORMAT)}|{end.strftime(EXOTEL_TIME_FORMAT)}|{window_hours}h"
+        self.runs = {}
+        self.load()
+
+    @property
+    def completed(self):
+        return set(self.runs.get(self.key, {}).get('completed_windows', []))
+
+    def load(self):
+        """Load the checkpoint file."""
+        try:
+            if os.path.exists(self.path):
+                with open(self.path, 'r') as f:
+                    self.runs = json.load(f)
+                done = len(self.completed)
+                if done:
+                    logger.info(f"Resuming backfill {self.key}: {done} windows already completed")
+        except Exception as e:
+            logger.error(f"Error loading backfill checkpoint: {e}")
+            self.runs = {}
+
+    def save(self):
+        """Write the checkpoint atomically."""
+        try:
+            tmp_path = f"{self.path}.tmp"
+            with open(tmp_path, 'w') as f:
+                json.dump(self.runs, f, indent=2)
+            os.replace(tmp_path, self.path)
+        except Exception as e:
+            logger.error(f"Error saving backfill checkpoint: {e}")
+
+    def is_done(self, window):
+        return window[0].strftime(EXOTEL_TIME_FORMAT) in self.completed
+
+    def mark_done(self, window, calls_processed):
+        """Record a fully processed window."""
+        run = self.runs.setdefault(self.key, {'completed_windows': [], 'calls_processed': 0})
+        run['completed_windows'].append(window[0].strftime(EXOTEL_TIME_FORMAT))
+        run['calls_processed'] += calls_processed
+        run['updated_at'] = datetime.now().strftime(EXOTEL_TIME_FORMAT)
+        self.save()
+
+    def reset(self):
+        """Forget progress for this range."""
+        self.runs.pop(self.key, None)
+        self.save()
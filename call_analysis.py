@@ -0,0 +1,236 @@
+"""
+Shared call analysis helpers.
+
+Builds the structured-output (JSON) prompt used by both the processor and
+the middleware, parses the model's JSON reply, batches transcripts that
+arrive close together into a single LLM request, and routes calls between
+the local keyword classifier and the LLM.
+"""
+
+import os
+import asyncio
+import itertools
+import json
+import logging
+import threading
+
+logger = logging.getLogger(__name__)
+
+ANALYSIS_SYSTEM_PROMPT = (
+    "You are an AI assistant analyzing customer service calls. "
+    "Always respond with a single JSON object and nothing else."
+)
+
+ANALYSIS_INSTRUCTIONS = """Analyze each customer service call below and provide:
+1. concern: the specific reason for the call - what the customer needs or wants (1-2 sentences)
+2. mood: the caller's emotional tone as a single word (Positive, Neutral, Negative, Urgent, Frustrated, Confused, Anxious, etc.)
+
+Special cases:
+- If only hold messages: concern "Caller on hold - No conversation recorded"
+- If brief/dropped call: concern "Brief/Dropped call - Insufficient conversation"
+
+Respond with JSON of the form:
+{"results": [{"id": "<call id>", "concern": "<concern>", "mood": "<mood>"}]}
+with exactly one entry for every call id.
+
+Calls:
+"""
+
+
+def build_batch_prompt(items):
+    """Build the user prompt for a batch of {'id', 'transcript', 'context'} items."""
+    calls = []
+    for item in items:
+        call = {'id': item['id']}
+        call.update(item.get('context') or {})
+        call['transcript'] = item['transcript']
+        calls.append(call)
+    return ANALYSIS_INSTRUCTIONS + json.dumps(calls, ensure_ascii=False, indent=1)
+
+
+def parse_batch_response(text):
+    """Parse a JSON analysis reply into {id: (concern, mood)}; malformed entries are skipped."""
+    text = (text or '').strip()
+
+    # Some models wrap JSON in a markdown code fence
+    if text.startswith('```'):
+        text = text.strip('`')
+        if text.startswith('json'):
+            text = text[4:]
+
+    try:
+        data = json.loads(text)
+    except ValueError:
+        logger.warning("Analysis response was not valid JSON")
+        return {}
+
+    if isinstance(data, dict):
+        entries = data.get('results', [data] if 'concern' in data else [])
+    else:
+        entries = data if isinstance(data, list) else []
+
+    results = {}
+    for entry in entries:
+        if not isinstance(entry, dict) or 'id' not in entry:
+            continue
+        concern = str(entry.get('concern') or '').strip()
+        mood = str(entry.get('mood') or '').strip()
+        if concern:
+            results[str(entry['id'])] = (concern, mood or "Neutral")
+    return results
+
+
+class BatchAnalysisFailed(Exception):
+    """The whole batch request failed (no call in it was answered)."""
+
+
+class BatchingAnalyzer:
+    """
+    Group analysis requests arriving within a short window into one LLM call.
+
+    analyze_batch is an async callable taking a list of items and returning
+    {id: (concern, mood)}. Callers whose id is missing from a partly answered
+    batch get None back; when the whole batch failed (or was cancelled) they
+    get BatchAnalysisFailed. Either way they handle their own fallback.
+    """
+
+    def __init__(self, analyze_batch, window_seconds=0.5, max_batch_size=10):
+        self.analyze_batch = analyze_batch
+        self.window_seconds = window_seconds
+        self.max_batch_size = max_batch_size
+        self.pending = []
+        self.flush_task = None
+        self.batch_tasks = set()
+        self.ids = itertools.count(1)
+
+    async def analyze(self, transcript, context=None, words=None):
+        """Queue a transcript for the next batch and wait for its result."""
+        future = asyncio.get_running_loop().create_future()
+        item = {'id': str(next(self.ids)), 'transcript': transcript, 'context': context, 'words': words}
+        self.pending.append((item, future))
+
+        if len(self.pending) >= self.max_batch_size:
+            self._flush_now()
+        elif self.flush_task is None:
+            self.flush_task = asyncio.create_task(self._flush_after_window())
+
+        return await future
+
+    async def _flush_after_window(self):
+        await asyncio.sleep(self.window_seconds)
+        self.flush_task = None
+        await self._run_batch(self._take_pending())
+
+    def _flush_now(self):
+        if self.flush_task is not None:
+            self.flush_task.cancel()
+            self.flush_task = None
+        task = asyncio.create_task(self._run_batch(self._take_pending()))
+        self.batch_tasks.add(task)
+        task.add_done_callback(self.batch_tasks.discard)
+
+    def _take_pending(self):
+        batch, self.pending = self.pending, []
+        return batch
+
+    async def _run_batch(self, batch):
+        if not batch:
+            return
+
+        items = [item for item, _ in batch]
+        try:
+            results = await self.analyze_batch(items)
+        except Exception as e:
+            logger.warning(f"Batched analysis of {len(items)} calls failed: {e}")
+            results = {}
+
+        if not results:
+            for _, future in batch:
+                if not future.done():
+                    future.set_exception(BatchAnalysisFailed(f"batch of {len(items)} calls got no results"))
+            return
+
+        missing = 0
+        for item, future in batch:
+            if future.done():
+                continue
+            result = results.get(item['id'])
+            if result is None:
+                missing += 1
+            future.set_result(result)
+
+        logger.info(f"Batched analysis: {len(items) - missing}/{len(items)} calls answered in one request")
+
+    async def close(self):
+        """Cancel queued and in-flight batches; waiting callers get BatchAnalysisFailed."""
+        tasks = list(self.batch_tasks)
+        if self.flush_task is not None:
+            tasks.append(self.flush_task)
+            self.flush_task = None
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+        for _, future in self._take_pending():
+            if not future.done():
+                future.set_exception(BatchAnalysisFailed("analyzer closed"))
+
+
+class AnalysisRouter:
+    """
+    Tiered analysis: answer from the local keyword classifier when it is
+    confident and only send the remaining calls to the LLM.
+
+    Tier counts: 'local' (keyword answer accepted), 'llm' (LLM answered) and
+    'fallback' (LLM unavailable, keyword answer used anyway).
+    """
+
+    TIERS = ('local', 'llm', 'fallback')
+
+    def __init__(self, keyword_analyzer):
+        self.keyword_analyzer = keyword_analyzer
+        self.enabled = os.getenv('ANALYSIS_LOCAL_TIER_ENABLED', 'true').lower() == 'true'
+        self.concern_threshold = float(os.getenv('ANALYSIS_LOCAL_CONFIDENCE_THRESHOLD', '0.6'))
+        self.mood_threshold = float(os.getenv('ANALYSIS_LOCAL_MOOD_CONFIDENCE_THRESHOLD', '0.3'))
+        # A single keyword is too thin to skip the LLM, however heavily it is weighted
+        self.min_hits = int(os.getenv('ANALYSIS_LOCAL_MIN_KEYWORD_HITS', '2'))
+        self.counts = {tier: 0 for tier in self.TIERS}
+        self.lock = threading.Lock()  # The middleware may serve requests from threads
+
+    def classify_locally(self, transcript):
+        """Return (concern, mood) if the keyword classifier is confident, else None."""
+        if not self.enabled:
+            return None
+
+        result = self.keyword_analyzer.analyze(transcript)
+        if (not result['concern'] or result['concern_confidence'] < self.concern_threshold
+                or result['concern_hits'] < self.min_hits):
+            return None
+        # No mood keywords means Neutral; conflicting mood keywords go to the LLM
+        if result['moods'] and result['mood_confidence'] < self.mood_threshold:
+            return None
+
+        self.record('local')
+        return result['concern'], result['mood']
+
+    def record(self, tier):
+        """Count which tier answered a call."""
+        with self.lock:
+            self.counts[tier] += 1
+
+    def stats(self):
+        """Per-tier counts and share of all analyzed calls."""
+        with self.lock:
+            counts = dict(self.counts)
+        total = sum(counts.values())
+        return {
+            'total': total,
+            'counts': counts,
+            'share': {tier: round(count / total, 3) if total else 0.0 for tier, count in counts.items()}
+        }
+
+    def summary(self):
+        """One-line tier summary for logs."""
+        stats = self.stats()
+        parts = [f"{tier}={stats['counts'][tier]} ({stats['share'][tier]:.0%})" for tier in self.TIERS]
+        return f"{stats['total']} calls analyzed: " + ', '.join(parts)
@@ -0,0 +1,229 @@
+"""
+Coordination between processor instances.
+
+Workers lease a call Sid before processing it, keep the lease alive with
+heartbeats while working, and mark it done once the ticket exists. Leases
+of crashed workers expire so another instance can take the call over.
+Sids can also be shard-partitioned by hash across a fixed set of workers.
+Done Sids are kept for CLAIM_DONE_RETENTION_HOURS and then pruned (the
+dedupe window remembers processed calls for longer), so neither store grows
+without bound.
+"""
+
+import os
+import time
+import uuid
+import zlib
+import socket
+import sqlite3
+import logging
+import threading
+
+logger = logging.getLogger(__name__)
+
+
+def default_worker_id():
+    """Unique id for this process: WORKER_ID or host-pid-random."""
+    return os.getenv('WORKER_ID') or f"{socket.gethostname()}-{os.getpid()}-{uuid.uuid4().hex[:6]}"
+
+
+def in_shard(sid, shard_index, shard_count):
+    """Whether a call Sid belongs to this worker's hash shard."""
+    if shard_count <= 1:
+        return True
+    return zlib.crc32(str(sid).encode()) % shard_count == shard_index
+
+
+class ClaimStore:
+    """Interface for call claim backends."""
+
+    def __init__(self, owner, lease_seconds):
+        self.owner = owner
+        self.lease_seconds = lease_seconds
+        self.done_retention_seconds = float(os.getenv('CLAIM_DONE_RETENTION_HOURS', '24')) * 3600
+        self.prune_interval = 300
+        self.last_pruned = 0.0
+
+    def claim(self, sid):
+        """Atomically lease a Sid; False if done or leased by another live worker."""
+        raise NotImplementedError
+
+    def heartbeat(self, sids):
+        """Extend the leases this worker holds."""
+        raise NotImplementedError
+
+    def complete(self, sid):
+        """Mark a Sid done for every worker."""
+        raise NotImplementedError
+
+    def release(self, sid):
+        """Give up a lease without completing (e.g. the call failed)."""
+        raise NotImplementedError
+
+    def is_done(self, sid):
+        raise NotImplementedError
+
+    def maybe_prune(self, now):
+        if now - self.last_pruned >= self.prune_interval:
+            self.last_pruned = now
+            self.prune(now)
+
+    def prune(self, now):
+        """Drop done Sids past the retention and leases abandoned for as long."""
+        raise NotImplementedError
+
+    def close(self):
+        pass
+
+
+class InMemoryClaimStore(ClaimStore):
+    """Single-process stand-in with the same semantics as the shared store."""
+
+    def __init__(self, owner, lease_seconds):
+        super().__init__(owner, lease_seconds)
+        self.claims = {}  # sid -> (owner, status, lease_expires or completed_at)
+        self.lock = threading.Lock()
+
+    def claim(self, sid):
+        now = time.time()
+        with self.lock:
+            current = self.claims.get(sid)
+            if current is not None:
+                owner, status, lease_expires = current
+                if status == 'done' or (owner != self.owner and lease_expires > now):
+                    return False
+            self.claims[sid] = (self.owner, 'claimed', now + self.lease_seconds)
+            return True
+
+    def heartbeat(self, sids):
+        lease_expires = time.time() + self.lease_seconds
+        with self.lock:
+            for sid in sids:
+                current = self.claims.get(sid)
+                if current and current[0] == self.owner and current[1] == 'claimed':
+                    self.claims[sid] = (self.owner, 'claimed', lease_expires)
+
+    def complete(self, sid):
+        now = time.time()
+        with self.lock:
+            # For done entries the third field is when they were completed
+            self.claims[sid] = (self.owner, 'done', now)
+        self.maybe_prune(now)
+
+    def release(self, sid):
+        with self.lock:
+            current = self.claims.get(sid)
+            if current and current[0] == self.owner and current[1] == 'claimed':
+                del self.claims[sid]
+
+    def is_done(self, sid):
+        with self.lock:
+            current = self.claims.get(sid)
+            return bool(current and current[1] == 'done')
+
+    def prune(self, now):
+        cutoff = now - self.done_retention_seconds
+        with self.lock:
+            # Completion time for done Sids, lease expiry for abandoned claims
+            expired = [sid for sid, (_, _, timestamp) in self.claims.items() if timestamp < cutoff]
+            for sid in expired:
+                del self.claims[sid]
+        return len(expired)
+
+
+class SQLiteClaimStore(ClaimStore):
+    """Claim table in a SQLite file on storage shared by all workers."""
+
+    def __init__(self, owner, lease_seconds, path):
+        super().__init__(owner, lease_seconds)
+        self.path = path
+        self.lock = threading.Lock()
+        self.conn = sqlite3.connect(path, timeout=30, isolation_level=None, check_same_thread=False)
+        self.conn.execute("""
+            CREATE TABLE IF NOT EXISTS call_claims (
+                sid TEXT PRIMARY KEY,
+                owner TEXT NOT NULL,
+                status TEXT NOT NULL,
+                lease_expires REAL NOT NULL,
+                updated_at REAL NOT NULL
+            )
+        """)
+
+    def claim(self, sid):
+        now = time.time()
+        with self.lock:
+            # One UPSERT: insert, or take over only if not done and the lease
+            # is ours or has expired. rowcount is 0 when the WHERE rejects it.
+            cursor = self.conn.execute("""
+                INSERT INTO call_claims (sid, owner, status, lease_expires, updated_at)
+                VALUES (?, ?, 'claimed', ?, ?)
+                ON CONFLICT(sid) DO UPDATE SET
+                    owner = excluded.owner,
+                    lease_expires = excluded.lease_expires,
+                    updated_at = excluded.updated_at
+                WHERE call_claims.status != 'done'
+                  AND (call_claims.owner = excluded.owner OR call_claims.lease_expires < ?)
+            """, (sid, self.owner, now + self.lease_seconds, now, now))
+            return cursor.rowcount == 1
+
+    def heartbeat(self, sids):
+        sids = list(sids)
+        if not sids:
+            return
+        now = time.time()
+        with self.lock:
+            self.conn.executemany(
+                "UPDATE call_claims SET lease_expires = ?, updated_at = ? "
+                "WHERE sid = ? AND owner = ? AND status = 'claimed'",
+                [(now + self.lease_seconds, now, sid, self.owner) for sid in sids]
+            )
+
+    def complete(self, sid):
+        now = time.time()
+        with self.lock:
+            self.conn.execute(
+                "INSERT INTO call_claims (sid, owner, status, lease_expires, updated_at) VALUES (?, ?, 'done', 0, ?) "
+                "ON CONFLICT(sid) DO UPDATE SET owner = excluded.owner, status = 'done', updated_at = excluded.updated_at",
+                (sid, self.owner, now)
+            )
+        self.maybe_prune(now)
+
+    def release(self, sid):
+        with self.lock:
+            self.conn.execute("DELETE FROM call_claims WHERE sid = ? AND owner = ? AND status = 'claimed'",
+                              (sid, self.owner))
+
+    def is_done(self, sid):
+        with self.lock:
+            row = self.conn.execute("SELECT status FROM call_claims WHERE sid = ?", (sid,)).fetchone()
+        return bool(row and row[0] == 'done')
+
+    def prune(self, now):
+        cutoff = now - self.done_retention_seconds
+        with self.lock:
+            cursor = self.conn.execute(
+                "DELETE FROM call_claims WHERE (status = 'done' AND updated_at < ?) "
+                "OR (status = 'claimed' AND lease_expires < ?)",
+                (cutoff, cutoff)
+            )
+        if cursor.rowcount:
+            logger.info(f"Pruned {cursor.rowcount} old call claims")
+        return cursor.rowcount
+
+    def close(self):
+        with self.lock:
+            self.conn.close()
+
+
+def create_claim_store(owner=None, path=None):
+    """Build the claim store from CLAIM_STORE ('memory' or 'sqlite') and CLAIM_DB_PATH."""
+    owner = owner or default_worker_id()
+    lease_seconds = float(os.getenv('CLAIM_LEASE_SECONDS', '600'))
+    backend = os.getenv('CLAIM_STORE', 'memory').lower()
+
+    if backend == 'sqlite':
+        path = path or os.getenv('CLAIM_DB_PATH', 'call_claims.db')
+        logger.info(f"Using shared claim store {path} as worker {owner}")
+        return SQLiteClaimStore(owner, lease_seconds, path)
+
+    return InMemoryClaimStore(owner, lease_seconds)
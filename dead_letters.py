@@ -0,0 +1,162 @@
+"""
+Dead-letter store for calls that fail processing.
+
+Each failure records the call, the pipeline stage, the error and the attempt
+count. Failed calls are skipped by normal polling and retried on an
+exponential schedule until DEAD_LETTER_MAX_ATTEMPTS is reached; after that
+(or immediately, for permanent failures) they stay dead until replayed from
+the command line. Entries whose last failure is older than
+DEAD_LETTER_RETENTION_DAYS are pruned.
+"""
+
+import os
+import json
+import time
+import sqlite3
+import logging
+import threading
+
+logger = logging.getLogger(__name__)
+
+RETRYING = 'retrying'
+DEAD = 'dead'
+
+
+class PermanentCallError(RuntimeError):
+    """A failure that retrying cannot fix (e.g. the recording no longer exists)."""
+
+
+class DeadLetterStore:
+    """Failed calls in a SQLite file (shared by all processor instances)."""
+
+    def __init__(self, path=None):
+        self.path = path or os.getenv('DEAD_LETTER_DB_PATH', 'dead_letters.db')
+        self.max_attempts = int(os.getenv('DEAD_LETTER_MAX_ATTEMPTS', '5'))
+        self.retry_base_seconds = float(os.getenv('DEAD_LETTER_RETRY_BASE_SECONDS', '300'))
+        self.retry_max_seconds = float(os.getenv('DEAD_LETTER_RETRY_MAX_SECONDS', '21600'))
+        self.retention_days = float(os.getenv('DEAD_LETTER_RETENTION_DAYS', '30'))
+        self.prune_interval = 3600
+        self.last_pruned = 0.0
+        self.lock = threading.Lock()
+        self.conn = sqlite3.connect(self.path, timeout=30, isolation_level=None, check_same_thread=False)
+        self.conn.row_factory = sqlite3.Row
+        self.conn.execute("""
+            CREATE TABLE IF NOT EXISTS dead_letters (
+                sid TEXT PRIMARY KEY,
+                call TEXT NOT NULL,
+                stage TEXT NOT NULL,
+                error TEXT NOT NULL,
+                attempts INTEGER NOT NULL,
+                status TEXT NOT NULL,
+                first_failed_at REAL NOT NULL,
+                last_failed_at REAL NOT NULL,
+                next_retry_at REAL
+            )
+        """)
+
+    def retry_delay(self, attempts):
+        """Backoff before the next automatic retry after `attempts` failures."""
+        return min(self.retry_max_seconds, self.retry_base_seconds * 2 ** (attempts - 1))
+
+    def record_failure(self, call, stage, error, permanent=False):
+        """Record a failed attempt and schedule the next retry; returns the updated entry."""
+        sid = call.get('Sid')
+        now = time.time()
+        with self.lock:
+            self.conn.execute("BEGIN IMMEDIATE")
+            try:
+                row = self.conn.execute(
+                    "SELECT attempts, first_failed_at FROM dead_letters WHERE sid = ?", (sid,)
+                ).fetchone()
+                attempts = (row['attempts'] if row else 0) + 1
+                first_failed_at = row['first_failed_at'] if row else now
+
+                if permanent or attempts >= self.max_attempts:
+                    status, next_retry_at = DEAD, None
+                else:
+                    status, next_retry_at = RETRYING, now + self.retry_delay(attempts)
+
+                self.conn.execute("""
+                    INSERT OR REPLACE INTO dead_letters
+                        (sid, call, stage, error, attempts, status, first_failed_at, last_failed_at, next_retry_at)
+                    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+                """, (sid, json.dumps(call), stage, str(error), attempts, status,
+                      first_failed_at, now, next_retry_at))
+                self.conn.execute("COMMIT")
+            except Exception:
+                self.conn.execute("ROLLBACK")
+                raise
+
+        self.maybe_prune()
+        if status == DEAD:
+            logger.error(f"Call {sid} moved to dead letters after {attempts} attempts "
+                         f"(stage '{stage}': {error})")
+        else:
+            logger.warning(f"Call {sid} failed at stage '{stage}' (attempt {attempts}/{self.max_attempts}), "
+                           f"retrying in {self.retry_delay(attempts) / 60:.0f}m")
+        return self.get(sid)
+
+    def is_blocked(self, sid):
+        """Whether normal polling should skip the call (dead, or its retry is not due yet)."""
+        with self.lock:
+            row = self.conn.execute(
+                "SELECT status, next_retry_at FROM dead_letters WHERE sid = ?", (sid,)
+            ).fetchone()
+        if row is None:
+            return False
+        return row['status'] == DEAD or row['next_retry_at'] > time.time()
+
+    def due(self, limit=None):
+        """Calls whose scheduled retry is due, oldest first."""
+        with self.lock:
+            rows = self.conn.execute(
+                "SELECT call FROM dead_letters WHERE status = ? AND next_retry_at <= ? "
+                "ORDER BY next_retry_at LIMIT ?",
+                (RETRYING, time.time(), -1 if limit is None else limit)
+            ).fetchall()
+        return [json.loads(row['call']) for row in rows]
+
+    def get(self, sid):
+        with self.lock:
+            row = self.conn.execute("SELECT * FROM dead_letters WHERE sid = ?", (sid,)).fetchone()
+        if row is None:
+            return None
+        entry = dict(row)
+        entry['call'] = json.loads(entry['call'])
+        return entry
+
+    def list(self, status=None, stage=None):
+        """Entries filtered by status and/or stage, most recent failure first."""
+        query, params = "SELECT * FROM dead_letters WHERE 1 = 1", []
+        if status:
+            query += " AND status = ?"
+            params.append(status)
+        if stage:
+            query += " AND stage = ?"
+            params.append(stage)
+        with self.lock:
+            rows = self.conn.execute(query + " ORDER BY last_failed_at DESC", params).fetchall()
+        return [dict(row, call=json.loads(row['call'])) for row in rows]
+
+    def resolve(self, sid):
+        """Remove a call once it has been processed."""
+        with self.lock:
+            self.conn.execute("DELETE FROM dead_letters WHERE sid = ?", (sid,))
+
+    def maybe_prune(self):
+        if time.time() - self.last_pruned >= self.prune_interval:
+            self.prune()
+
+    def prune(self):
+        """Drop entries whose last failure is past the retention age; returns how many."""
+        self.last_pruned = time.time()
+        cutoff = self.last_pruned - self.retention_days * 86400
+        with self.lock:
+            deleted = self.conn.execute("DELETE FROM dead_letters WHERE last_failed_at < ?", (cutoff,)).rowcount
+        if deleted:
+            logger.info(f"Pruned {deleted} dead letters")
+        return deleted
+
+    def close(self):
+        with self.lock:
+            self.conn.close()
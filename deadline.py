@@ -0,0 +1,92 @@
+"""
+End-to-end deadline budgets for processing a call.
+
+Each call gets CALL_DEADLINE_SECONDS in total. Every stage may use its share
+of that budget (CALL_STAGE_SHARES), but never more than what is left of the
+call's overall deadline, so the worst-case time per call is bounded. Shares
+are caps rather than a partition: stages that overlap may add up to more
+than 1.
+"""
+
+import os
+import time
+import asyncio
+import logging
+
+import aiohttp
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_STAGE_SHARES = {
+    'fetch': 0.1,
+    'contact': 0.1,
+    'download': 0.2,
+    'screen': 0.1,
+    'transcribe': 0.4,
+    'analyze': 0.2,
+    'ticket': 0.2,
+}
+
+
+class DeadlineExceeded(TimeoutError):
+    """A stage ran out of its share of the call's deadline budget."""
+
+    def __init__(self, stage, seconds):
+        super().__init__(f"deadline exceeded after {seconds:.1f}s")
+        self.stage = stage
+        self.seconds = seconds
+
+
+class DeadlineBudget:
+    """Per-call deadline and per-stage shares, from the environment."""
+
+    def __init__(self):
+        self.total_seconds = float(os.getenv('CALL_DEADLINE_SECONDS', '300'))
+        self.shares = dict(DEFAULT_STAGE_SHARES)
+        # e.g. "transcribe=0.5,analyze=0.15"
+        for pair in os.getenv('CALL_STAGE_SHARES', '').split(','):
+            if '=' in pair:
+                stage, share = pair.split('=', 1)
+                try:
+                    self.shares[stage.strip()] = float(share)
+                except ValueError:
+                    logger.warning(f"Ignoring invalid CALL_STAGE_SHARES entry '{pair}'")
+
+    def stage_seconds(self, stage):
+        """A stage's full share of the budget, in seconds."""
+        return self.total_seconds * self.shares.get(stage, 1.0)
+
+    def start(self):
+        """Start the clock for one call."""
+        return CallDeadline(self)
+
+
+class CallDeadline:
+    """The running deadline of one call."""
+
+    def __init__(self, budget):
+        self.budget = budget
+        self.expires_at = time.monotonic() + budget.total_seconds
+
+    def remaining(self):
+        return max(0.0, self.expires_at - time.monotonic())
+
+    def stage_seconds(self, stage):
+        """Time a stage starting now may take: its share, capped by what is left."""
+        return min(self.remaining(), self.budget.stage_seconds(stage))
+
+    def timeout(self, stage):
+        """aiohttp timeout for requests made by a stage starting now."""
+        return aiohttp.ClientTimeout(total=max(self.stage_seconds(stage), 0.001))
+
+    async def run(self, stage, awaitable):
+        """Await a stage, cancelling it and raising DeadlineExceeded when its time is up."""
+        seconds = self.stage_seconds(stage)
+        if seconds <= 0:
+            if asyncio.iscoroutine(awaitable):
+                awaitable.close()
+            raise DeadlineExceeded(stage, 0.0)
+        try:
+            return await asyncio.wait_for(awaitable, timeout=seconds)
+        except asyncio.TimeoutError:
+            raise DeadlineExceeded(stage, seconds) from None
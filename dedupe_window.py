@@ -0,0 +1,248 @@
+"""
+Bounded-memory record of processed call Sids.
+
+Recently processed Sids are kept exactly. When they age out (or the exact
+set reaches its size cap) they move into a Bloom filter generation; a fixed
+number of generations is kept and the oldest is dropped on rotation, so
+memory never grows past the configured ceiling.
+
+A call created after the oldest exact entry was processed can only have been
+processed within the exact window, so Bloom filters (and their false
+positives) are only consulted for older calls. Exotel DateCreated values are
+read in EXOTEL_TIMEZONE (Asia/Kolkata by default), not the host's zone.
+Sids processed before the oldest kept generation (covered_since) are
+forgotten: the latest page never returns such old calls, but a backfill
+reaching back that far has to be refused or forced (see run_backfill).
+
+The exact part is saved to PROCESSED_CALLS_FILE; the Bloom generations go to
+a separate `.bloom` file that is only rewritten when a generation rotates,
+after enough Sids have moved into it, or on a full save at shutdown. Sids
+moved since the last Bloom write are kept in the exact file until then.
+"""
+
+import os
+import json
+import math
+import time
+import base64
+import hashlib
+import logging
+from datetime import datetime
+from zoneinfo import ZoneInfo
+
+logger = logging.getLogger(__name__)
+
+EXOTEL_TIME_FORMAT = '%Y-%m-%d %H:%M:%S'
+
+# Sids moved into the Bloom filters before their file is rewritten anyway
+BLOOM_FLUSH_SIDS = 1000
+
+
+def bloom_size_bits(capacity, error_rate):
+    """Bits needed for `capacity` keys at the given false-positive rate."""
+    return max(8, int(-capacity * math.log(error_rate) / (math.log(2) ** 2)))
+
+
+class BloomFilter:
+    """Fixed-size Bloom filter over strings."""
+
+    def __init__(self, capacity, error_rate, bits=None, count=0, started=None):
+        self.size = bloom_size_bits(capacity, error_rate)
+        self.hash_count = max(1, round(self.size / capacity * math.log(2)))
+        self.bits = bytearray(bits) if bits is not None else bytearray((self.size + 7) // 8)
+        self.count = count
+        self.started = started if started is not None else time.time()
+
+    def _positions(self, key):
+        digest = hashlib.blake2b(str(key).encode(), digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], 'little')
+        h2 = int.from_bytes(digest[8:], 'little') | 1
+        return ((h1 + i * h2) % self.size for i in range(self.hash_count))
+
+    def add(self, key):
+        for pos in self._positions(key):
+            self.bits[pos >> 3] |= 1 << (pos & 7)
+        self.count += 1
+
+    def __contains__(self, key):
+        return all(self.bits[pos >> 3] & (1 << (pos & 7)) for pos in self._positions(key))
+
+    def to_dict(self):
+        return {'started': self.started, 'count': self.count, 'bits': base64.b64encode(bytes(self.bits)).decode()}
+
+
+class DedupeWindow:
+    """Processed-call set with exact recent Sids and rotating Bloom generations."""
+
+    def __init__(self, path=None, timezone=None):
+        self.path = path or os.getenv('PROCESSED_CALLS_FILE', 'processed_calls.json')
+        self.timezone = ZoneInfo(timezone or os.getenv('EXOTEL_TIMEZONE', 'Asia/Kolkata'))
+        self.bloom_path = f"{self.path}.bloom"
+        self.recent_seconds = float(os.getenv('DEDUPE_RECENT_HOURS', '72')) * 3600
+        self.recent_max = int(os.getenv('DEDUPE_RECENT_MAX_SIDS', '50000'))
+        self.generation_seconds = float(os.getenv('DEDUPE_GENERATION_HOURS', '168')) * 3600
+        self.generation_count = max(1, int(os.getenv('DEDUPE_GENERATIONS', '4')))
+        self.bloom_capacity = int(os.getenv('DEDUPE_BLOOM_CAPACITY', '100000'))
+        self.bloom_error_rate = float(os.getenv('DEDUPE_BLOOM_ERROR_RATE', '0.001'))
+
+        self.recent = {}  # sid -> processed timestamp, oldest first
+        self.generations = []  # oldest first
+        # Every Sid processed at or after this time is in self.recent
+        self.exact_since = 0.0
+        # Every Sid processed at or after this time is remembered (0: nothing dropped yet)
+        self.covered_since = 0.0
+        self.unsaved_bloom_sids = []  # Moved into a generation since the Bloom file was written
+        self.generations_rotated = False
+        self.load()
+
+    def __len__(self):
+        return len(self.recent) + sum(generation.count for generation in self.generations)
+
+    def memory_ceiling_bytes(self):
+        """Upper bound on memory used (exact Sids estimated at ~150 bytes each)."""
+        bloom_bytes = (bloom_size_bits(self.bloom_capacity, self.bloom_error_rate) + 7) // 8
+        return self.recent_max * 150 + self.generation_count * bloom_bytes
+
+    def _new_generation(self, started=None):
+        return BloomFilter(self.bloom_capacity, self.bloom_error_rate, started=started)
+
+    def lookup(self, sid, created=None):
+        """'exact', 'bloom' (probably processed) or None; created is the Exotel DateCreated, if known."""
+        if sid in self.recent:
+            return 'exact'
+
+        created_at = self.parse_created(created)
+        if created_at is not None and created_at >= self.exact_since:
+            return None
+        if any(sid in generation for generation in self.generations):
+            return 'bloom'
+        return None
+
+    def contains(self, sid, created=None):
+        """Whether a call was processed; created is its Exotel DateCreated, if known."""
+        return self.lookup(sid, created) is not None
+
+    __contains__ = contains
+
+    def parse_created(self, created):
+        """Epoch seconds of an Exotel 'YYYY-MM-DD HH:MM:SS' (EXOTEL_TIMEZONE) or a datetime."""
+        if created is None or isinstance(created, (int, float)):
+            return created
+        if isinstance(created, datetime):
+            return created.replace(tzinfo=created.tzinfo or self.timezone).timestamp()
+        try:
+            return datetime.strptime(created, EXOTEL_TIME_FORMAT).replace(tzinfo=self.timezone).timestamp()
+        except (TypeError, ValueError):
+            return None
+
+    def add(self, sid, now=None):
+        """Record a processed Sid."""
+        now = now or time.time()
+        self.recent.pop(sid, None)
+        self.recent[sid] = now
+        self._expire(now)
+
+    def _expire(self, now):
+        """Move aged-out exact Sids into the current Bloom generation."""
+        cutoff = now - self.recent_seconds
+        while self.recent:
+            sid, processed_at = next(iter(self.recent.items()))
+            if processed_at >= cutoff and len(self.recent) <= self.recent_max:
+                break
+            del self.recent[sid]
+            self._current_generation(now).add(sid)
+            self.unsaved_bloom_sids.append(sid)
+            self.exact_since = max(self.exact_since, processed_at)
+
+    def _current_generation(self, now):
+        current = self.generations[-1] if self.generations else None
+        if (current is None or current.count >= self.bloom_capacity
+                or now - current.started >= self.generation_seconds):
+            current = self._new_generation(started=now)
+            self.generations.append(current)
+            self.generations_rotated = True
+            if len(self.generations) > self.generation_count:
+                dropped = self.generations.pop(0)
+                self.covered_since = self.generations[0].started
+                logger.info(f"Dropped dedupe generation with {dropped.count} Sids "
+                            f"from {datetime.fromtimestamp(dropped.started):%Y-%m-%d}")
+        return current
+
+    def load(self):
+        """Load the window; a legacy list of Sids is migrated into a Bloom generation."""
+        try:
+            if not os.path.exists(self.path):
+                return
+            with open(self.path, 'r') as f:
+                data = json.load(f)
+
+            now = time.time()
+            if isinstance(data, list):
+                for sid in data:
+                    self._current_generation(now).add(sid)
+                self.exact_since = now
+                self.generations_rotated = True
+                logger.info(f"Migrated {len(data)} processed calls into the dedupe window")
+            else:
+                # Version 2 kept the generations in the same file
+                generations = data.get('generations')
+                if generations is None and os.path.exists(self.bloom_path):
+                    with open(self.bloom_path, 'r') as f:
+                        generations = json.load(f).get('generations')
+                self.exact_since = data.get('exact_since', 0.0)
+                self.covered_since = data.get('covered_since', 0.0)
+                self.recent = dict(sorted(data.get('recent', {}).items(), key=lambda item: item[1]))
+                self.generations = [
+                    self._load_generation(generation) for generation in generations or []
+                ][-self.generation_count:]
+                if 'covered_since' not in data and len(self.generations) == self.generation_count:
+                    self.covered_since = self.generations[0].started  # Version 2: may have dropped some
+                self.generations_rotated = data.get('version', 2) < 3
+                for sid in data.get('unsaved_bloom_sids', []):
+                    self._current_generation(now).add(sid)
+                    self.unsaved_bloom_sids.append(sid)
+                self._expire(now)
+            logger.info(f"Loaded {len(self)} previously processed calls "
+                        f"({len(self.recent)} exact, {len(self.generations)} Bloom generations)")
+        except Exception as e:
+            logger.error(f"Error loading processed calls: {e}")
+            self.recent, self.generations, self.exact_since = {}, [], 0.0
+            self.covered_since = 0.0
+            self.unsaved_bloom_sids = []
+
+    def _load_generation(self, data):
+        bits = base64.b64decode(data['bits'])
+        generation = self._new_generation(started=data['started'])
+        if len(bits) != len(generation.bits):
+            raise ValueError("Bloom filter size changed; adjust DEDUPE_BLOOM_* back or remove the file")
+        generation.bits = bytearray(bits)
+        generation.count = data['count']
+        return generation
+
+    def save(self, full=False):
+        """
+        Write the exact Sids atomically. The Bloom generations are only rewritten
+        when one rotated, BLOOM_FLUSH_SIDS have moved in, or on a full save.
+        """
+        try:
+            if full or self.generations_rotated or len(self.unsaved_bloom_sids) >= BLOOM_FLUSH_SIDS:
+                self._write(self.bloom_path, {
+                    'generations': [generation.to_dict() for generation in self.generations]
+                })
+                self.unsaved_bloom_sids = []
+                self.generations_rotated = False
+            self._write(self.path, {
+                'version': 3,
+                'exact_since': self.exact_since,
+                'covered_since': self.covered_since,
+                'recent': self.recent,
+                'unsaved_bloom_sids': self.unsaved_bloom_sids
+            })
+        except Exception as e:
+            logger.error(f"Error saving processed calls: {e}")
+
+    def _write(self, path, data):
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, 'w') as f:
+            json.dump(data, f)
+        os.replace(tmp_path, path)
@@ -0,0 +1,21 @@
+"""
+Gunicorn settings for the Zapier middleware.
+
+On SIGTERM gunicorn stops accepting connections and gives workers
+SHUTDOWN_DRAIN_SECONDS to finish in-flight /process_call requests before
+killing them; each worker then closes its shared HTTP session. The worker
+timeout is derived from the per-call deadline budget (CALL_DEADLINE_SECONDS).
+"""
+
+import os
+
+from deadline import DeadlineBudget
+
+# A worker is only considered hung once a request has overrun its whole deadline
+timeout = int(DeadlineBudget().total_seconds) + 30
+graceful_timeout = int(float(os.getenv('SHUTDOWN_DRAIN_SECONDS', '60')))
+
+
+def worker_exit(server, worker):
+    import zapier_middleware
+    zapier_middleware.shutdown()
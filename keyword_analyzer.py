@@ -0,0 +1,160 @@
+"""
+Single-pass keyword analyzer for concern and mood.
+
+The taxonomy (keyword_taxonomy.json) is compiled once into one combined
+regular expression. Every category is scored in a single scan of the
+transcript, and the file is reloaded automatically when it changes.
+Phrases match whole words only; inflections are listed explicitly as
+{"phrase": ..., "forms": [...]}.
+"""
+
+import os
+import re
+import json
+import math
+import time
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Used when the taxonomy file is missing (same lists as the original fallback)
+DEFAULT_TAXONOMY = {
+    "settings": {"default_mood": "Neutral", "saturation": 2.0},
+    "moods": {
+        "Urgent": {"weight": 3.0, "phrases": ["urgent", "emergency", "immediately", "asap"]},
+        "Negative": {"weight": 2.0, "phrases": ["angry", "frustrated", "disappointed", "upset"]},
+        "Positive": {"weight": 1.0, "phrases": [{"phrase": "thank", "forms": ["thanks", "thanked"]},
+                                                "great", "happy", "satisfied", "excellent"]}
+    },
+    "concerns": {
+        "Billing inquiry": {"weight": 1.0, "phrases": [
+            "billing", {"phrase": "payment", "forms": ["payments"]},
+            {"phrase": "charge", "forms": ["charges", "charged"]}, {"phrase": "invoice", "forms": ["invoices"]}]},
+        "Technical support request": {"weight": 1.0, "phrases": [
+            "technical", "not working", {"phrase": "error", "forms": ["errors"]},
+            {"phrase": "problem", "forms": ["problems"]}, {"phrase": "issue", "forms": ["issues"]}]},
+        "Refund/cancellation request": {"weight": 1.0, "phrases": [
+            {"phrase": "refund", "forms": ["refunds"]}, {"phrase": "return", "forms": ["returns"]},
+            {"phrase": "cancel", "forms": ["cancelled", "canceled", "cancellation"]}]},
+        "General inquiry - assistance needed": {"weight": 0.5, "phrases": ["question", "how to", "help with"]}
+    }
+}
+
+
+class KeywordAnalyzer:
+    """Score concerns and moods from a transcript in one linear pass."""
+
+    def __init__(self, taxonomy_file=None):
+        self.taxonomy_file = taxonomy_file or os.getenv('KEYWORD_TAXONOMY_FILE', 'keyword_taxonomy.json')
+        self.reload_interval = float(os.getenv('KEYWORD_TAXONOMY_RELOAD_SECONDS', '5'))
+        self.pattern = None
+        self.phrase_index = {}
+        self.default_mood = "Neutral"
+        self.saturation = 2.0
+        self.loaded_mtime = None
+        self.last_check = 0.0
+        self.reload()
+
+    def reload(self):
+        """Load and compile the taxonomy file, keeping the previous matcher on error."""
+        try:
+            if os.path.exists(self.taxonomy_file):
+                mtime = os.path.getmtime(self.taxonomy_file)
+                with open(self.taxonomy_file, 'r') as f:
+                    taxonomy = json.load(f)
+                self.compile(taxonomy)
+                self.loaded_mtime = mtime
+                logger.info(f"Loaded keyword taxonomy from {self.taxonomy_file} ({len(self.phrase_index)} phrases)")
+            elif self.pattern is None:
+                logger.warning(f"Taxonomy file {self.taxonomy_file} not found, using built-in keywords")
+                self.compile(DEFAULT_TAXONOMY)
+        except Exception as e:
+            logger.error(f"Error loading keyword taxonomy: {e}")
+            if self.pattern is None:
+                self.compile(DEFAULT_TAXONOMY)
+
+    def compile(self, taxonomy):
+        """Compile a taxonomy dict into one combined regex and a phrase lookup."""
+        phrase_index = {}
+        for kind in ('moods', 'concerns'):
+            for label, category in taxonomy.get(kind, {}).items():
+                category_weight = float(category.get('weight', 1.0))
+                for phrase in category.get('phrases', []):
+                    # Phrases are plain strings or {"phrase": ..., "weight": ..., "forms": [...]}
+                    if isinstance(phrase, dict):
+                        phrase_weight = float(phrase.get('weight', 1.0))
+                        forms = [phrase['phrase']] + list(phrase.get('forms', []))
+                    else:
+                        phrase_weight = 1.0
+                        forms = [phrase]
+                    for form in forms:
+                        key = ' '.join(form.lower().split())
+                        if key:
+                            phrase_index.setdefault(key, []).append((kind, label, category_weight * phrase_weight))
+
+        # Longest phrases first so "not working" wins over "not" at the same position.
+        # Both ends are anchored: "charge" does not match "charger"
+        alternatives = sorted(phrase_index, key=len, reverse=True)
+        alternation = '|'.join(r'\s+'.join(re.escape(word) for word in key.split()) for key in alternatives)
+        pattern = re.compile(r'\b(?:' + alternation + r')\b') if alternatives else None
+
+        settings = taxonomy.get('settings', {})
+        self.pattern = pattern
+        self.phrase_index = phrase_index
+        self.default_mood = settings.get('default_mood', 'Neutral')
+        self.saturation = float(settings.get('saturation', 2.0))
+
+    def _maybe_reload(self):
+        """Reload the taxonomy if the file changed (checked at most every reload_interval)."""
+        now = time.monotonic()
+        if now - self.last_check < self.reload_interval:
+            return
+        self.last_check = now
+        try:
+            if os.path.exists(self.taxonomy_file) and os.path.getmtime(self.taxonomy_file) != self.loaded_mtime:
+                self.reload()
+        except OSError:
+            pass
+
+    def _rank(self, scores):
+        """Sort scores and compute a confidence for the top label."""
+        ranked = sorted(scores.items(), key=lambda item: item[1], reverse=True)
+        if not ranked:
+            return ranked, 0.0
+        top = ranked[0][1]
+        total = sum(score for _, score in ranked)
+        # Share of the evidence, scaled down when there is little evidence overall
+        confidence = (top / total) * (1 - math.exp(-top / self.saturation))
+        return ranked, round(confidence, 3)
+
+    def analyze(self, transcript):
+        """
+        Score a transcript against the taxonomy.
+
+        Returns a dict with the top concern/mood (concern is None when nothing
+        matched), their confidences and keyword hit counts, and the full
+        ranked score lists.
+        """
+        self._maybe_reload()
+
+        scores = {'moods': {}, 'concerns': {}}
+        hits = {'moods': {}, 'concerns': {}}
+        if self.pattern is not None and transcript:
+            for match in self.pattern.finditer(transcript.lower()):
+                key = ' '.join(match.group(0).split())
+                for kind, label, weight in self.phrase_index.get(key, []):
+                    scores[kind][label] = scores[kind].get(label, 0.0) + weight
+                    hits[kind][label] = hits[kind].get(label, 0) + 1
+
+        moods, mood_confidence = self._rank(scores['moods'])
+        concerns, concern_confidence = self._rank(scores['concerns'])
+
+        return {
+            'concern': concerns[0][0] if concerns else None,
+            'concern_confidence': concern_confidence,
+            'concern_hits': hits['concerns'].get(concerns[0][0], 0) if concerns else 0,
+            'mood': moods[0][0] if moods else self.default_mood,
+            'mood_confidence': mood_confidence,
+            'concerns': concerns,
+            'moods': moods
+        }
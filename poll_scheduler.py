@@ -0,0 +1,45 @@
+"""
+Adaptive Exotel poll interval for run_continuous.
+
+Polls quickly while calls are flowing (or the last page came back full) and
+backs off exponentially while idle. Sleeps are measured from the start of
+each cycle, so a slow cycle shortens the following wait instead of pushing
+every later poll back.
+"""
+
+import os
+import time
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+class AdaptivePoller:
+    """Compute the delay before the next monitoring cycle."""
+
+    def __init__(self, base_interval=None):
+        self.min_interval = float(os.getenv('POLL_MIN_INTERVAL_SECONDS', '5'))
+        self.max_interval = float(os.getenv('POLL_MAX_INTERVAL_SECONDS', '300'))
+        self.base_interval = float(base_interval or os.getenv('POLL_BASE_INTERVAL_SECONDS', '60'))
+        self.backoff = float(os.getenv('POLL_BACKOFF_FACTOR', '2'))
+        self.interval = self.base_interval
+
+    def update(self, new_calls, page_full):
+        """Adjust the interval from the result of the last cycle and return it."""
+        previous = self.interval
+        if page_full:
+            # More calls are probably waiting beyond the first page
+            self.interval = self.min_interval
+        elif new_calls:
+            self.interval = max(self.min_interval, min(self.interval, self.base_interval) / self.backoff)
+        else:
+            self.interval = min(self.max_interval, max(self.interval, self.min_interval) * self.backoff)
+
+        if self.interval != previous:
+            logger.info(f"Poll interval {previous:.0f}s -> {self.interval:.0f}s "
+                        f"({new_calls} new calls{', page full' if page_full else ''})")
+        return self.interval
+
+    def sleep_seconds(self, cycle_started):
+        """Time left until the next cycle should start (never negative)."""
+        return max(0.0, cycle_started + self.interval - time.monotonic())
@@ -0,0 +1,34 @@
+"""
+Async token-bucket rate limiter.
+"""
+
+import time
+import asyncio
+
+
+class AsyncRateLimiter:
+    """Allow at most `rate` acquisitions per second, with bursts up to `burst`."""
+
+    def __init__(self, rate, burst=None):
+        self.rate = float(rate)
+        self.burst = float(burst if burst is not None else max(1.0, self.rate))
+        self.tokens = self.burst
+        self.updated = time.monotonic()
+        self.lock = None
+
+    async def acquire(self):
+        """Wait until a token is available, then take it (no-op when rate <= 0)."""
+        if self.rate <= 0:
+            return
+        if self.lock is None:
+            self.lock = asyncio.Lock()
+
+        async with self.lock:
+            while True:
+                now = time.monotonic()
+                self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                await asyncio.sleep((1 - self.tokens) / self.rate)
@@ -0,0 +1,86 @@
+"""
+Per-call dependency-graph executor.
+
+Stages are async callables registered with the stages they depend on. Every
+stage starts as soon as its own dependencies have finished, so independent
+work (e.g. Zoho contact lookup vs. download + transcription) overlaps and
+the call takes as long as its critical path. With a deadline, each stage is
+limited to its share of the call's budget. Optional stages that fail or run
+out of time yield None instead of failing the call.
+"""
+
+import asyncio
+import logging
+import time
+
+logger = logging.getLogger(__name__)
+
+
+class TaskGraphError(Exception):
+    """A stage failed; carries the stage name and the original error."""
+
+    def __init__(self, stage, error):
+        super().__init__(f"{stage}: {error}")
+        self.stage = stage
+        self.error = error
+
+
+class TaskGraph:
+    """Run named async stages concurrently, respecting their dependencies."""
+
+    def __init__(self, name="call", deadline=None):
+        self.name = name
+        self.deadline = deadline
+        self.stages = {}
+        self.timings = {}
+
+    def add(self, name, func, deps=(), optional=False):
+        """
+        Register a stage. func is called with the results of deps (in order)
+        and must return an awaitable. Dependencies must be added first.
+        """
+        for dep in deps:
+            if dep not in self.stages:
+                raise ValueError(f"Stage '{name}' depends on unknown stage '{dep}'")
+        self.stages[name] = (func, tuple(deps), optional)
+
+    async def run(self):
+        """Run all stages; returns {stage: result} or raises TaskGraphError."""
+        tasks = {}
+        started = time.monotonic()
+
+        async def run_stage(name):
+            func, deps, optional = self.stages[name]
+            inputs = [await tasks[dep] for dep in deps]
+            stage_started = time.monotonic()
+            try:
+                if self.deadline is not None:
+                    return await self.deadline.run(name, func(*inputs))
+                return await func(*inputs)
+            except asyncio.CancelledError:
+                raise
+            except TaskGraphError:
+                raise
+            except Exception as e:
+                if optional:
+                    logger.warning(f"{self.name}: optional stage '{name}' failed, continuing without it: {e}")
+                    return None
+                raise TaskGraphError(name, e) from e
+            finally:
+                self.timings[name] = (stage_started - started, time.monotonic() - started)
+
+        for name in self.stages:
+            tasks[name] = asyncio.create_task(run_stage(name))
+
+        try:
+            await asyncio.gather(*tasks.values())
+        except BaseException:
+            # First failure (or our own cancellation) stops every other stage
+            for task in tasks.values():
+                task.cancel()
+            await asyncio.gather(*tasks.values(), return_exceptions=True)
+            raise
+
+        logger.debug(f"{self.name} stage timeline: " + ', '.join(
+            f"{stage} {start:.1f}-{end:.1f}s" for stage, (start, end) in self.timings.items()))
+        return {name: task.result() for name, task in tasks.items()}
@@ -0,0 +1,168 @@
+"""
+Multi-tenant mode: several Exotel accounts / Zoho Desk orgs in one process.
+
+Tenants are listed in a registry file (TENANTS_FILE). Each tenant has its
+own credentials, agents, dedupe/dead-letter/archive files and Exotel rate
+limit; the HTTP connection pool, keyword and screening caches and the LLM
+provider are shared. A global limit on concurrent calls is handed out
+round-robin between tenants so a busy tenant cannot starve the others.
+"""
+
+import os
+import re
+import json
+import asyncio
+import logging
+from collections import deque
+from contextlib import asynccontextmanager
+
+import aiohttp
+
+from audio_screening import AudioScreener
+from transcription import TranscriptSegmenter
+from keyword_analyzer import KeywordAnalyzer
+from analysis_providers import create_analysis_provider
+from transcript_window import TranscriptWindower
+from deadline import DeadlineBudget
+
+logger = logging.getLogger(__name__)
+
+
+def tenant_setting(section, key, env_name, default=None, inherit=True):
+    """
+    A setting from a tenant's config section. Without a tenant (section is
+    None) the environment variable is used; tenants inherit it only when
+    `inherit` is set, so one tenant never picks up another's credentials.
+    """
+    if section is None:
+        return os.getenv(env_name, default)
+    if section.get(key) is not None:
+        return section[key]
+    return os.getenv(env_name, default) if inherit else default
+
+
+def tenant_path(tenant, filename):
+    """Path of a tenant's own state file, or None (use the default) without a tenant."""
+    return os.path.join(tenant['data_dir'], filename) if tenant else None
+
+
+def _expand(value):
+    """Expand ${VAR} references so secrets can stay in the environment."""
+    if isinstance(value, str):
+        expanded = os.path.expandvars(value)
+        unresolved = re.findall(r'\$\{(\w+)\}', expanded)
+        if unresolved:
+            raise ValueError(f"environment variable {', '.join(unresolved)} is not set")
+        return expanded
+    if isinstance(value, dict):
+        return {key: _expand(item) for key, item in value.items()}
+    if isinstance(value, list):
+        return [_expand(item) for item in value]
+    return value
+
+
+def load_tenants(path=None):
+    """Read the tenant registry; returns {name: tenant config}."""
+    path = path or os.getenv('TENANTS_FILE', 'tenants.json')
+    with open(path, 'r') as f:
+        registry = json.load(f)
+
+    tenants = {}
+    names = set()
+    for tenant in registry.get('tenants', []):
+        name = tenant.get('name')
+        if not name:
+            raise ValueError(f"Tenant without a name in {path}")
+        if name in names:
+            raise ValueError(f"Duplicate tenant '{name}' in {path}")
+        names.add(name)
+        if not tenant.get('enabled', True):
+            continue  # Disabled tenants may reference secrets that are not set
+        try:
+            tenant = _expand(tenant)
+        except ValueError as e:
+            raise ValueError(f"Tenant '{name}' in {path}: {e}") from None
+        tenant.setdefault('data_dir', os.path.join('tenants', name))
+        tenants[name] = tenant
+    logger.info(f"Loaded {len(tenants)} tenants from {path}")
+    return tenants
+
+
+class FairCallScheduler:
+    """Global limit on concurrently processed calls, granted round-robin between tenants."""
+
+    def __init__(self, limit):
+        self.limit = limit
+        self.active = 0
+        self.waiting = {}  # tenant -> deque of futures
+        self.rotation = deque()  # tenants with waiting calls, in turn order
+
+    @asynccontextmanager
+    async def slot(self, tenant):
+        await self.acquire(tenant)
+        try:
+            yield
+        finally:
+            self.release()
+
+    async def acquire(self, tenant):
+        if self.active < self.limit and not self.rotation:
+            self.active += 1
+            return
+
+        future = asyncio.get_running_loop().create_future()
+        queue = self.waiting.setdefault(tenant, deque())
+        if not queue:
+            self.rotation.append(tenant)
+        queue.append(future)
+        try:
+            await future
+        except asyncio.CancelledError:
+            if not future.cancelled():
+                self.release()  # Granted just as we were cancelled
+            elif future in queue:
+                queue.remove(future)
+                if not queue:
+                    del self.waiting[tenant]
+                    self.rotation.remove(tenant)
+            raise
+
+    def release(self):
+        self.active -= 1
+        while self.active < self.limit and self.rotation:
+            tenant = self.rotation.popleft()
+            queue = self.waiting[tenant]
+            future = queue.popleft()
+            if queue:
+                self.rotation.append(tenant)  # Back of the line
+            else:
+                del self.waiting[tenant]
+            if not future.done():
+                self.active += 1
+                future.set_result(None)
+
+
+class SharedResources:
+    """Connection pool, caches and limits shared by every tenant in the process."""
+
+    def __init__(self):
+        self.deadlines = DeadlineBudget()
+        self.session = None
+        self.shutdown_event = asyncio.Event()
+        self.call_slots = FairCallScheduler(int(os.getenv('TENANT_MAX_CONCURRENT_CALLS', '8')))
+        self.screener = AudioScreener()
+        self.segmenter = TranscriptSegmenter()
+        self.keyword_analyzer = KeywordAnalyzer()
+        self.analysis_provider = create_analysis_provider(
+            default_primary='openai', windower=TranscriptWindower(self.keyword_analyzer)
+        )
+
+    async def get_session(self):
+        """One HTTP session (and connection pool) for Exotel, Deepgram, LLM and Zoho requests."""
+        if self.session is None or self.session.closed:
+            self.session = aiohttp.ClientSession(timeout=aiohttp.ClientTimeout(total=self.deadlines.total_seconds))
+        return self.session
+
+    async def close(self):
+        if self.session is not None and not self.session.closed:
+            await self.session.close()
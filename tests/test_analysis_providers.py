@@ -0,0 +1,101 @@
+import asyncio
+
+import pytest
+
+from analysis_providers import AnalysisProvider, HedgedProvider, create_analysis_provider
+
+
+class FakeProvider(AnalysisProvider):
+    """Answers after `delay` seconds, or fails when `answer` is None."""
+
+    def __init__(self, name, delay, answer=('Billing', 'Neutral'), configured=True):
+        self.name = name
+        super().__init__()
+        self.delay = delay
+        self.answer = answer
+        self.is_configured = configured
+        self.started = self.cancelled = 0
+
+    @property
+    def configured(self):
+        return self.is_configured
+
+    async def _request(self, items, session):
+        self.started += 1
+        try:
+            await asyncio.sleep(self.delay)
+        except asyncio.CancelledError:
+            self.cancelled += 1
+            raise
+        if self.answer is None:
+            return {}
+        return {item['id']: self.answer for item in items}
+
+
+ITEMS = [{'id': '1', 'transcript': 'hello'}]
+
+
+def hedge(primary, secondary, delay=0.05):
+    provider = HedgedProvider(primary, secondary)
+    provider.default_delay = delay
+    return provider
+
+
+def test_fast_primary_is_not_hedged():
+    primary, secondary = FakeProvider('a', 0), FakeProvider('b', 0)
+    provider = hedge(primary, secondary)
+    assert asyncio.run(provider.analyze_batch(ITEMS, session=object())) == {'1': ('Billing', 'Neutral')}
+    assert secondary.started == 0 and provider.hedges == 0
+
+
+def test_slow_primary_is_raced_and_cancelled():
+    primary, secondary = FakeProvider('a', 5), FakeProvider('b', 0, ('Refund', 'Negative'))
+    provider = hedge(primary, secondary)
+    assert asyncio.run(provider.analyze_batch(ITEMS, session=object())) == {'1': ('Refund', 'Negative')}
+    assert provider.hedges == 1 and provider.hedge_wins == 1
+    assert primary.cancelled == 1
+
+
+def test_failed_primary_falls_over_to_secondary():
+    primary, secondary = FakeProvider('a', 0, answer=None), FakeProvider('b', 0)
+    provider = hedge(primary, secondary, delay=1)
+    assert asyncio.run(provider.analyze_batch(ITEMS, session=object())) == {'1': ('Billing', 'Neutral')}
+    assert provider.hedges == 1
+
+
+def test_both_failing_returns_empty():
+    provider = hedge(FakeProvider('a', 0, answer=None), FakeProvider('b', 0, answer=None))
+    assert asyncio.run(provider.analyze_batch(ITEMS, session=object())) == {}
+
+
+def test_unconfigured_provider_is_skipped():
+    primary, secondary = FakeProvider('a', 0, configured=False), FakeProvider('b', 0)
+    assert asyncio.run(hedge(primary, secondary).analyze_batch(ITEMS, session=object()))
+    assert primary.started == 0
+
+
+def test_hedge_delay_follows_primary_p95():
+    primary = FakeProvider('a', 0)
+    provider = hedge(primary, FakeProvider('b', 0), delay=3)
+    assert provider.hedge_delay() == 3  # Too few samples
+    primary.latencies.extend([0.1] * 19 + [2.0])
+    assert provider.hedge_delay() == 2.0
+    primary.latencies.clear()
+    primary.latencies.extend([0.01] * 20)
+    assert provider.hedge_delay() == provider.min_delay
+
+
+def test_hedged_provider_has_no_prompt_budget_of_its_own():
+    provider = hedge(FakeProvider('a', 0), FakeProvider('b', 0))
+    assert provider.name == 'a+b'
+    assert provider.prompt_token_budget is None
+
+
+@pytest.mark.parametrize('hedge_enabled, expected', [('false', 'openai'), ('true', 'openai+gemini')])
+def test_create_analysis_provider(monkeypatch, hedge_enabled, expected):
+    monkeypatch.setenv('OPENAI_API_KEY', 'x')
+    monkeypatch.setenv('GEMINI_API_KEY', 'y')
+    monkeypatch.setenv('ANALYSIS_HEDGE_ENABLED', hedge_enabled)
+    monkeypatch.delenv('ANALYSIS_PROVIDER', raising=False)
+    monkeypatch.delenv('ANALYSIS_SECONDARY_PROVIDER', raising=False)
+    assert create_analysis_provider().name == expected
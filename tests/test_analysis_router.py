@@ -0,0 +1,48 @@
+import os
+
+import pytest
+
+from call_analysis import AnalysisRouter
+from keyword_analyzer import KeywordAnalyzer
+
+TAXONOMY_FILE = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'keyword_taxonomy.json')
+CONFIDENT = "I want a refund, please cancel my order"
+
+
+@pytest.fixture
+def router():
+    return AnalysisRouter(KeywordAnalyzer(TAXONOMY_FILE))
+
+
+def test_confident_calls_are_answered_locally(router):
+    assert router.classify_locally(CONFIDENT) == ("Refund/cancellation request", "Neutral")
+    assert router.stats()['counts']['local'] == 1
+
+
+def test_unclear_calls_go_to_the_llm(router):
+    assert router.classify_locally("hello, yes, okay, bye") is None
+    assert router.classify_locally("there is an issue with my payment") is None  # Two concerns tie
+    assert router.stats()['total'] == 0
+
+
+def test_local_tier_can_be_disabled(monkeypatch):
+    monkeypatch.setenv('ANALYSIS_LOCAL_TIER_ENABLED', 'false')
+    router = AnalysisRouter(KeywordAnalyzer(TAXONOMY_FILE))
+    assert router.classify_locally(CONFIDENT) is None
+
+
+def test_confidence_threshold_is_configurable(monkeypatch):
+    monkeypatch.setenv('ANALYSIS_LOCAL_CONFIDENCE_THRESHOLD', '0.99')
+    router = AnalysisRouter(KeywordAnalyzer(TAXONOMY_FILE))
+    assert router.classify_locally(CONFIDENT) is None
+
+
+def test_stats_and_summary(router):
+    router.record('local')
+    router.record('llm')
+    router.record('llm')
+    router.record('fallback')
+    stats = router.stats()
+    assert stats['total'] == 4
+    assert stats['share'] == {'local': 0.25, 'llm': 0.5, 'fallback': 0.25}
+    assert router.summary() == "4 calls analyzed: local=1 (25%), llm=2 (50%), fallback=1 (25%)"
@@ -0,0 +1,61 @@
+import asyncio
+
+import pytest
+
+from call_analysis import BatchAnalysisFailed, BatchingAnalyzer, build_batch_prompt, parse_batch_response
+
+
+def test_parse_batch_response():
+    text = '{"results": [{"id": "1", "concern": "Refund request", "mood": "Negative"}, {"id": 2, "concern": "Delivery"}]}'
+    assert parse_batch_response(text) == {'1': ("Refund request", "Negative"), '2': ("Delivery", "Neutral")}
+
+
+def test_parse_batch_response_accepts_code_fence_and_skips_malformed_entries():
+    text = '```json\n[{"id": "1", "concern": "Billing", "mood": "Neutral"}, {"concern": "no id"}, {"id": "3"}]\n```'
+    assert parse_batch_response(text) == {'1': ("Billing", "Neutral")}
+    assert parse_batch_response('not json') == {}
+    assert parse_batch_response(None) == {}
+
+
+def test_build_batch_prompt_includes_every_call():
+    prompt = build_batch_prompt([{'id': '1', 'transcript': 'hello', 'context': {'duration': 30}},
+                                 {'id': '2', 'transcript': 'bye'}])
+    assert '"id": "1"' in prompt and '"duration": 30' in prompt and '"transcript": "bye"' in prompt
+
+
+def run_batch(reply, transcripts=('a', 'b', 'c'), max_batch_size=10):
+    requests = []
+
+    async def analyze_batch(items):
+        requests.append([item['transcript'] for item in items])
+        return reply(items)
+
+    async def run():
+        analyzer = BatchingAnalyzer(analyze_batch, window_seconds=0.01, max_batch_size=max_batch_size)
+        return await asyncio.gather(*(analyzer.analyze(t) for t in transcripts), return_exceptions=True)
+
+    return asyncio.run(run()), requests
+
+
+def test_calls_within_the_window_share_one_request():
+    results, requests = run_batch(lambda items: {item['id']: (item['transcript'].upper(), 'Neutral') for item in items})
+    assert requests == [['a', 'b', 'c']]
+    assert results == [('A', 'Neutral'), ('B', 'Neutral'), ('C', 'Neutral')]
+
+
+def test_full_batches_are_sent_without_waiting_for_the_window():
+    _, requests = run_batch(lambda items: {item['id']: ('x', 'Neutral') for item in items},
+                            transcripts='abcde', max_batch_size=2)
+    assert requests == [['a', 'b'], ['c', 'd'], ['e']]
+
+
+def test_calls_missing_from_a_partial_reply_get_none():
+    results, _ = run_batch(lambda items: {items[0]['id']: ('x', 'Neutral')})
+    assert results == [('x', 'Neutral'), None, None]
+
+
+@pytest.mark.parametrize('reply', [lambda items: {}, lambda items: 1 / 0])
+def test_a_failed_batch_raises_in_every_caller(reply):
+    results, requests = run_batch(reply)
+    assert len(requests) == 1
+    assert all(isinstance(result, BatchAnalysisFailed) for result in results)
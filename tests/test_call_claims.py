@@ -0,0 +1,96 @@
+import pytest
+
+import call_claims
+from call_claims import InMemoryClaimStore, SQLiteClaimStore
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    now = [1_000_000.0]
+    monkeypatch.setattr(call_claims.time, 'time', lambda: now[0])
+    return now
+
+
+@pytest.fixture(params=['memory', 'sqlite'])
+def make_store(request, tmp_path):
+    stores = []
+
+    def make(owner, lease_seconds=60):
+        if request.param == 'memory':
+            # The in-memory store is per process: workers share one claims table
+            store = InMemoryClaimStore(owner, lease_seconds)
+            if stores:
+                store.claims, store.lock = stores[0].claims, stores[0].lock
+        else:
+            store = SQLiteClaimStore(owner, lease_seconds, str(tmp_path / 'claims.db'))
+        stores.append(store)
+        return store
+
+    yield make
+    for store in stores:
+        store.close()
+
+
+def test_live_lease_blocks_other_workers(clock, make_store):
+    a, b = make_store('a'), make_store('b')
+    assert a.claim('C1')
+    assert not b.claim('C1')
+    assert a.claim('C1')  # Re-claiming our own lease is fine
+
+
+def test_expired_lease_is_taken_over(clock, make_store):
+    a, b = make_store('a'), make_store('b')
+    assert a.claim('C1')
+    clock[0] += 61
+    assert b.claim('C1')
+    assert not a.claim('C1')
+
+
+def test_heartbeat_keeps_lease_alive(clock, make_store):
+    a, b = make_store('a'), make_store('b')
+    assert a.claim('C1')
+    clock[0] += 50
+    a.heartbeat(['C1'])
+    clock[0] += 50
+    assert not b.claim('C1')
+
+
+def test_done_sid_is_never_claimed_again(clock, make_store):
+    a, b = make_store('a'), make_store('b')
+    assert a.claim('C1')
+    a.complete('C1')
+    clock[0] += 3600
+    assert b.is_done('C1')
+    assert not b.claim('C1')
+    assert not a.claim('C1')
+
+
+def test_released_sid_can_be_claimed_immediately(clock, make_store):
+    a, b = make_store('a'), make_store('b')
+    assert a.claim('C1')
+    a.release('C1')
+    assert b.claim('C1')
+
+
+def test_done_sids_are_pruned_after_the_retention(clock, make_store, monkeypatch):
+    monkeypatch.setenv('CLAIM_DONE_RETENTION_HOURS', '1')
+    a = make_store('a')
+    assert a.claim('C1') and a.claim('C2')
+    a.complete('C1')
+    clock[0] += 1800
+    assert a.prune(clock[0]) == 0
+    assert a.is_done('C1')
+
+    # C1 completed and C2's lease (abandoned) expired over an hour ago
+    clock[0] += 3600
+    assert a.prune(clock[0]) == 2
+    assert not a.is_done('C1')
+
+
+def test_completing_calls_prunes_periodically(clock, make_store, monkeypatch):
+    monkeypatch.setenv('CLAIM_DONE_RETENTION_HOURS', '1')
+    a = make_store('a')
+    a.complete('C1')
+    clock[0] += 7200
+    a.complete('C2')
+    assert not a.is_done('C1') and a.is_done('C2')
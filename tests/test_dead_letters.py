@@ -0,0 +1,72 @@
+import time
+
+import pytest
+
+from dead_letters import DEAD, RETRYING, DeadLetterStore
+
+
+@pytest.fixture
+def store(monkeypatch, tmp_path):
+    monkeypatch.setenv('DEAD_LETTER_MAX_ATTEMPTS', '3')
+    monkeypatch.setenv('DEAD_LETTER_RETRY_BASE_SECONDS', '60')
+    monkeypatch.setenv('DEAD_LETTER_RETRY_MAX_SECONDS', '100')
+    monkeypatch.setenv('DEAD_LETTER_RETENTION_DAYS', '1')
+    store = DeadLetterStore(str(tmp_path / 'dead_letters.db'))
+    yield store
+    store.close()
+
+
+def test_retry_delay_doubles_up_to_the_maximum(store):
+    assert [store.retry_delay(attempts) for attempts in (1, 2, 3)] == [60, 100, 100]
+
+
+def test_failures_retry_until_the_attempt_limit(store):
+    call = {'Sid': 'S1'}
+    entry = store.record_failure(call, 'download', 'timeout')
+    assert entry['status'] == RETRYING and entry['attempts'] == 1
+    assert entry['next_retry_at'] == pytest.approx(time.time() + 60, abs=5)
+    assert store.is_blocked('S1')
+
+    store.record_failure(call, 'download', 'timeout')
+    entry = store.record_failure(call, 'transcribe', 'timeout')
+    assert entry['status'] == DEAD and entry['next_retry_at'] is None
+    assert entry['stage'] == 'transcribe' and entry['attempts'] == 3
+    assert store.is_blocked('S1')
+
+
+def test_permanent_failures_are_dead_at_once(store):
+    entry = store.record_failure({'Sid': 'S1'}, 'download', 'gone', permanent=True)
+    assert entry['status'] == DEAD and entry['attempts'] == 1
+
+
+def test_due_retries_are_unblocked(store):
+    store.record_failure({'Sid': 'S1'}, 'ticket', 'boom')
+    assert store.due() == []
+
+    store.conn.execute("UPDATE dead_letters SET next_retry_at = ? WHERE sid = 'S1'", (time.time() - 1,))
+    assert not store.is_blocked('S1')
+    assert store.due() == [{'Sid': 'S1'}]
+
+
+def test_resolve_removes_the_entry(store):
+    store.record_failure({'Sid': 'S1'}, 'ticket', 'boom')
+    store.resolve('S1')
+    assert store.get('S1') is None
+    assert not store.is_blocked('S1')
+
+
+def test_list_filters_by_status_and_stage(store):
+    store.record_failure({'Sid': 'S1'}, 'ticket', 'boom')
+    store.record_failure({'Sid': 'S2'}, 'download', 'gone', permanent=True)
+    assert [entry['sid'] for entry in store.list(status=DEAD)] == ['S2']
+    assert [entry['sid'] for entry in store.list(stage='ticket')] == ['S1']
+
+
+def test_prune_drops_entries_past_the_retention_age(store):
+    store.record_failure({'Sid': 'OLD'}, 'ticket', 'boom', permanent=True)
+    store.record_failure({'Sid': 'NEW'}, 'ticket', 'boom', permanent=True)
+    store.conn.execute("UPDATE dead_letters SET last_failed_at = ? WHERE sid = 'OLD'", (time.time() - 2 * 86400,))
+
+    assert store.prune() == 1
+    assert store.get('OLD') is None
+    assert store.get('NEW') is not None
@@ -0,0 +1,78 @@
+import asyncio
+import time
+
+import pytest
+
+from deadline import DEFAULT_STAGE_SHARES, DeadlineBudget, DeadlineExceeded
+
+
+@pytest.fixture
+def budget(monkeypatch):
+    monkeypatch.setenv('CALL_DEADLINE_SECONDS', '100')
+    monkeypatch.setenv('CALL_STAGE_SHARES', '')
+    return DeadlineBudget()
+
+
+def test_stage_seconds_are_shares_of_the_total(budget):
+    assert budget.stage_seconds('transcribe') == pytest.approx(100 * DEFAULT_STAGE_SHARES['transcribe'])
+    # Unknown stages may use the whole budget
+    assert budget.stage_seconds('other') == 100
+
+
+def test_stage_shares_are_read_from_the_environment(monkeypatch):
+    monkeypatch.setenv('CALL_DEADLINE_SECONDS', '100')
+    monkeypatch.setenv('CALL_STAGE_SHARES', 'transcribe=0.5, analyze = 0.15,ticket=lots,junk')
+    budget = DeadlineBudget()
+    assert budget.shares['transcribe'] == 0.5
+    assert budget.shares['analyze'] == 0.15
+    # Invalid entries keep the default
+    assert budget.shares['ticket'] == DEFAULT_STAGE_SHARES['ticket']
+
+
+def test_stages_are_capped_by_the_time_left(budget):
+    deadline = budget.start()
+    deadline.expires_at = time.monotonic() + 5
+    assert deadline.stage_seconds('transcribe') == pytest.approx(5, abs=0.1)
+    assert deadline.timeout('transcribe').total == pytest.approx(5, abs=0.1)
+
+    deadline.expires_at = time.monotonic() - 1
+    assert deadline.remaining() == 0
+    assert deadline.timeout('ticket').total > 0  # aiohttp treats 0 as no timeout
+
+
+def test_run_returns_the_stage_result(budget):
+    async def stage():
+        return 'done'
+
+    assert asyncio.run(budget.start().run('ticket', stage())) == 'done'
+
+
+def test_run_cancels_a_stage_past_its_share(monkeypatch):
+    monkeypatch.setenv('CALL_DEADLINE_SECONDS', '1')
+    monkeypatch.setenv('CALL_STAGE_SHARES', 'ticket=0.05')
+    deadline = DeadlineBudget().start()
+    cancelled = []
+
+    async def stage():
+        try:
+            await asyncio.sleep(1)
+        except asyncio.CancelledError:
+            cancelled.append(True)
+            raise
+
+    with pytest.raises(DeadlineExceeded) as excinfo:
+        asyncio.run(deadline.run('ticket', stage()))
+    assert excinfo.value.stage == 'ticket'
+    assert excinfo.value.seconds == pytest.approx(0.05, abs=0.01)
+    assert cancelled
+
+
+def test_run_refuses_to_start_once_the_deadline_passed(budget):
+    deadline = budget.start()
+    deadline.expires_at = time.monotonic() - 1
+
+    async def stage():
+        return 'never'
+
+    with pytest.raises(DeadlineExceeded):
+        asyncio.run(deadline.run('ticket', stage()))
@@ -0,0 +1,115 @@
+import json
+import time
+from datetime import datetime, timezone
+
+import pytest
+
+from dedupe_window import DedupeWindow
+
+# Recent enough that reloading does not age the exact Sids out
+NOW = time.time() - 60
+
+
+@pytest.fixture
+def window_env(monkeypatch):
+    monkeypatch.setenv('DEDUPE_RECENT_HOURS', '1')
+    monkeypatch.setenv('DEDUPE_RECENT_MAX_SIDS', '10')
+    monkeypatch.setenv('DEDUPE_GENERATION_HOURS', '24')
+    monkeypatch.setenv('DEDUPE_GENERATIONS', '2')
+    monkeypatch.setenv('DEDUPE_BLOOM_CAPACITY', '20')
+    monkeypatch.setenv('DEDUPE_BLOOM_ERROR_RATE', '0.0001')
+
+
+def test_evicted_sids_are_remembered_by_bloom_generations(window_env, tmp_path):
+    window = DedupeWindow(str(tmp_path / 'processed.json'))
+    for i in range(15):
+        window.add(f'S{i}', now=NOW + i)
+
+    assert len(window.recent) == 10
+    assert window.generations and window.generations[-1].count == 5
+    assert all(window.contains(f'S{i}', created=0) for i in range(15))
+    assert not window.contains('NEW', created=0)
+
+
+def test_calls_newer_than_the_exact_window_skip_the_bloom_filters(window_env, tmp_path):
+    window = DedupeWindow(str(tmp_path / 'processed.json'))
+    for i in range(15):
+        window.add(f'S{i}', now=NOW + i)
+
+    # An evicted Sid reported as created after exact_since must be a different call
+    assert window.contains('S0', created=0)
+    assert not window.contains('S0', created=window.exact_since + 1)
+
+
+def test_oldest_generation_is_dropped(window_env, tmp_path):
+    window = DedupeWindow(str(tmp_path / 'processed.json'))
+    # Capacity 20 per generation, 2 generations kept: the first 20 evicted Sids are forgotten
+    for i in range(70):
+        window.add(f'S{i}', now=NOW + i)
+
+    assert len(window.generations) == 2
+    assert not any(window.contains(f'S{i}', created=0) for i in range(20))
+    assert all(window.contains(f'S{i}', created=0) for i in range(20, 70))
+
+
+def test_full_save_round_trip(window_env, tmp_path):
+    path = str(tmp_path / 'processed.json')
+    window = DedupeWindow(path)
+    for i in range(15):
+        window.add(f'S{i}', now=NOW + i)
+    window.save(full=True)
+
+    reloaded = DedupeWindow(path)
+    assert reloaded.exact_since == window.exact_since
+    assert all(reloaded.contains(f'S{i}', created=0) for i in range(15))
+
+
+def test_sids_moved_since_the_last_bloom_write_survive_a_crash(window_env, tmp_path):
+    path = str(tmp_path / 'processed.json')
+    window = DedupeWindow(path)
+    for i in range(12):
+        window.add(f'S{i}', now=NOW + i)
+    window.save(full=True)
+    for i in range(12, 15):
+        window.add(f'S{i}', now=NOW + i)
+    window.save()  # Per-cycle save: Bloom file left as it was
+
+    assert window.unsaved_bloom_sids == ['S2', 'S3', 'S4']
+    reloaded = DedupeWindow(path)
+    assert all(reloaded.contains(f'S{i}', created=0) for i in range(15))
+
+
+def test_legacy_sid_list_is_migrated(window_env, tmp_path):
+    path = tmp_path / 'processed.json'
+    path.write_text(json.dumps(['OLD1', 'OLD2']))
+
+    window = DedupeWindow(str(path))
+    assert window.contains('OLD1') and window.contains('OLD2')
+    window.save()
+    assert (tmp_path / 'processed.json.bloom').exists()
+    assert DedupeWindow(str(path)).contains('OLD2')
+
+
+def test_exotel_date_created_is_read_in_ist(window_env, tmp_path):
+    window = DedupeWindow(str(tmp_path / 'processed.json'), timezone='Asia/Kolkata')
+    # Exotel reports '2024-06-01 10:00:00' for a call at 04:30 UTC, whatever the host's zone
+    assert window.parse_created('2024-06-01 10:00:00') == datetime(2024, 6, 1, 4, 30, tzinfo=timezone.utc).timestamp()
+
+    window._current_generation(NOW).add('S1')  # Evicted from the exact Sids long ago
+    window.exact_since = window.parse_created('2024-06-01 10:00:00')
+    assert window.lookup('S1', '2024-06-01 09:59:59') == 'bloom'
+    assert window.lookup('S1', '2024-06-01 10:00:01') is None
+
+
+def test_covered_since_follows_the_oldest_kept_generation(window_env, tmp_path):
+    path = str(tmp_path / 'processed.json')
+    window = DedupeWindow(path)
+    for i in range(50):
+        window.add(f'S{i}', now=NOW + i)
+    assert window.covered_since == 0.0  # Nothing forgotten yet
+
+    for i in range(50, 70):
+        window.add(f'S{i}', now=NOW + i)
+    assert window.covered_since == window.generations[0].started
+    window.save(full=True)
+    assert DedupeWindow(path).covered_since == window.covered_since
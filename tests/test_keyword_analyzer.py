@@ -0,0 +1,67 @@
+import os
+import json
+
+import pytest
+
+from call_analysis import AnalysisRouter
+from keyword_analyzer import KeywordAnalyzer
+
+
+TAXONOMY_FILE = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'keyword_taxonomy.json')
+
+
+@pytest.fixture
+def analyzer():
+    return KeywordAnalyzer(TAXONOMY_FILE)
+
+
+def test_builtin_taxonomy_compiles(tmp_path):
+    analyzer = KeywordAnalyzer(str(tmp_path / 'missing.json'))
+    assert analyzer.analyze("I was charged twice")['concern'] == "Billing inquiry"
+
+
+def test_top_concern_and_mood(analyzer):
+    result = analyzer.analyze("This is urgent, I was charged twice and the invoice is wrong")
+    assert result['concern'] == "Billing inquiry"
+    assert result['concern_hits'] == 2
+    assert result['mood'] == "Urgent"
+
+
+def test_keywords_match_whole_words_only(analyzer):
+    assert analyzer.analyze("My charger stopped working")['concern'] is None
+    assert analyzer.analyze("The issuer refunded me")['concern'] is None
+
+
+def test_listed_forms_and_multi_word_phrases_match(analyzer):
+    assert analyzer.analyze("Two refunds are pending")['concern'] == "Refund/cancellation request"
+    assert analyzer.analyze("The app is not   working")['concern'] == "Technical support request"
+    assert analyzer.analyze("thanks a lot")['mood'] == "Positive"
+
+
+def test_no_matches(analyzer):
+    result = analyzer.analyze("hello")
+    assert result['concern'] is None and result['concern_confidence'] == 0.0
+    assert result['mood'] == "Neutral"
+
+
+def test_taxonomy_is_reloaded_when_the_file_changes(tmp_path, monkeypatch):
+    monkeypatch.setenv('KEYWORD_TAXONOMY_RELOAD_SECONDS', '0')
+    path = tmp_path / 'taxonomy.json'
+    path.write_text(json.dumps({'concerns': {'Delivery': {'phrases': ['parcel']}}}))
+    analyzer = KeywordAnalyzer(str(path))
+    assert analyzer.analyze("where is my parcel")['concern'] == "Delivery"
+
+    path.write_text(json.dumps({'concerns': {'Shipping': {'phrases': ['parcel']}}}))
+    analyzer.loaded_mtime = None  # Same-second writes keep the mtime
+    assert analyzer.analyze("where is my parcel")['concern'] == "Shipping"
+
+
+def test_local_tier_needs_confidence_and_two_hits(analyzer):
+    router = AnalysisRouter(analyzer)
+    # One (double-weighted) keyword clears the confidence threshold but is only one hit
+    assert analyzer.analyze("I want a refund")['concern_confidence'] >= router.concern_threshold
+    assert router.classify_locally("I want a refund") is None
+    assert router.classify_locally("I want a refund, please cancel the order") == (
+        "Refund/cancellation request", "Neutral")
+    assert router.counts == {'local': 1, 'llm': 0, 'fallback': 0}
+
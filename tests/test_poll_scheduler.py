@@ -0,0 +1,61 @@
+import asyncio
+import time
+
+import pytest
+
+from poll_scheduler import AdaptivePoller
+
+
+@pytest.fixture
+def poller(monkeypatch):
+    monkeypatch.setenv('POLL_MIN_INTERVAL_SECONDS', '5')
+    monkeypatch.setenv('POLL_MAX_INTERVAL_SECONDS', '300')
+    monkeypatch.setenv('POLL_BACKOFF_FACTOR', '2')
+    return AdaptivePoller(base_interval=60)
+
+
+def test_idle_cycles_back_off_to_the_maximum(poller):
+    assert [poller.update(0, False) for _ in range(4)] == [120, 240, 300, 300]
+
+
+def test_traffic_speeds_polling_up_from_the_base_interval(poller):
+    for _ in range(3):
+        poller.update(0, False)
+    assert poller.update(2, False) == 30  # Back below the base interval at once
+    assert poller.update(1, False) == 15
+    assert [poller.update(1, False) for _ in range(3)] == [7.5, 5, 5]
+
+
+def test_full_page_polls_at_the_minimum(poller):
+    assert poller.update(10, True) == 5
+
+
+def test_sleep_counts_time_already_spent_in_the_cycle(poller):
+    started = time.monotonic() - 20
+    assert poller.sleep_seconds(started) == pytest.approx(40, abs=0.5)
+    assert poller.sleep_seconds(started - 100) == 0.0
+
+
+def test_dead_letter_retries_do_not_count_as_new_traffic(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    from zoho_call_processor import ZohoCallProcessor
+
+    processor = ZohoCallProcessor()
+
+    async def fetch_latest_calls():
+        return [{'Sid': 'NEW1'}]
+
+    async def process_call(call, rate_limiter=None):
+        return True
+
+    processor.fetch_latest_calls = fetch_latest_calls
+    processor.due_dead_letters = lambda exclude=(): [{'Sid': 'RETRY1'}, {'Sid': 'RETRY2'}]
+    processor.process_call = process_call
+
+    async def run():
+        try:
+            return await processor.run_monitoring_cycle()
+        finally:
+            await processor.close()
+
+    assert asyncio.run(run()) == (1, False)
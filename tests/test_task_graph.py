@@ -0,0 +1,93 @@
+import asyncio
+
+import pytest
+
+from deadline import DeadlineBudget, DeadlineExceeded
+from task_graph import TaskGraph, TaskGraphError
+
+
+def run(graph):
+    return asyncio.run(graph.run())
+
+
+def test_independent_stages_overlap():
+    events = []
+
+    def stage(name, seconds, result):
+        async def run_stage(*inputs):
+            events.append(f"start {name}")
+            await asyncio.sleep(seconds)
+            events.append(f"end {name}")
+            return result
+        return run_stage
+
+    graph = TaskGraph()
+    graph.add('contact', stage('contact', 0.02, 'C1'))
+    graph.add('download', stage('download', 0.01, 'file'))
+    graph.add('transcribe', lambda path: stage('transcribe', 0.02, f"text of {path}")(), deps=['download'])
+    graph.add('ticket', lambda text, contact: stage('ticket', 0, (text, contact))(), deps=['transcribe', 'contact'])
+
+    results = run(graph)
+    assert results['ticket'] == ("text of file", 'C1')
+    # The contact lookup runs alongside download and transcription
+    assert events.index('start transcribe') < events.index('end contact')
+    assert events[-2:] == ['start ticket', 'end ticket']
+
+
+def test_unknown_dependency_is_rejected():
+    with pytest.raises(ValueError):
+        TaskGraph().add('ticket', lambda x: x, deps=['missing'])
+
+
+def test_failure_names_the_stage_and_cancels_the_rest():
+    cancelled = []
+
+    async def slow():
+        try:
+            await asyncio.sleep(5)
+        except asyncio.CancelledError:
+            cancelled.append('slow')
+            raise
+
+    async def broken():
+        raise RuntimeError('404')
+
+    graph = TaskGraph()
+    graph.add('contact', slow)
+    graph.add('download', broken)
+    with pytest.raises(TaskGraphError) as error:
+        run(graph)
+    assert error.value.stage == 'download'
+    assert str(error.value.error) == '404'
+    assert cancelled == ['slow']
+
+
+def test_optional_stage_failure_yields_none():
+    async def broken():
+        raise RuntimeError('zoho down')
+
+    async def ticket(contact):
+        return contact
+
+    graph = TaskGraph()
+    graph.add('contact', broken, optional=True)
+    graph.add('ticket', ticket, deps=['contact'])
+    assert run(graph) == {'contact': None, 'ticket': None}
+
+
+def test_stages_run_under_their_deadline_share(monkeypatch):
+    monkeypatch.setenv('CALL_DEADLINE_SECONDS', '1')
+    monkeypatch.setenv('CALL_STAGE_SHARES', 'download=0.05')
+
+    async def hung():
+        await asyncio.sleep(5)
+
+    async def main():
+        graph = TaskGraph(deadline=DeadlineBudget().start())
+        graph.add('download', hung)
+        return await graph.run()
+
+    with pytest.raises(TaskGraphError) as error:
+        asyncio.run(main())
+    assert error.value.stage == 'download'
+    assert isinstance(error.value.error, DeadlineExceeded)
@@ -0,0 +1,42 @@
+import asyncio
+
+from tenants import FairCallScheduler
+
+
+def test_slots_are_granted_round_robin_between_tenants():
+    async def run():
+        scheduler = FairCallScheduler(1)
+        granted = []
+        release = asyncio.Event()
+
+        async def call(tenant):
+            async with scheduler.slot(tenant):
+                granted.append(tenant)
+                await release.wait()
+
+        holder = asyncio.create_task(call('a'))
+        await asyncio.sleep(0)
+        waiters = [asyncio.create_task(call(tenant)) for tenant in ('a', 'a', 'a', 'b', 'b')]
+        await asyncio.sleep(0)
+        release.set()
+        await asyncio.gather(holder, *waiters)
+        return granted, scheduler.active
+
+    granted, active = asyncio.run(run())
+    assert granted == ['a', 'a', 'b', 'a', 'b', 'a']
+    assert active == 0
+
+
+def test_cancelled_waiter_gives_up_its_place():
+    async def run():
+        scheduler = FairCallScheduler(1)
+        await scheduler.acquire('a')
+        waiter = asyncio.create_task(scheduler.acquire('b'))
+        await asyncio.sleep(0)
+        waiter.cancel()
+        await asyncio.gather(waiter, return_exceptions=True)
+
+        scheduler.release()
+        return scheduler.active, scheduler.waiting, list(scheduler.rotation)
+
+    assert asyncio.run(run()) == (0, {}, [])
@@ -0,0 +1,88 @@
+import time
+
+import pytest
+
+from transcript_archive import TranscriptArchive, excerpt
+
+
+def record(sid, transcript, **fields):
+    return dict({'sid': sid, 'call_time': '2024-06-01 10:00:00', 'agent_name': 'Asha',
+                 'concern': 'General query', 'mood': 'Neutral', 'transcript': transcript}, **fields)
+
+
+@pytest.fixture
+def archive(monkeypatch, tmp_path):
+    monkeypatch.setenv('TRANSCRIPT_ARCHIVE_ENABLED', 'true')
+    monkeypatch.setenv('TRANSCRIPT_ARCHIVE_RETENTION_DAYS', '1')
+    monkeypatch.setenv('TRANSCRIPT_ARCHIVE_MAX_CALLS', '3')
+    archive = TranscriptArchive(str(tmp_path / 'transcripts.db'))
+    yield archive
+    archive.close()
+
+
+def test_search_finds_stemmed_terms_with_an_excerpt(archive):
+    archive.add(record('S1', 'Customer: I want a refund for the damaged parcel'))
+    archive.add(record('S2', 'Customer: where is my order'))
+
+    results = archive.search('refunds')
+    assert [result['sid'] for result in results] == ['S1']
+    assert 'refund' in results[0]['excerpt']
+    assert 'transcript' not in results[0]
+
+
+def test_search_filters(archive):
+    archive.add(record('S1', 'refund please', agent_name='Asha', mood='Angry', call_time='2024-06-01 10:00:00'))
+    archive.add(record('S2', 'refund again', agent_name='Ravi', mood='Calm', call_time='2024-06-03 10:00:00'))
+
+    assert [r['sid'] for r in archive.search('refund', agent='Ravi')] == ['S2']
+    assert [r['sid'] for r in archive.search('refund', mood='angry')] == ['S1']
+    assert [r['sid'] for r in archive.search('refund', since='2024-06-02')] == ['S2']
+    assert [r['sid'] for r in archive.search('refund', until='2024-06-02')] == ['S1']
+    assert len(archive.search('refund', limit=1)) == 1
+
+
+def test_invalid_queries_raise_value_error(archive):
+    archive.add(record('S1', 'refund please'))
+    with pytest.raises(ValueError):
+        archive.search('"unterminated')
+
+
+def test_re_adding_a_sid_replaces_it(archive):
+    archive.add(record('S1', 'refund please'))
+    archive.add(record('S1', 'wrong address'))
+
+    assert archive.search('refund') == []
+    assert archive.get('S1')['transcript'] == 'wrong address'
+
+
+def test_calls_without_a_transcript_are_not_archived(archive):
+    archive.add(record('S1', ''))
+    assert archive.get('S1') is None
+
+
+def test_prune_by_count_keeps_the_newest(archive):
+    for i in range(5):
+        archive.add(record(f'S{i}', f'call number {i}'))
+        archive.conn.execute("UPDATE calls SET archived_at = ? WHERE sid = ?", (time.time() - 100 + i, f'S{i}'))
+
+    assert archive.prune() == 2
+    assert archive.get('S0') is None and archive.get('S1') is None
+    assert archive.get('S4') is not None
+    # The index entries went with the rows
+    assert sorted(r['sid'] for r in archive.search('call')) == ['S2', 'S3', 'S4']
+
+
+def test_prune_by_age(archive):
+    archive.add(record('OLD', 'refund please'))
+    archive.add(record('NEW', 'refund again'))
+    archive.conn.execute("UPDATE calls SET archived_at = ? WHERE sid = 'OLD'", (time.time() - 2 * 86400,))
+
+    assert archive.prune() == 1
+    assert [r['sid'] for r in archive.search('refund')] == ['NEW']
+
+
+def test_excerpt_centres_on_the_first_match():
+    text = 'x' * 500 + ' refund ' + 'y' * 500
+    snippet = excerpt(text, 'refund OR return', width=40)
+    assert snippet.startswith('...') and snippet.endswith('...')
+    assert 'refund' in snippet
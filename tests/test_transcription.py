@@ -0,0 +1,72 @@
+import pytest
+
+from transcription import TranscriptSegmenter, mp3_duration, scan_mp3_frames
+
+# MPEG-1 Layer III, 128 kbit/s, 44.1 kHz, no padding: 417-byte frames of 1152 samples
+FRAME_HEADER = b'\xff\xfb\x90\x00'
+FRAME_LENGTH = 417
+FRAME_SECONDS = 1152 / 44100
+
+
+def make_mp3(seconds, id3=True):
+    frames = b''.join(FRAME_HEADER + bytes([i % 256]) * (FRAME_LENGTH - 4)
+                      for i in range(int(seconds / FRAME_SECONDS)))
+    tag = b'ID3\x03\x00\x00\x00\x00\x00\x0a' + b'\x00' * 10 if id3 else b''
+    return tag + frames
+
+
+@pytest.fixture
+def segmenter(monkeypatch):
+    monkeypatch.setenv('TRANSCRIBE_SEGMENT_MIN_SECONDS', '20')
+    monkeypatch.setenv('TRANSCRIBE_SEGMENT_SECONDS', '10')
+    monkeypatch.setenv('TRANSCRIBE_SEGMENT_OVERLAP_SECONDS', '2')
+    return TranscriptSegmenter()
+
+
+def test_scan_skips_id3_and_finds_every_frame():
+    data = make_mp3(5)
+    frames = scan_mp3_frames(data)
+    assert frames[0][0] == 20
+    assert len(frames) == int(5 / FRAME_SECONDS)
+    assert mp3_duration(data) == pytest.approx(len(frames) * FRAME_SECONDS)
+    assert scan_mp3_frames(b'not an mp3' * 100) is None
+
+
+def test_short_recordings_are_not_split(segmenter):
+    assert segmenter.split(make_mp3(15)) is None
+
+
+def test_split_on_frame_boundaries_with_overlap(segmenter):
+    data = make_mp3(35)
+    segments = segmenter.split(data)
+
+    # 10s segments starting every ~8s (2s overlap)
+    assert len(segments) == 5
+    assert segments[0]['start'] == 0.0
+    assert segments[-1]['end'] == pytest.approx(mp3_duration(data))
+    assert data.endswith(segments[-1]['data'])
+    for segment in segments:
+        # Each segment is whole frames copied from the original
+        assert segment['data'] in data
+        assert segment['data'][:4] == FRAME_HEADER
+        assert len(segment['data']) % FRAME_LENGTH == 0
+        assert segment['end'] - segment['start'] <= 10 + FRAME_SECONDS
+    for earlier, later in zip(segments, segments[1:]):
+        assert earlier['end'] - later['start'] == pytest.approx(2, abs=FRAME_SECONDS)
+
+
+def test_stitch_round_trip(segmenter):
+    segments = segmenter.split(make_mp3(35))
+    # One word every 0.3s in absolute time; each segment "hears" the words inside it
+    spoken = [{'word': f'w{i}', 'start': i * 0.3, 'end': i * 0.3 + 0.2} for i in range(110)]
+    results = []
+    for segment in segments:
+        results.append({'words': [
+            {'word': word['word'], 'start': word['start'] - segment['start'], 'end': word['end'] - segment['start']}
+            for word in spoken if segment['start'] <= word['start'] < segment['end']
+        ]})
+
+    stitched = segmenter.stitch(segments, results)
+    assert [word['word'] for word in stitched['words']] == [word['word'] for word in spoken]
+    assert [word['start'] for word in stitched['words']] == pytest.approx([word['start'] for word in spoken])
+    assert stitched['transcript'] == ' '.join(word['word'] for word in spoken)
@@ -0,0 +1,119 @@
+"""
+Priority scheduling for the Zoho Desk ticket-creation stage.
+
+When calls back up, tickets are created in order of detected urgency (mood),
+agent department weight and time spent waiting instead of arrival order. Waiting
+calls gain priority over time so routine calls are never starved.
+"""
+
+import os
+import time
+import asyncio
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Scheduling level per detected mood (lowercase); unknown moods are 0
+MOOD_LEVELS = {
+    'urgent': 3,
+    'negative': 2,
+    'frustrated': 2,
+    'angry': 2,
+    'anxious': 1,
+    'confused': 1,
+}
+
+
+class PriorityTicketScheduler:
+    """Run ticket creation through a fixed pool of workers, most urgent first."""
+
+    def __init__(self, create_ticket, department_weights=None):
+        self.create_ticket = create_ticket
+        self.department_weights = department_weights or {}
+        self.worker_count = int(os.getenv('ZOHO_TICKET_WORKERS', '2'))
+        # Seconds of waiting worth one priority level (starvation protection)
+        self.aging_seconds = float(os.getenv('TICKET_PRIORITY_AGING_SECONDS', '300'))
+        self.pending = []
+        self.workers = []
+        self.loop = None
+        self.wakeup = None
+
+    def priority(self, entry, now=None):
+        """Effective priority: mood level + department weight + bonus for time in the queue."""
+        now = now or time.time()
+        waited = max(now - entry['queued_at'], 0.0)
+        return entry['base_priority'] + waited / self.aging_seconds
+
+    def base_priority(self, ticket_data):
+        mood_level = MOOD_LEVELS.get(str(ticket_data.get('mood', '')).strip().lower(), 0)
+        department_weight = float(self.department_weights.get(ticket_data.get('agent_department'), 0))
+        return mood_level + department_weight
+
+    def _ensure_workers(self):
+        loop = asyncio.get_running_loop()
+        if self.loop is loop and self.workers:
+            return
+        self.loop = loop
+        self.wakeup = asyncio.Event()
+        self.workers = [asyncio.create_task(self._worker()) for _ in range(self.worker_count)]
+
+    async def submit(self, ticket_data, **kwargs):
+        """Queue a ticket for creation and wait for the create_ticket result."""
+        self._ensure_workers()
+        now = time.time()
+        entry = {
+            'ticket_data': ticket_data,
+            'kwargs': kwargs,
+            'base_priority': self.base_priority(ticket_data),
+            'queued_at': now,
+            'future': self.loop.create_future()
+        }
+        self.pending.append(entry)
+        self.wakeup.set()
+        return await entry['future']
+
+    def _pop_next(self):
+        """Remove and return the entry with the highest effective priority."""
+        now = time.time()
+        best = max(range(len(self.pending)), key=lambda i: self.priority(self.pending[i], now))
+        return self.pending.pop(best)
+
+    async def _worker(self):
+        while True:
+            while not self.pending:
+                self.wakeup.clear()
+                await self.wakeup.wait()
+
+            entry = self._pop_next()
+            if entry['future'].done():
+                continue  # Caller gave up (cancelled)
+
+            if self.pending:
+                logger.info(f"Creating ticket for {entry['ticket_data'].get('call_id')} "
+                            f"(priority {self.priority(entry):.1f}, {len(self.pending)} waiting)")
+            task = asyncio.ensure_future(self.create_ticket(entry['ticket_data'], **entry['kwargs']))
+            # A caller that gives up (e.g. its call deadline ran out) cancels the request too
+            entry['future'].add_done_callback(lambda future, task=task: future.cancelled() and task.cancel())
+            try:
+                await asyncio.wait({task})
+            except asyncio.CancelledError:
+                task.cancel()
+                entry['future'].cancel()
+                raise
+
+            if task.cancelled():
+                continue
+            error = task.exception()
+            if entry['future'].done():
+                continue
+            if error is not None:
+                entry['future'].set_exception(error)
+            else:
+                entry['future'].set_result(task.result())
+
+    async def close(self):
+        """Stop the workers (pending callers are left to their own cancellation)."""
+        for worker in self.workers:
+            worker.cancel()
+        await asyncio.gather(*self.workers, return_exceptions=True)
+        self.workers = []
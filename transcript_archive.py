@@ -0,0 +1,197 @@
+"""
+Local archive of call transcripts with full-text search.
+
+Completed calls are written to a SQLite file as they finish: call metadata,
+concern, mood and the transcript (zlib-compressed). A contentless FTS5 index
+over the transcript, concern, mood and agent answers searches locally
+instead of paging through Zoho notes. Old calls are pruned by age and count.
+"""
+
+import os
+import re
+import time
+import zlib
+import sqlite3
+import logging
+import threading
+
+logger = logging.getLogger(__name__)
+
+COLUMNS = ('sid', 'call_time', 'agent_name', 'agent_number', 'department', 'customer_number',
+           'direction', 'duration', 'concern', 'mood', 'recording_url')
+INDEXED_COLUMNS = ('transcript', 'concern', 'mood', 'agent_name')
+
+
+class TranscriptArchive:
+    """Compressed transcript store with an FTS5 search index."""
+
+    def __init__(self, path=None):
+        self.enabled = os.getenv('TRANSCRIPT_ARCHIVE_ENABLED', 'true').lower() == 'true'
+        self.path = path or os.getenv('TRANSCRIPT_ARCHIVE_PATH', 'transcripts.db')
+        self.retention_days = float(os.getenv('TRANSCRIPT_ARCHIVE_RETENTION_DAYS', '365'))
+        self.max_calls = int(os.getenv('TRANSCRIPT_ARCHIVE_MAX_CALLS', '200000'))
+        self.prune_interval = 3600
+        self.last_pruned = 0.0
+        self.lock = threading.Lock()
+        self.conn = None
+        if self.enabled:
+            self.connect()
+
+    def connect(self):
+        self.conn = sqlite3.connect(self.path, timeout=30, isolation_level=None, check_same_thread=False)
+        self.conn.row_factory = sqlite3.Row
+        self.conn.execute(f"""
+            CREATE TABLE IF NOT EXISTS calls (
+                id INTEGER PRIMARY KEY,
+                {', '.join(f'{column} TEXT' for column in COLUMNS)},
+                archived_at REAL NOT NULL,
+                transcript BLOB NOT NULL
+            )
+        """)
+        self.conn.execute("CREATE UNIQUE INDEX IF NOT EXISTS calls_sid ON calls (sid)")
+        self.conn.execute("CREATE INDEX IF NOT EXISTS calls_archived_at ON calls (archived_at)")
+        # Contentless: the index stores no text; rows are read back from `calls`
+        self.conn.execute(f"""
+            CREATE VIRTUAL TABLE IF NOT EXISTS calls_fts USING fts5(
+                {', '.join(INDEXED_COLUMNS)}, content='', tokenize='porter unicode61'
+            )
+        """)
+
+    def add(self, record):
+        """Archive and index one completed call (replaces an earlier entry for the Sid)."""
+        if not self.enabled or not record.get('transcript'):
+            return
+        values = [str(record.get(column) or '') for column in COLUMNS]
+        transcript = record['transcript']
+        try:
+            with self.lock:
+                self.conn.execute("BEGIN IMMEDIATE")
+                try:
+                    self._delete(record['sid'])
+                    cursor = self.conn.execute(
+                        f"INSERT INTO calls ({', '.join(COLUMNS)}, archived_at, transcript) "
+                        f"VALUES ({', '.join('?' * (len(COLUMNS) + 2))})",
+                        values + [time.time(), zlib.compress(transcript.encode())]
+                    )
+                    self.conn.execute(
+                        f"INSERT INTO calls_fts (rowid, {', '.join(INDEXED_COLUMNS)}) VALUES (?, ?, ?, ?, ?)",
+                        (cursor.lastrowid, transcript, record.get('concern') or '',
+                         record.get('mood') or '', record.get('agent_name') or '')
+                    )
+                    self.conn.execute("COMMIT")
+                except Exception:
+                    self.conn.execute("ROLLBACK")
+                    raise
+            self.maybe_prune()
+        except Exception as e:
+            logger.error(f"Error archiving transcript for {record.get('sid')}: {e}")
+
+    def _delete(self, sid=None, row=None):
+        """Remove a call and its index entry (caller holds the lock and a transaction)."""
+        if row is None:
+            row = self.conn.execute("SELECT * FROM calls WHERE sid = ?", (sid,)).fetchone()
+            if row is None:
+                return
+        # Contentless FTS5 rows are deleted by repeating the indexed values
+        self.conn.execute(
+            f"INSERT INTO calls_fts (calls_fts, rowid, {', '.join(INDEXED_COLUMNS)}) VALUES ('delete', ?, ?, ?, ?, ?)",
+            (row['id'], zlib.decompress(row['transcript']).decode(), row['concern'], row['mood'], row['agent_name'])
+        )
+        self.conn.execute("DELETE FROM calls WHERE id = ?", (row['id'],))
+
+    def maybe_prune(self):
+        if time.time() - self.last_pruned >= self.prune_interval:
+            self.prune()
+
+    def prune(self):
+        """Drop calls past the retention age or beyond the maximum count; returns how many."""
+        if not self.enabled:
+            return 0
+        self.last_pruned = time.time()
+        cutoff = self.last_pruned - self.retention_days * 86400
+        with self.lock:
+            self.conn.execute("BEGIN IMMEDIATE")
+            try:
+                rows = self.conn.execute(
+                    "SELECT * FROM calls WHERE archived_at < ? OR id IN "
+                    "(SELECT id FROM calls ORDER BY archived_at DESC LIMIT -1 OFFSET ?)",
+                    (cutoff, self.max_calls)
+                ).fetchall()
+                for row in rows:
+                    self._delete(row=row)
+                self.conn.execute("COMMIT")
+            except Exception:
+                self.conn.execute("ROLLBACK")
+                raise
+        if rows:
+            logger.info(f"Pruned {len(rows)} archived transcripts")
+        return len(rows)
+
+    def search(self, query, since=None, until=None, agent=None, mood=None, limit=20):
+        """
+        Full-text search (FTS5 syntax, e.g. 'refund OR return', '"wrong address"').
+        since/until compare against the call time ('YYYY-MM-DD[ HH:MM:SS]').
+        Returns records with an excerpt instead of the full transcript, best match first.
+        """
+        if not self.enabled:
+            return []
+        sql = ("SELECT calls.*, bm25(calls_fts) AS rank FROM calls_fts "
+               "JOIN calls ON calls.id = calls_fts.rowid WHERE calls_fts MATCH ?")
+        params = [query]
+        if since:
+            sql += " AND calls.call_time >= ?"
+            params.append(since)
+        if until:
+            sql += " AND calls.call_time < ?"
+            params.append(until)
+        if agent:
+            sql += " AND calls.agent_name = ?"
+            params.append(agent)
+        if mood:
+            sql += " AND lower(calls.mood) = lower(?)"
+            params.append(mood)
+        sql += " ORDER BY rank LIMIT ?"
+        params.append(limit)
+
+        with self.lock:
+            try:
+                rows = self.conn.execute(sql, params).fetchall()
+            except sqlite3.OperationalError as e:
+                raise ValueError(f"Invalid search query: {e}") from e
+
+        results = []
+        for row in rows:
+            record = {column: row[column] for column in COLUMNS}
+            record['excerpt'] = excerpt(zlib.decompress(row['transcript']).decode(), query)
+            results.append(record)
+        return results
+
+    def get(self, sid):
+        """Full archived record, including the transcript."""
+        if not self.enabled:
+            return None
+        with self.lock:
+            row = self.conn.execute("SELECT * FROM calls WHERE sid = ?", (sid,)).fetchone()
+        if row is None:
+            return None
+        record = {column: row[column] for column in COLUMNS}
+        record['transcript'] = zlib.decompress(row['transcript']).decode()
+        return record
+
+    def close(self):
+        if self.conn is not None:
+            with self.lock:
+                self.conn.close()
+            self.conn = None
+
+
+def excerpt(transcript, query, width=160):
+    """Text around the first occurrence of any query term."""
+    terms = [term for term in re.findall(r'\w+', query) if term.upper() not in ('AND', 'OR', 'NOT', 'NEAR')]
+    match = None
+    if terms:
+        # Prefix match so 'refund' also finds 'refunds'/'refunded' as the porter index does
+        match = re.search(r'\b(' + '|'.join(re.escape(term) for term in terms) + r')', transcript, re.IGNORECASE)
+    start = max(0, match.start() - width // 2) if match else 0
+    text = transcript[start:start + width].replace('\n', ' ')
+    return ('...' if start else '') + text + ('...' if start + width < len(transcript) else '')
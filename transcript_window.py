@@ -0,0 +1,125 @@
+"""
+Token-budgeted transcript windowing for LLM prompts.
+
+Long transcripts are cut down to the most informative parts - the opening
+and closing turns plus the turns densest in concern/mood keywords - so the
+prompt fits a fixed token budget regardless of call length.
+"""
+
+import os
+import re
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Rough token estimate for English text (OpenAI/Gemini average ~4 chars per token)
+CHARS_PER_TOKEN = 4
+
+GAP_MARKER = "[...]"
+
+# Phrases that usually introduce the reason for the call
+INTENT_CUES = re.compile(
+    r"\b(?:calling (?:about|regarding|because)|i want|i need|i would like|i'd like|"
+    r"my (?:order|account|bill|payment|subscription)|not able to|unable to|complain)"
+)
+
+SENTENCE_END = re.compile(r'(?<=[.!?])\s+')
+
+
+def estimate_tokens(text):
+    """Approximate token count of a string."""
+    return len(text) // CHARS_PER_TOKEN + 1
+
+
+def split_turns(transcript, words=None, max_words=60):
+    """
+    Split a transcript into turns.
+
+    Uses Deepgram diarization (speaker changes) when word timings with
+    speakers are available, otherwise sentences. Long turns are split into
+    chunks of at most max_words words.
+    """
+    turns = []
+    if words and any('speaker' in word for word in words):
+        speaker = None
+        current = []
+        for word in words:
+            text = word.get('punctuated_word') or word.get('word', '')
+            if word.get('speaker') != speaker and current:
+                turns.append((speaker, current))
+                current = []
+            speaker = word.get('speaker')
+            current.append(text)
+        if current:
+            turns.append((speaker, current))
+    else:
+        turns = [(None, sentence.split()) for sentence in SENTENCE_END.split(transcript) if sentence.strip()]
+
+    chunks = []
+    for speaker, turn_words in turns:
+        for i in range(0, len(turn_words), max_words):
+            text = ' '.join(turn_words[i:i + max_words])
+            chunks.append(f"Speaker {speaker}: {text}" if speaker is not None else text)
+    return chunks
+
+
+class TranscriptWindower:
+    """Fit a transcript into a token budget, keeping the most informative turns."""
+
+    def __init__(self, keyword_analyzer=None):
+        self.keyword_analyzer = keyword_analyzer
+        self.opening_turns = int(os.getenv('PROMPT_WINDOW_OPENING_TURNS', '2'))
+        self.closing_turns = int(os.getenv('PROMPT_WINDOW_CLOSING_TURNS', '1'))
+
+    def score_turn(self, text):
+        """Keyword and intent-cue density of a turn (hits per token)."""
+        lowered = text.lower()
+        hits = len(INTENT_CUES.findall(lowered)) * 2
+        pattern = self.keyword_analyzer.pattern if self.keyword_analyzer else None
+        if pattern is not None:
+            hits += sum(1 for _ in pattern.finditer(lowered))
+        return hits / estimate_tokens(text)
+
+    def build(self, transcript, words=None, budget_tokens=1000):
+        """Return the transcript unchanged if it fits, else a windowed version within budget."""
+        if not transcript or budget_tokens <= 0 or estimate_tokens(transcript) <= budget_tokens:
+            return transcript
+
+        turns = split_turns(transcript, words)
+        if not turns:
+            return transcript[:budget_tokens * CHARS_PER_TOKEN]
+
+        costs = [estimate_tokens(turn) + 1 for turn in turns]
+        marker_cost = estimate_tokens(GAP_MARKER) + 1
+
+        # Opening and closing turns first, then the densest turns
+        anchors = list(range(min(self.opening_turns, len(turns))))
+        anchors += [i for i in range(max(0, len(turns) - self.closing_turns), len(turns)) if i not in anchors]
+        ranked = sorted((i for i in range(len(turns)) if i not in anchors),
+                        key=lambda i: self.score_turn(turns[i]), reverse=True)
+
+        selected = set()
+        used = 0
+        for i in anchors + ranked:
+            cost = costs[i] + marker_cost  # Worst case: each pick opens a new gap
+            if used + cost <= budget_tokens:
+                selected.add(i)
+                used += cost
+
+        if not selected:
+            return transcript[:budget_tokens * CHARS_PER_TOKEN]
+
+        parts = []
+        previous = -1
+        for i in sorted(selected):
+            if i != previous + 1:
+                parts.append(GAP_MARKER)
+            parts.append(turns[i])
+            previous = i
+        if previous != len(turns) - 1:
+            parts.append(GAP_MARKER)
+
+        windowed = '\n'.join(parts)
+        logger.info(f"Windowed transcript from ~{estimate_tokens(transcript)} to ~{estimate_tokens(windowed)} tokens "
+                    f"({len(selected)}/{len(turns)} turns)")
+        return windowed
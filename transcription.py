@@ -0,0 +1,191 @@
+"""
+Segmented transcription helpers.
+
+Long MP3 recordings are split at frame boundaries (no re-encoding) into
+overlapping segments that can be sent to Deepgram concurrently. The
+per-segment results are stitched back together on absolute timestamps,
+with words in the overlap kept from only one side.
+"""
+
+import os
+import logging
+
+logger = logging.getLogger(__name__)
+
+# MPEG audio Layer III tables, indexed by header fields
+MP3_BITRATES = {
+    1: [0, 32, 40, 48, 56, 64, 80, 96, 112, 128, 160, 192, 224, 256, 320],  # MPEG-1
+    2: [0, 8, 16, 24, 32, 40, 48, 56, 64, 80, 96, 112, 128, 144, 160],      # MPEG-2 / 2.5
+}
+MP3_SAMPLE_RATES = {
+    3: [44100, 48000, 32000],  # MPEG-1
+    2: [22050, 24000, 16000],  # MPEG-2
+    0: [11025, 12000, 8000],   # MPEG-2.5
+}
+
+
+def parse_mp3_frame_header(data, pos):
+    """Return (frame_length, frame_seconds) for a Layer III frame at pos, or None."""
+    if pos + 4 > len(data):
+        return None
+    b1, b2, b3 = data[pos + 1], data[pos + 2], data[pos + 3]
+    if data[pos] != 0xFF or (b1 & 0xE0) != 0xE0:
+        return None
+
+    version = (b1 >> 3) & 0x03
+    layer = (b1 >> 1) & 0x03
+    bitrate_index = (b2 >> 4) & 0x0F
+    sample_rate_index = (b2 >> 2) & 0x03
+    padding = (b2 >> 1) & 0x01
+
+    if version == 1 or layer != 1 or bitrate_index in (0, 15) or sample_rate_index == 3:
+        return None
+
+    bitrate = MP3_BITRATES[1 if version == 3 else 2][bitrate_index] * 1000
+    sample_rate = MP3_SAMPLE_RATES[version][sample_rate_index]
+    samples_per_frame = 1152 if version == 3 else 576
+    frame_length = (samples_per_frame // 8) * bitrate // sample_rate + padding
+
+    return frame_length, samples_per_frame / sample_rate
+
+
+def scan_mp3_frames(data):
+    """Return a list of (offset, seconds) for every audio frame, or None if not MP3."""
+    pos = 0
+
+    # Skip an ID3v2 tag if present
+    if data[:3] == b'ID3' and len(data) >= 10:
+        size = (data[6] << 21) | (data[7] << 14) | (data[8] << 7) | data[9]
+        pos = 10 + size + (10 if data[5] & 0x10 else 0)
+
+    frames = []
+    while pos < len(data):
+        header = parse_mp3_frame_header(data, pos)
+        if header is None:
+            if frames:
+                break  # Trailing tag (ID3v1/APE) or garbage after the audio
+            pos += 1  # Still looking for the first sync word
+            if pos > 64 * 1024:
+                return None
+            continue
+        frame_length, frame_seconds = header
+        frames.append((pos, frame_seconds))
+        pos += frame_length
+
+    return frames if len(frames) > 1 else None
+
+
+def mp3_duration(data):
+    """Duration of an MP3 in seconds from its frame headers, or None."""
+    frames = scan_mp3_frames(data)
+    if not frames:
+        return None
+    return sum(seconds for _, seconds in frames)
+
+
+class TranscriptSegmenter:
+    """Plan segment splits for long recordings and stitch their transcripts."""
+
+    def __init__(self):
+        self.min_duration = float(os.getenv('TRANSCRIBE_SEGMENT_MIN_SECONDS', '300'))
+        self.segment_seconds = float(os.getenv('TRANSCRIBE_SEGMENT_SECONDS', '120'))
+        self.overlap_seconds = float(os.getenv('TRANSCRIBE_SEGMENT_OVERLAP_SECONDS', '2'))
+        self.max_parallel = int(os.getenv('TRANSCRIBE_MAX_PARALLEL_SEGMENTS', '8'))
+
+    def split(self, data):
+        """
+        Split an MP3 into overlapping segments.
+
+        Returns a list of {'start', 'end', 'data'} dicts, or None when the
+        recording is short, not MP3, or segmenting is disabled.
+        """
+        if self.min_duration <= 0 or not data:
+            return None
+
+        frames = scan_mp3_frames(data)
+        if not frames:
+            return None
+
+        total = sum(seconds for _, seconds in frames)
+        if total < self.min_duration:
+            return None
+
+        # Absolute start time of each frame, plus the end offset of the audio
+        starts = []
+        elapsed = 0.0
+        for _, seconds in frames:
+            starts.append(elapsed)
+            elapsed += seconds
+        end_offset = frames[-1][0] + parse_mp3_frame_header(data, frames[-1][0])[0]
+
+        segments = []
+        first = 0
+        while first < len(frames):
+            seg_start = starts[first]
+            seg_end = seg_start + self.segment_seconds
+
+            last = first
+            while last + 1 < len(frames) and starts[last + 1] < seg_end:
+                last += 1
+
+            actual_end = starts[last] + frames[last][1]
+            byte_end = frames[last + 1][0] if last + 1 < len(frames) else end_offset
+            segments.append({
+                'start': seg_start,
+                'end': actual_end,
+                'data': data[frames[first][0]:byte_end]
+            })
+
+            if last + 1 >= len(frames):
+                break
+
+            # Next segment starts overlap_seconds before this one ends.
+            # Layer III frames can borrow bits from earlier frames, so the
+            # first frame of a segment may not decode - the overlap covers it.
+            next_first = last + 1
+            while next_first > first + 1 and starts[next_first - 1] > actual_end - self.overlap_seconds:
+                next_first -= 1
+            first = next_first
+
+        return segments if len(segments) > 1 else None
+
+    def stitch(self, segments, results):
+        """
+        Merge per-segment Deepgram results into one transcript.
+
+        Words are shifted to absolute time and, inside each overlap, only the
+        words before the overlap midpoint are taken from the earlier segment.
+        """
+        words = []
+        for i, (segment, result) in enumerate(zip(segments, results)):
+            keep_from = 0.0
+            keep_to = float('inf')
+            if i > 0:
+                keep_from = (segment['start'] + segments[i - 1]['end']) / 2
+            if i + 1 < len(segments):
+                keep_to = (segments[i + 1]['start'] + segment['end']) / 2
+
+            for word in result.get('words', []):
+                start = word.get('start', 0.0) + segment['start']
+                if keep_from <= start < keep_to:
+                    # Timestamps jitter between segments; drop a word that
+                    # repeats the previous one right at the cut point
+                    if (words and word.get('word') == words[-1].get('word')
+                            and start - words[-1]['start'] < 0.25):
+                        continue
+                    shifted = dict(word)
+                    shifted['start'] = start
+                    shifted['end'] = word.get('end', 0.0) + segment['start']
+                    words.append(shifted)
+
+        transcript = ' '.join(w.get('punctuated_word') or w.get('word', '') for w in words)
+        return {'transcript': transcript, 'words': words}
+
+
+def parse_deepgram_response(data):
+    """Extract the transcript and word timings from a Deepgram response."""
+    alternative = data.get('results', {}).get('channels', [{}])[0].get('alternatives', [{}])[0]
+    return {
+        'transcript': alternative.get('transcript', ''),
+        'words': alternative.get('words', [])
+    }
@@ -8,11 +8,22 @@ Much cheaper and better rate limits!
 from flask import Flask, request, jsonify
 import requests
 import os
+import hmac
 import logging
 import traceback
 import time
 import random
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
 from dotenv import load_dotenv
+from audio_screening import AudioScreener, CONVERSATION, SCREENED_CONCERNS
+from transcription import TranscriptSegmenter, parse_deepgram_response
+from keyword_analyzer import KeywordAnalyzer
+from call_analysis import AnalysisRouter
+from analysis_providers import create_analysis_provider
+from transcript_window import TranscriptWindower
+from deadline import DeadlineBudget
+from transcript_archive import TranscriptArchive
 
 load_dotenv()
 
@@ -31,6 +42,24 @@ EXOTEL_API_TOKEN = os.getenv('EXOTEL_API_TOKEN')
 EXOTEL_SID = os.getenv('EXOTEL_SID')
 DEEPGRAM_API_KEY = os.getenv('DEEPGRAM_API_KEY')
 GEMINI_API_KEY = os.getenv('GEMINI_API_KEY')  # New: Google Gemini API key
+SEARCH_API_TOKEN = os.getenv('SEARCH_API_TOKEN')  # Bearer token for /search; unset disables the route
+
+screener = AudioScreener()
+segmenter = TranscriptSegmenter()
+keyword_analyzer = KeywordAnalyzer()
+analysis_router = AnalysisRouter(keyword_analyzer)
+analysis_provider = create_analysis_provider(default_primary='gemini',
+                                             windower=TranscriptWindower(keyword_analyzer))
+
+# Connection pool for requests made on the worker's request thread; closed by shutdown().
+# requests.Session is not thread-safe, so parallel segment uploads do not use it.
+http_session = requests.Session()
+
+# Per-request deadline; each step's timeout is its share of what is left
+deadline_budget = DeadlineBudget()
+
+# Local full-text archive of processed transcripts (searched via /search)
+transcript_archive = TranscriptArchive()
 
 
 @app.route('/')
@@ -47,6 +76,39 @@ def health():
     return jsonify({'status': 'healthy', 'message': 'Service is running'}), 200
 
 
+@app.route('/stats')
+def stats():
+    """How often each analysis tier answered (per worker process)."""
+    return jsonify({'analysis_tiers': analysis_router.stats()}), 200
+
+
+@app.route('/search')
+def search():
+    """Full-text search of archived transcripts: ?q=refund&since=2024-01-01&agent=...&mood=...&limit=20"""
+    # Transcripts hold customer conversations: never served without the token
+    if not SEARCH_API_TOKEN:
+        return jsonify({'status': 'error', 'message': 'Not found'}), 404
+    token = request.headers.get('Authorization', '').removeprefix('Bearer ').strip()
+    if not hmac.compare_digest(token.encode(), SEARCH_API_TOKEN.encode()):
+        return jsonify({'status': 'error', 'message': 'Unauthorized'}), 401, {'WWW-Authenticate': 'Bearer'}
+    
+    query = request.args.get('q', '').strip()
+    if not query:
+        return jsonify({'status': 'error', 'message': "Missing search query 'q'"}), 400
+    try:
+        results = transcript_archive.search(
+            query,
+            since=request.args.get('since'),
+            until=request.args.get('until'),
+            agent=request.args.get('agent'),
+            mood=request.args.get('mood'),
+            limit=max(1, min(int(request.args.get('limit', 20)), 100))
+        )
+    except ValueError as e:
+        return jsonify({'status': 'error', 'message': str(e)}), 400
+    return jsonify({'status': 'success', 'count': len(results), 'results': results}), 200
+
+
 @app.route('/process_call', methods=['POST'])
 def process_call():
     """Process the latest call from Exotel."""
@@ -55,9 +117,10 @@ def process_call():
         incoming_data = request.get_json(force=True, silent=True) or {}
         logger.info(f"Received data from Zapier: {incoming_data}")
         logger.info("Processing call request from Zapier...")
+        deadline = deadline_budget.start()
         
         # Fetch latest call from Exotel
-        call = fetch_latest_call()
+        call = fetch_latest_call(timeout=deadline.stage_seconds('fetch'))
         if not call:
             logger.info("No new calls to process")
             return jsonify({
@@ -93,16 +156,36 @@ def process_call():
         except:
             duration = "0m 0s"
         
+        call_details = {
+            'call_id': call_sid,
+            'customer_number': from_number,
+            'agent_number': to_number,
+            'call_time': call_time,
+            'duration': duration,
+            'call_direction': direction
+        }
+        
+        # Pre-screen: sub-threshold calls never need the recording
+        verdict = screener.screen_duration(duration_raw)
+        if verdict != CONVERSATION:
+            return screened_response(call_details, verdict)
+        
         # Download recording
         logger.info("Downloading recording...")
-        audio_content = download_recording(recording_url, call_sid)
+        audio_content = download_recording(recording_url, call_sid, timeout=deadline.stage_seconds('download'))
         if not audio_content:
             logger.error("Failed to download recording")
             return jsonify({'status': 'error', 'message': 'Failed to download recording'}), 500
         
+        # Screen for silence / hold music before paying for transcription
+        verdict = screener.screen(duration_raw, audio_content)
+        if verdict != CONVERSATION:
+            return screened_response(call_details, verdict)
+        
         # Transcribe
         logger.info("Transcribing audio...")
-        transcription = transcribe_audio(audio_content)
+        transcription_result = transcribe_audio_detailed(audio_content, timeout=deadline.stage_seconds('transcribe'))
+        transcription = transcription_result['transcript'] if transcription_result else ""
         if not transcription:
             logger.error("Transcription failed")
             return jsonify({'status': 'error', 'message': 'Transcription failed'}), 500
@@ -111,7 +194,9 @@ def process_call():
         
         # Analyze concern and mood using Gemini
         logger.info("Analyzing concern and mood with Gemini...")
-        concern, mood = analyze_with_gemini(transcription, call_time, duration, direction)
+        concern, mood = analyze_with_gemini(transcription, call_time, duration, direction,
+                                            words=transcription_result.get('words'),
+                                            timeout=deadline.stage_seconds('analyze'))
         
         # Prepare response
         response_data = {
@@ -128,6 +213,19 @@ def process_call():
             'mood': mood
         }
         
+        transcript_archive.add({
+            'sid': call_sid,
+            'call_time': call_time,
+            'agent_number': to_number,
+            'customer_number': from_number,
+            'direction': direction,
+            'duration': duration,
+            'concern': concern,
+            'mood': mood,
+            'recording_url': recording_url,
+            'transcript': transcription
+        })
+        
         logger.info(f"Successfully processed call {call_sid}")
         return jsonify(response_data)
         
@@ -151,14 +249,32 @@ def process_call():
         }), 500
 
 
-def fetch_latest_call():
+def screened_response(call_details, verdict):
+    """Build the Zapier response for a call with no conversation."""
+    logger.info(f"Call {call_details['call_id']} screened as '{verdict}', skipping transcription")
+    response_data = {
+        'status': 'success',
+        **call_details,
+        'transcript': '',
+        'transcription_length': 0,
+        'concern': SCREENED_CONCERNS[verdict],
+        'mood': 'Neutral',
+        'screened': verdict
+    }
+    if screener.action == 'drop':
+        response_data['status'] = 'screened'
+    return jsonify(response_data)
+
+
+def fetch_latest_call(timeout=None):
     """Fetch the most recent completed call with recording from Exotel."""
     try:
         url = f"https://api.exotel.com/v1/Accounts/{EXOTEL_SID}/Calls.json"
         auth = requests.auth.HTTPBasicAuth(EXOTEL_API_KEY, EXOTEL_API_TOKEN)
         params = {'PageSize': 10, 'Page': 0}
         
-        response = requests.get(url, auth=auth, params=params, timeout=30)
+        response = http_session.get(url, auth=auth, params=params,
+                                    timeout=deadline_budget.stage_seconds('fetch') if timeout is None else timeout)
         
         if response.status_code != 200:
             logger.error(f"Exotel API error: {response.status_code}")
@@ -179,11 +295,12 @@ def fetch_latest_call():
         return None
 
 
-def download_recording(recording_url, call_sid):
+def download_recording(recording_url, call_sid, timeout=None):
     """Download audio recording from Exotel."""
     try:
         auth = requests.auth.HTTPBasicAuth(EXOTEL_API_KEY, EXOTEL_API_TOKEN)
-        response = requests.get(recording_url, auth=auth, timeout=60)
+        response = http_session.get(recording_url, auth=auth,
+                                    timeout=deadline_budget.stage_seconds('download') if timeout is None else timeout)
         
         if response.status_code == 200:
             return response.content
@@ -197,11 +314,37 @@ def download_recording(recording_url, call_sid):
 
 def transcribe_audio(audio_content):
     """Transcribe audio using Deepgram."""
+    result = transcribe_audio_detailed(audio_content)
+    return result['transcript'] if result else ""
+
+
+def transcribe_audio_detailed(audio_content, timeout=None):
+    """Transcribe audio, splitting long MP3 recordings into parallel segments."""
+    if timeout is None:
+        timeout = deadline_budget.stage_seconds('transcribe')
+    segments = segmenter.split(audio_content)
+    if segments:
+        logger.info(f"Transcribing in {len(segments)} parallel segments")
+        with ThreadPoolExecutor(max_workers=segmenter.max_parallel) as pool:
+            results = list(pool.map(lambda segment: deepgram_request(segment['data'], "audio/mpeg", timeout,
+                                                                     shared_session=False), segments))
+        if all(results):
+            return segmenter.stitch(segments, results)
+        logger.warning("Segmented transcription failed, retrying as a single request")
+    
+    return deepgram_request(audio_content, timeout=timeout)
+
+
+def deepgram_request(audio_content, content_type="audio/wav", timeout=None, shared_session=True):
+    """
+    Send audio to Deepgram and return the transcript and word timings.
+    Requests from pool threads pass shared_session=False and use their own connection.
+    """
     try:
         url = "https://api.deepgram.com/v1/listen"
         headers = {
             "Authorization": f"Token {DEEPGRAM_API_KEY}",
-            "Content-Type": "audio/wav"
+            "Content-Type": content_type
         }
         params = {
             "model": "general",
@@ -210,87 +353,70 @@ def transcribe_audio(audio_content):
             "diarize": "true"
         }
         
-        response = requests.post(url, headers=headers, params=params, data=audio_content, timeout=60)
+        post = http_session.post if shared_session else requests.post
+        response = post(url, headers=headers, params=params, data=audio_content,
+                        timeout=deadline_budget.stage_seconds('transcribe') if timeout is None else timeout)
         
         if response.status_code == 200:
-            data = response.json()
-            transcript = data.get('results', {}).get('channels', [{}])[0].get('alternatives', [{}])[0].get('transcript', '')
-            return transcript
+            return parse_deepgram_response(response.json())
         else:
             logger.error(f"Deepgram API error: {response.status_code}")
-            return ""
+            return None
     except Exception as e:
         logger.error(f"Transcription error: {e}")
-        return ""
+        return None
 
 
-def analyze_with_gemini(transcription, call_time, duration, direction):
+def analyze_with_gemini(transcription, call_time, duration, direction, words=None, timeout=None):
     """
-    Analyze call using Google Gemini API.
-    Much cheaper and better rate limits than OpenAI!
+    Analyze call using the shared LLM provider (Gemini by default).
+    Calls the keyword classifier is confident about never reach the LLM.
+    With ANALYSIS_HEDGE_ENABLED, a slow primary is raced against the secondary.
+    Long transcripts are windowed to the provider's prompt token budget.
     """
+    local = analysis_router.classify_locally(transcription)
+    if local:
+        logger.info(f"Keyword Analysis: Concern='{local[0]}', Mood='{local[1]}'")
+        return local
+    
     try:
-        url = f"https://generativelanguage.googleapis.com/v1beta/models/gemini-pro:generateContent?key={GEMINI_API_KEY}"
-        
-        prompt = f"""Analyze this customer service call transcription and provide:
-
-**Call Details:**
-- Direction: {direction}
-- Duration: {duration}
-- Time: {call_time}
-
-**Transcription:**
-"{transcription}"
-
-**Analysis Required:**
-1. **Concern**: What is the specific reason for this call? What does the customer need or want?
-2. **Mood**: What is the caller's emotional tone? (Professional, Polite, Frustrated, Confused, Anxious, etc.)
-
-**Special Cases:**
-- If only hold messages: "Caller on hold - No conversation recorded"
-- If brief/dropped call: "Brief/Dropped call - Insufficient conversation"
-- Otherwise: Analyze the actual conversation
-
-**Response Format:**
-Concern: [specific detailed concern]
-Mood: [single word describing emotional tone]"""
-        
-        data = {
-            "contents": [{
-                "parts": [{"text": prompt}]
-            }],
-            "generationConfig": {
-                "temperature": 0.3,
-                "maxOutputTokens": 150
-            }
+        item = {
+            'id': '1',
+            'transcript': transcription,
+            'context': {'direction': direction, 'duration': duration, 'time': call_time},
+            'words': words
         }
         
-        response = requests.post(url, json=data, timeout=30)
+        results = asyncio.run(asyncio.wait_for(analysis_provider.analyze_batch([item]),
+                                               timeout=deadline_budget.stage_seconds('analyze') if timeout is None else timeout))
         
-        if response.status_code == 200:
-            result = response.json()
-            content = result.get('candidates', [{}])[0].get('content', {}).get('parts', [{}])[0].get('text', '')
-            
-            # Parse concern and mood
-            concern = "General inquiry"
-            mood = "Neutral"
-            
-            for line in content.split('\n'):
-                line = line.strip()
-                if line.startswith('Concern:'):
-                    concern = line.replace('Concern:', '').strip()
-                elif line.startswith('Mood:'):
-                    mood = line.replace('Mood:', '').strip()
-            
-            logger.info(f"Gemini Analysis: Concern='{concern}', Mood='{mood}'")
+        if results:
+            concern, mood = results.get('1', ("General inquiry", "Neutral"))
+            analysis_router.record('llm')
+            logger.info(f"{analysis_provider.name} Analysis: Concern='{concern}', Mood='{mood}'")
             return concern, mood
         else:
-            logger.error(f"Gemini API error: {response.status_code} - {response.text}")
-            return "Analysis unavailable", "Neutral"
+            logger.error(f"{analysis_provider.name} analysis failed, using keyword analysis")
             
     except Exception as e:
-        logger.error(f"Error analyzing with Gemini: {e}")
-        return "Analysis error", "Neutral"
+        logger.error(f"Error analyzing with {analysis_provider.name}: {e}, using keyword analysis")
+    
+    analysis_router.record('fallback')
+    return analyze_with_keywords(transcription)
+
+
+def analyze_with_keywords(transcription):
+    """Fallback keyword-based analysis when the LLM is unavailable."""
+    result = keyword_analyzer.analyze(transcription)
+    concern = result['concern'] or f"Call regarding: {transcription[:100]}..."
+    return concern, result['mood']
+
+
+def shutdown():
+    """Release worker resources once in-flight requests have drained (gunicorn worker_exit)."""
+    logger.info(f"Worker shutting down. Analysis tiers: {analysis_router.summary()}")
+    http_session.close()
+    transcript_archive.close()
 
 
 if __name__ == '__main__':
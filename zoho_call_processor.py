@@ -9,14 +9,34 @@ Zoho Desk Call Ticket Processor
 
 import asyncio
 import aiohttp
+import argparse
 import sys
 import os
+import signal
+from contextlib import asynccontextmanager
 import json
 import time
 from datetime import datetime, timedelta
 from pathlib import Path
 import logging
 from dotenv import load_dotenv
+from audio_screening import AudioScreener, CONVERSATION, SCREENED_CONCERNS
+from transcription import TranscriptSegmenter, parse_deepgram_response
+from keyword_analyzer import KeywordAnalyzer
+from call_analysis import AnalysisRouter, BatchAnalysisFailed, BatchingAnalyzer
+from analysis_providers import create_analysis_provider
+from transcript_window import TranscriptWindower
+from task_graph import TaskGraph, TaskGraphError
+from ticket_scheduler import PriorityTicketScheduler
+from rate_limit import AsyncRateLimiter
+from poll_scheduler import AdaptivePoller
+from call_claims import create_claim_store, in_shard
+from dedupe_window import DedupeWindow
+from dead_letters import DeadLetterStore, PermanentCallError
+from deadline import DeadlineBudget
+from transcript_archive import TranscriptArchive
+from tenants import SharedResources, load_tenants, tenant_path, tenant_setting
+from backfill import BackfillCheckpoint, exotel_date_filter, parse_backfill_time, positive_hours, split_windows
 
 # Load environment variables
 load_dotenv()
@@ -36,30 +56,67 @@ logger = logging.getLogger(__name__)
 class ZohoDeskIntegration:
     """Handle creating tickets in Zoho Desk for call records."""
     
-    def __init__(self):
-        self.enabled = os.getenv('ZOHO_DESK_ENABLED', 'false').lower() == 'true'
-        self.org_id = os.getenv('ZOHO_DESK_ORG_ID')
-        self.access_token = os.getenv('ZOHO_DESK_ACCESS_TOKEN')
-        self.refresh_token = os.getenv('ZOHO_DESK_REFRESH_TOKEN')
-        self.client_id = os.getenv('ZOHO_DESK_CLIENT_ID')
-        self.client_secret = os.getenv('ZOHO_DESK_CLIENT_SECRET')
-        self.department_id = os.getenv('ZOHO_DESK_DEPARTMENT_ID')
-        self.api_domain = os.getenv('ZOHO_DESK_API_DOMAIN', 'https://desk.zoho.com')
-        self.default_priority = os.getenv('ZOHO_DESK_DEFAULT_PRIORITY', 'Medium')
-        self.auto_create_contact = os.getenv('ZOHO_DESK_AUTO_CREATE_CONTACT', 'true').lower() == 'true'
+    def __init__(self, tenant=None, shared=None):
+        # Settings come from the tenant's "zoho_desk" section in multi-tenant mode
+        config = tenant.get('zoho_desk', {}) if tenant else None
+        self.tenant_name = tenant['name'] if tenant else None
+        self.shared = shared
+        self.enabled = str(tenant_setting(config, 'enabled', 'ZOHO_DESK_ENABLED', 'false')).lower() == 'true'
+        self.org_id = tenant_setting(config, 'org_id', 'ZOHO_DESK_ORG_ID', inherit=False)
+        self.access_token = tenant_setting(config, 'access_token', 'ZOHO_DESK_ACCESS_TOKEN', inherit=False)
+        self.refresh_token = tenant_setting(config, 'refresh_token', 'ZOHO_DESK_REFRESH_TOKEN', inherit=False)
+        self.client_id = tenant_setting(config, 'client_id', 'ZOHO_DESK_CLIENT_ID', inherit=False)
+        self.client_secret = tenant_setting(config, 'client_secret', 'ZOHO_DESK_CLIENT_SECRET', inherit=False)
+        self.department_id = tenant_setting(config, 'department_id', 'ZOHO_DESK_DEPARTMENT_ID', inherit=False)
+        self.api_domain = tenant_setting(config, 'api_domain', 'ZOHO_DESK_API_DOMAIN', 'https://desk.zoho.com')
+        # OAuth server of the same data center, e.g. desk.zoho.in -> accounts.zoho.in
+        self.accounts_domain = tenant_setting(config, 'accounts_domain', 'ZOHO_ACCOUNTS_DOMAIN',
+                                              self.api_domain.replace('://desk.', '://accounts.', 1))
+        self.default_priority = tenant_setting(config, 'default_priority', 'ZOHO_DESK_DEFAULT_PRIORITY', 'Medium')
+        self.auto_create_contact = str(tenant_setting(config, 'auto_create_contact', 'ZOHO_DESK_AUTO_CREATE_CONTACT',
+                                                      'true')).lower() == 'true'
+        # Ticket priority by detected mood, e.g. "Urgent=High,Negative=High"
+        self.mood_priorities = {}
+        for pair in tenant_setting(config, 'mood_priority', 'ZOHO_DESK_MOOD_PRIORITY',
+                                   'Urgent=High,Negative=High,Frustrated=High,Angry=High').split(','):
+            if '=' in pair:
+                mood, priority = pair.split('=', 1)
+                self.mood_priorities[mood.strip().lower()] = priority.strip()
         
         if self.enabled and not all([self.org_id, self.access_token, self.department_id]):
-            logger.warning("Zoho Desk is enabled but missing required credentials")
+            logger.warning(f"Zoho Desk is enabled but missing required credentials"
+                           f"{f' for tenant {self.tenant_name}' if self.tenant_name else ''}")
             self.enabled = False
+        
+        self.session = None
+        # Each Zoho request is limited to the ticket stage's share of the call deadline (contact
+        # searches to the contact stage's). Requests pass these, or a running call's, explicitly:
+        # in multi-tenant mode the shared session only has the whole-call timeout.
+        budget = DeadlineBudget()
+        self.request_timeout = aiohttp.ClientTimeout(total=budget.stage_seconds('ticket'))
+        self.contact_timeout = aiohttp.ClientTimeout(total=budget.stage_seconds('contact'))
+    
+    async def get_session(self):
+        """Shared HTTP session for all Zoho requests (connections are reused)."""
+        if self.shared is not None:
+            return await self.shared.get_session()
+        if self.session is None or self.session.closed:
+            self.session = aiohttp.ClientSession(timeout=self.request_timeout)
+        return self.session
+    
+    async def close(self):
+        """Close the shared HTTP session."""
+        if self.session is not None and not self.session.closed:
+            await self.session.close()
             
-    async def refresh_access_token(self):
+    async def refresh_access_token(self, timeout=None):
         """Refresh the access token using refresh token."""
         if not self.refresh_token:
             logger.error("No refresh token available")
             return False
             
         try:
-            url = "https://accounts.zoho.com/oauth/v2/token"
+            url = f"{self.accounts_domain}/oauth/v2/token"
             params = {
                 "refresh_token": self.refresh_token,
                 "client_id": self.client_id,
@@ -67,19 +124,20 @@ class ZohoDeskIntegration:
                 "grant_type": "refresh_token"
             }
             
-            async with aiohttp.ClientSession() as session:
-                async with session.post(url, data=params) as resp:
-                    if resp.status == 200:
-                        data = await resp.json()
-                        self.access_token = data.get("access_token")
-                        logger.info("Successfully refreshed Zoho access token")
-                        
-                        # Update .env file with new token
+            session = await self.get_session()
+            async with session.post(url, data=params, timeout=timeout or self.request_timeout) as resp:
+                if resp.status == 200:
+                    data = await resp.json()
+                    self.access_token = data.get("access_token")
+                    logger.info("Successfully refreshed Zoho access token")
+                    
+                    # Update .env file with new token (tenant tokens are kept in memory)
+                    if self.tenant_name is None:
                         self._update_env_token(self.access_token)
-                        return True
-                    else:
-                        logger.error(f"Failed to refresh token: {resp.status}")
-                        return False
+                    return True
+                else:
+                    logger.error(f"Failed to refresh token: {resp.status}")
+                    return False
         except Exception as e:
             logger.error(f"Error refreshing token: {e}")
             return False
@@ -101,6 +159,10 @@ class ZohoDeskIntegration:
         except Exception as e:
             logger.error(f"Error updating .env file: {e}")
     
+    def priority_for_mood(self, mood):
+        """Map the detected mood to a Zoho ticket priority."""
+        return self.mood_priorities.get(str(mood).strip().lower(), self.default_priority)
+    
     def get_headers(self):
         """Get API headers with authentication."""
         return {
@@ -109,20 +171,28 @@ class ZohoDeskIntegration:
             "Content-Type": "application/json"
         }
     
-    async def find_or_create_contact(self, phone_number, session):
+    async def find_or_create_contact(self, phone_number, session, timeout=None):
         """Find existing contact by phone or create new one."""
+        contact_id = await self.find_contact(phone_number, session, timeout)
+        if contact_id is None and self.auto_create_contact:
+            contact_id = await self.create_contact(phone_number, session, timeout)
+        return contact_id
+    
+    async def find_contact(self, phone_number, session, timeout=None):
+        """Search for an existing contact by phone (None if not found or on error)."""
+        timeout = timeout or self.contact_timeout
         try:
-            # Search for existing contact
             search_url = f"{self.api_domain}/api/v1/contacts/search"
             params = {"phone": phone_number}
             
-            async with session.get(search_url, headers=self.get_headers(), params=params) as resp:
+            async with session.get(search_url, headers=self.get_headers(), params=params, timeout=timeout) as resp:
                 if resp.status == 401:
                     # Token expired, try refresh
                     logger.info("Token expired, refreshing...")
-                    if await self.refresh_access_token():
+                    if await self.refresh_access_token(timeout):
                         # Retry with new token
-                        async with session.get(search_url, headers=self.get_headers(), params=params) as retry_resp:
+                        async with session.get(search_url, headers=self.get_headers(), params=params,
+                                               timeout=timeout) as retry_resp:
                             if retry_resp.status == 200:
                                 data = await retry_resp.json()
                                 contacts = data.get("data", [])
@@ -137,34 +207,54 @@ class ZohoDeskIntegration:
                         contact_id = contacts[0].get("id")
                         logger.info(f"Found existing Zoho contact: {contact_id} for {phone_number}")
                         return contact_id
+            return None
             
-            # Create new contact if not found
-            if self.auto_create_contact:
-                create_url = f"{self.api_domain}/api/v1/contacts"
-                contact_data = {
-                    "lastName": f"Customer {phone_number[-4:]}",
-                    "phone": phone_number,
-                    "description": f"Auto-created from Exotel call"
-                }
-                
-                async with session.post(create_url, headers=self.get_headers(), json=contact_data) as resp:
-                    if resp.status in [200, 201]:
-                        data = await resp.json()
-                        contact_id = data.get("id")
-                        logger.info(f"Created new Zoho contact: {contact_id} for {phone_number}")
-                        return contact_id
-                    else:
-                        logger.error(f"Failed to create Zoho contact: {resp.status} - {await resp.text()}")
-                        return None
-            
+        except Exception as e:
+            logger.error(f"Error finding Zoho contact: {e}")
             return None
+    
+    async def create_contact(self, phone_number, session, timeout=None):
+        """Create a contact for a phone number (None on error)."""
+        try:
+            create_url = f"{self.api_domain}/api/v1/contacts"
+            contact_data = {
+                "lastName": f"Customer {phone_number[-4:]}",
+                "phone": phone_number,
+                "description": f"Auto-created from Exotel call"
+            }
+            
+            async with session.post(create_url, headers=self.get_headers(), json=contact_data,
+                                    timeout=timeout or self.request_timeout) as resp:
+                if resp.status in [200, 201]:
+                    data = await resp.json()
+                    contact_id = data.get("id")
+                    logger.info(f"Created new Zoho contact: {contact_id} for {phone_number}")
+                    return contact_id
+                else:
+                    logger.error(f"Failed to create Zoho contact: {resp.status} - {await resp.text()}")
+                    return None
             
         except Exception as e:
-            logger.error(f"Error finding/creating Zoho contact: {e}")
+            logger.error(f"Error creating Zoho contact: {e}")
             return None
     
-    async def create_ticket(self, call_data):
-        """Create a support ticket in Zoho Desk for a call with transcription in notes."""
+    async def resolve_contact(self, phone_number, create=False, timeout=None):
+        """
+        Look up the contact for a phone number (None if disabled or not found).
+        Only creates it with create=True, i.e. once a ticket is actually being filed.
+        """
+        if not self.enabled or not self.auto_create_contact:
+            return None
+        session = await self.get_session()
+        if create:
+            return await self.find_or_create_contact(phone_number, session, timeout)
+        return await self.find_contact(phone_number, session, timeout)
+    
+    async def create_ticket(self, call_data, contact_id=None, timeout=None):
+        """
+        Create a support ticket in Zoho Desk for a call with transcription in notes.
+        timeout limits each Zoho request (default: the ticket stage's full share).
+        """
         if not self.enabled:
             logger.info("Zoho Desk integration not enabled, skipping")
             return False
@@ -201,79 +291,81 @@ Call ID: {call_sid}
 ---
 Auto-generated from Exotel call processing system"""
             
-            async with aiohttp.ClientSession() as session:
-                # Find or create contact
-                contact_id = None
-                if self.auto_create_contact:
-                    contact_id = await self.find_or_create_contact(customer_number, session)
-                
-                # Step 1: Create ticket
-                ticket_url = f"{self.api_domain}/api/v1/tickets"
-                
-                ticket_data = {
-                    "subject": f"Call from {customer_number} - {concern[:50]}",
-                    "departmentId": self.department_id,
-                    "description": description,
-                    "priority": self.default_priority,
-                    "channel": "Phone",
-                    "status": "Open"
-                }
-                
-                # Add contact if found/created
-                if contact_id:
-                    ticket_data["contactId"] = contact_id
-                
-                async with session.post(ticket_url, headers=self.get_headers(), json=ticket_data) as resp:
-                    if resp.status == 401:
-                        # Token expired, refresh and retry
-                        logger.info("Token expired during ticket creation, refreshing...")
-                        if await self.refresh_access_token():
-                            async with session.post(ticket_url, headers=self.get_headers(), json=ticket_data) as retry_resp:
-                                if retry_resp.status in [200, 201]:
-                                    data = await retry_resp.json()
-                                    ticket_id = data.get("id")
-                                    ticket_number = data.get("ticketNumber", "Unknown")
-                                    logger.info(f"✓ Created Zoho Desk ticket #{ticket_number} (ID: {ticket_id}) for call {call_sid}")
-                                    
-                                    # Step 2: Add transcription as a private note
-                                    if ticket_id and transcription:
-                                        note_added = await self.add_transcription_note(ticket_id, transcription, call_sid, session)
-                                        if note_added:
-                                            logger.info(f"✓ Added transcription note to ticket #{ticket_number}")
-                                        else:
-                                            logger.warning(f"⚠ Ticket created but failed to add transcription note")
-                                    
-                                    return True
-                                else:
-                                    error_text = await retry_resp.text()
-                                    logger.error(f"Failed to create Zoho ticket after refresh: {retry_resp.status} - {error_text}")
-                                    return False
-                    elif resp.status in [200, 201]:
-                        data = await resp.json()
-                        ticket_id = data.get("id")
-                        ticket_number = data.get("ticketNumber", "Unknown")
-                        logger.info(f"✓ Created Zoho Desk ticket #{ticket_number} (ID: {ticket_id}) for call {call_sid}")
-                        
-                        # Step 2: Add transcription as a private note
-                        if ticket_id and transcription:
-                            note_added = await self.add_transcription_note(ticket_id, transcription, call_sid, session)
-                            if note_added:
-                                logger.info(f"✓ Added transcription note to ticket #{ticket_number}")
+            timeout = timeout or self.request_timeout
+            session = await self.get_session()
+            # Find or create contact, unless it was resolved ahead of time
+            if contact_id is None and self.auto_create_contact:
+                contact_id = await self.find_or_create_contact(customer_number, session, timeout)
+            
+            # Step 1: Create ticket
+            ticket_url = f"{self.api_domain}/api/v1/tickets"
+            
+            ticket_data = {
+                "subject": f"Call from {customer_number} - {concern[:50]}",
+                "departmentId": self.department_id,
+                "description": description,
+                "priority": self.priority_for_mood(mood),
+                "channel": "Phone",
+                "status": "Open"
+            }
+            
+            # Add contact if found/created
+            if contact_id:
+                ticket_data["contactId"] = contact_id
+            
+            async with session.post(ticket_url, headers=self.get_headers(), json=ticket_data, timeout=timeout) as resp:
+                if resp.status == 401:
+                    # Token expired, refresh and retry
+                    logger.info("Token expired during ticket creation, refreshing...")
+                    if await self.refresh_access_token(timeout):
+                        async with session.post(ticket_url, headers=self.get_headers(), json=ticket_data,
+                                                timeout=timeout) as retry_resp:
+                            if retry_resp.status in [200, 201]:
+                                data = await retry_resp.json()
+                                ticket_id = data.get("id")
+                                ticket_number = data.get("ticketNumber", "Unknown")
+                                logger.info(f"✓ Created Zoho Desk ticket #{ticket_number} (ID: {ticket_id}) for call {call_sid}")
+                                
+                                # Step 2: Add transcription as a private note
+                                if ticket_id and transcription:
+                                    note_added = await self.add_transcription_note(ticket_id, transcription, call_sid, session, timeout)
+                                    if note_added:
+                                        logger.info(f"✓ Added transcription note to ticket #{ticket_number}")
+                                    else:
+                                        logger.warning(f"⚠ Ticket created but failed to add transcription note")
+                                
+                                return True
                             else:
-                                logger.warning(f"⚠ Ticket created but failed to add transcription note")
-                        
-                        return True
-                    else:
-                        error_text = await resp.text()
-                        logger.error(f"Failed to create Zoho ticket: {resp.status} - {error_text}")
-                        return False
+                                error_text = await retry_resp.text()
+                                logger.error(f"Failed to create Zoho ticket after refresh: {retry_resp.status} - {error_text}")
+                                return False
+                elif resp.status in [200, 201]:
+                    data = await resp.json()
+                    ticket_id = data.get("id")
+                    ticket_number = data.get("ticketNumber", "Unknown")
+                    logger.info(f"✓ Created Zoho Desk ticket #{ticket_number} (ID: {ticket_id}) for call {call_sid}")
+                    
+                    # Step 2: Add transcription as a private note
+                    if ticket_id and transcription:
+                        note_added = await self.add_transcription_note(ticket_id, transcription, call_sid, session, timeout)
+                        if note_added:
+                            logger.info(f"✓ Added transcription note to ticket #{ticket_number}")
+                        else:
+                            logger.warning(f"⚠ Ticket created but failed to add transcription note")
+                    
+                    return True
+                else:
+                    error_text = await resp.text()
+                    logger.error(f"Failed to create Zoho ticket: {resp.status} - {error_text}")
+                    return False
                         
         except Exception as e:
             logger.error(f"Error creating Zoho Desk ticket: {e}")
             return False
     
-    async def add_transcription_note(self, ticket_id, transcription, call_sid, session):
+    async def add_transcription_note(self, ticket_id, transcription, call_sid, session, timeout=None):
         """Add transcription as a note to an existing ticket."""
+        timeout = timeout or self.request_timeout
         try:
             note_url = f"{self.api_domain}/api/v1/tickets/{ticket_id}/comments"
             
@@ -291,11 +383,12 @@ Call ID: {call_sid}
                 "contentType": "plainText"
             }
             
-            async with session.post(note_url, headers=self.get_headers(), json=note_data) as resp:
+            async with session.post(note_url, headers=self.get_headers(), json=note_data, timeout=timeout) as resp:
                 if resp.status == 401:
                     # Token expired, refresh and retry
-                    if await self.refresh_access_token():
-                        async with session.post(note_url, headers=self.get_headers(), json=note_data) as retry_resp:
+                    if await self.refresh_access_token(timeout):
+                        async with session.post(note_url, headers=self.get_headers(), json=note_data,
+                                                timeout=timeout) as retry_resp:
                             return retry_resp.status in [200, 201]
                 return resp.status in [200, 201]
                     
@@ -309,6 +402,7 @@ class AgentManager:
         self.config_file = config_file
         self.agents = {}
         self.default_agent = {}
+        self.settings = {}
         self.load_config()
     
     def load_config(self):
@@ -319,6 +413,7 @@ class AgentManager:
                     config = json.load(f)
                     self.agents = config.get('agents', {})
                     self.default_agent = config.get('default_agent', {})
+                    self.settings = config.get('settings', {})
                 logger.info(f"Loaded {len(self.agents)} agents from config")
             else:
                 logger.warning(f"Config file {self.config_file} not found, using defaults")
@@ -340,37 +435,96 @@ class AgentManager:
 
 
 class ZohoCallProcessor:
-    def __init__(self):
-        self.agent_manager = AgentManager()
-        self.zoho_desk = ZohoDeskIntegration()
-        self.processed_calls = set()
-        self.load_processed_calls()
-        
-        # Get credentials from environment
-        self.exotel_sid = os.getenv('EXOTEL_SID')
-        self.exotel_api_key = os.getenv('EXOTEL_API_KEY')
-        self.exotel_api_token = os.getenv('EXOTEL_API_TOKEN')
-        self.deepgram_api_key = os.getenv('DEEPGRAM_API_KEY')
-        self.openai_api_key = os.getenv('OPENAI_API_KEY')
-        
-    def load_processed_calls(self):
-        """Load previously processed calls to avoid duplicates."""
-        try:
-            if os.path.exists('processed_calls.json'):
-                with open('processed_calls.json', 'r') as f:
-                    self.processed_calls = set(json.load(f))
-                logger.info(f"Loaded {len(self.processed_calls)} previously processed calls")
-        except Exception as e:
-            logger.error(f"Error loading processed calls: {e}")
-            self.processed_calls = set()
+    def __init__(self, tenant=None, shared=None):
+        # Multi-tenant mode: per-tenant settings and state files, shared pools and caches
+        self.tenant = tenant
+        self.tenant_name = tenant['name'] if tenant else None
+        self.label = f"[{self.tenant_name}] " if tenant else ""
+        self.shared = shared
+        if tenant:
+            os.makedirs(tenant['data_dir'], exist_ok=True)
+        exotel = tenant.get('exotel', {}) if tenant else None
+        
+        self.agent_manager = AgentManager(tenant.get('agents_config', 'agents_config.json') if tenant else 'agents_config.json')
+        self.zoho_desk = ZohoDeskIntegration(tenant, shared)
+        self.ticket_scheduler = PriorityTicketScheduler(
+            self.zoho_desk.create_ticket,
+            department_weights=self.agent_manager.settings.get('department_priority', {})
+        )
+        self.screener = shared.screener if shared else AudioScreener()
+        self.segmenter = shared.segmenter if shared else TranscriptSegmenter()
+        self.keyword_analyzer = shared.keyword_analyzer if shared else KeywordAnalyzer()
+        self.analysis_router = AnalysisRouter(self.keyword_analyzer)
+        # Exact recent Sids + rotating Bloom generations, bounded in memory
+        self.processed_calls = DedupeWindow(
+            tenant_path(tenant, 'processed_calls.json'),
+            timezone=tenant_setting(exotel, 'timezone', 'EXOTEL_TIMEZONE', 'Asia/Kolkata')
+        )
+        # Failed calls: skipped by polling, retried on a backoff schedule up to a max attempt count
+        self.dead_letters = DeadLetterStore(tenant_path(tenant, 'dead_letters.db'))
+        # Searchable local copy of every transcript, indexed as calls complete
+        self.transcript_archive = TranscriptArchive(tenant_path(tenant, 'transcripts.db'))
+        self.recordings_dir = tenant_path(tenant, 'recordings') or 'recordings'
+        
+        # Coordination with other processor instances (lease-based claims + optional sharding)
+        self.claim_store = create_claim_store(path=tenant_path(tenant, 'call_claims.db'))
+        self.held_claims = set()
+        self.shard_count = int(os.getenv('WORKER_SHARD_COUNT', '1'))
+        self.shard_index = int(os.getenv('WORKER_SHARD_INDEX', '0'))
+        
+        # Get credentials from environment (or the tenant's "exotel" section)
+        self.exotel_sid = tenant_setting(exotel, 'sid', 'EXOTEL_SID', inherit=False)
+        self.exotel_api_key = tenant_setting(exotel, 'api_key', 'EXOTEL_API_KEY', inherit=False)
+        self.exotel_api_token = tenant_setting(exotel, 'api_token', 'EXOTEL_API_TOKEN', inherit=False)
+        self.page_size = int(tenant_setting(exotel, 'page_size', 'EXOTEL_PAGE_SIZE', '10'))
+        self.last_page_full = False
+        self.deepgram_api_key = tenant_setting(tenant, 'deepgram_api_key', 'DEEPGRAM_API_KEY')
+        
+        # Exotel request budget per account (0 = unlimited); backfill paging has its own
+        # budget so live polling is not starved
+        self.exotel_rate_limiter = AsyncRateLimiter(float(
+            tenant_setting(exotel, 'requests_per_second', 'EXOTEL_REQUESTS_PER_SECOND', '0')))
+        self.backfill_rate_limiter = AsyncRateLimiter(float(
+            tenant_setting(exotel, 'backfill_requests_per_second', 'BACKFILL_EXOTEL_REQUESTS_PER_SECOND', '2')))
+        
+        # Calls processed concurrently per cycle; analysis requests within the
+        # batch window are combined into one LLM call
+        self.max_concurrent_calls = int(tenant_setting(tenant, 'max_concurrent_calls', 'MAX_CONCURRENT_CALLS', '4'))
+        self.analysis_provider = shared.analysis_provider if shared else create_analysis_provider(
+            default_primary='openai', windower=TranscriptWindower(self.keyword_analyzer)
+        )
+        self.analysis_batcher = BatchingAnalyzer(
+            self._analyze_batch,
+            window_seconds=float(os.getenv('ANALYSIS_BATCH_WINDOW_SECONDS', '0.5')),
+            max_batch_size=int(os.getenv('ANALYSIS_BATCH_MAX_SIZE', '10'))
+        )
+        
+        # Shared HTTP session and graceful shutdown state
+        self.session = None
+        self.deadlines = shared.deadlines if shared else DeadlineBudget()
+        self.heartbeat_task = None
+        self.shutdown_event = shared.shutdown_event if shared else asyncio.Event()
+        self.drain_seconds = float(os.getenv('SHUTDOWN_DRAIN_SECONDS', '60'))
     
-    def save_processed_calls(self):
-        """Save processed calls list."""
-        try:
-            with open('processed_calls.json', 'w') as f:
-                json.dump(list(self.processed_calls), f)
-        except Exception as e:
-            logger.error(f"Error saving processed calls: {e}")
+    async def get_session(self):
+        """Shared HTTP session for Exotel, Deepgram and LLM requests."""
+        if self.shared is not None:
+            return await self.shared.get_session()
+        if self.session is None or self.session.closed:
+            # No request may outlive a whole call's deadline; stages pass tighter timeouts
+            self.session = aiohttp.ClientSession(timeout=aiohttp.ClientTimeout(total=self.deadlines.total_seconds))
+        return self.session
+    
+    def request_timeout(self, stage):
+        """aiohttp timeout of a stage's full share of the call deadline."""
+        return aiohttp.ClientTimeout(total=self.deadlines.stage_seconds(stage))
+    
+    async def _analyze_batch(self, items):
+        return await self.analysis_provider.analyze_batch(items, session=await self.get_session())
+        
+    def save_processed_calls(self, full=False):
+        """Save the processed calls dedupe window (once per cycle; full at shutdown)."""
+        self.processed_calls.save(full=full)
     
     async def fetch_latest_calls(self):
         """Fetch latest calls from Exotel API."""
@@ -381,168 +535,231 @@ class ZohoCallProcessor:
         url = f"https://api.exotel.com/v1/Accounts/{self.exotel_sid}/Calls.json"
         
         try:
-            async with aiohttp.ClientSession() as session:
-                auth = aiohttp.BasicAuth(self.exotel_api_key, self.exotel_api_token)
-                params = {'PageSize': 10, 'Page': 0}
-                async with session.get(url, auth=auth, params=params) as resp:
-                    if resp.status == 200:
-                        data = await resp.json()
-                        calls = data.get('Calls', [])
-                        
-                        # Filter for completed calls with recordings
-                        completed_calls = []
-                        for call in calls:
-                            if (call.get('Status') == 'completed' and 
-                                call.get('RecordingUrl') and
-                                call.get('Sid') not in self.processed_calls):
-                                completed_calls.append(call)
-                        
-                        logger.info(f"Found {len(completed_calls)} new calls to process")
-                        return completed_calls
-                    else:
-                        logger.error(f"Failed to fetch calls: {resp.status}")
-                        return []
+            await self.exotel_rate_limiter.acquire()
+            session = await self.get_session()
+            auth = aiohttp.BasicAuth(self.exotel_api_key, self.exotel_api_token)
+            params = {'PageSize': self.page_size, 'Page': 0}
+            async with session.get(url, auth=auth, params=params, timeout=self.request_timeout('fetch')) as resp:
+                if resp.status == 200:
+                    data = await resp.json()
+                    calls = data.get('Calls', [])
+                    completed_calls = self._filter_new_calls(calls)
+                    
+                    # A full page of unseen calls means more may be waiting beyond page 0
+                    self.last_page_full = len(calls) >= self.page_size and len(completed_calls) == len(calls)
+                    
+                    logger.info(f"Found {len(completed_calls)} new calls to process")
+                    return completed_calls
+                else:
+                    logger.error(f"Failed to fetch calls: {resp.status}")
+                    return []
         except Exception as e:
             logger.error(f"Error fetching calls: {e}")
             return []
     
-    async def download_recording(self, call_id, recording_url):
-        """Download call recording from Exotel."""
+    def _filter_new_calls(self, calls, backfill=False):
+        """Filter for completed calls with recordings that were not processed yet."""
+        completed_calls = []
+        bloom_skipped = []
+        for call in calls:
+            if not (call.get('Status') == 'completed' and call.get('RecordingUrl')):
+                continue
+            seen = self.processed_calls.lookup(call.get('Sid'), call.get('DateCreated'))
+            if seen == 'bloom' and backfill:
+                bloom_skipped.append(call.get('Sid'))
+            if (not seen and
+                in_shard(call.get('Sid'), self.shard_index, self.shard_count) and
+                not self.claim_store.is_done(call.get('Sid')) and
+                not self.dead_letters.is_blocked(call.get('Sid'))):
+                completed_calls.append(call)
+        if bloom_skipped:
+            # Bloom matches can be false positives; list them so they can be replayed by hand
+            logger.warning(f"{self.label}Backfill skipped {len(bloom_skipped)} calls only the Bloom filter "
+                           f"remembers (probably processed): {', '.join(bloom_skipped)}")
+        return completed_calls
+    
+    async def fetch_calls_in_window(self, session, window):
+        """Fetch every new call created in a backfill window, following Exotel paging."""
+        url = f"https://api.exotel.com/v1/Accounts/{self.exotel_sid}/Calls.json"
+        auth = aiohttp.BasicAuth(self.exotel_api_key, self.exotel_api_token)
+        params = {'DateCreated': exotel_date_filter(window), 'PageSize': 100, 'SortBy': 'DateCreated:asc'}
+        
+        calls = []
+        while url:
+            await self.backfill_rate_limiter.acquire()
+            async with session.get(url, auth=auth, params=params, timeout=self.request_timeout('fetch')) as resp:
+                if resp.status != 200:
+                    raise RuntimeError(f"Exotel returned {resp.status}")
+                data = await resp.json()
+            
+            calls.extend(self._filter_new_calls(data.get('Calls', []), backfill=True))
+            next_page = data.get('Metadata', {}).get('NextPageUri')
+            url = f"https://api.exotel.com{next_page}" if next_page else None
+            params = None  # NextPageUri already carries the filters
+        
+        return calls
+    
+    async def download_recording(self, call_id, recording_url, timeout=None, rate_limiter=None):
+        """Download call recording from Exotel (under the live or the given, e.g. backfill, request budget)."""
         try:
-            filename = f"recordings/{call_id}.mp3"
-            os.makedirs("recordings", exist_ok=True)
+            filename = os.path.join(self.recordings_dir, f"{call_id}.mp3")
+            os.makedirs(self.recordings_dir, exist_ok=True)
             
-            async with aiohttp.ClientSession() as session:
-                auth = aiohttp.BasicAuth(self.exotel_api_key, self.exotel_api_token)
-                async with session.get(recording_url, auth=auth) as resp:
-                    if resp.status == 200:
-                        with open(filename, 'wb') as f:
-                            f.write(await resp.read())
-                        logger.info(f"Downloaded recording: {filename}")
-                        return filename
-                    else:
-                        logger.error(f"Failed to download recording: {resp.status}")
-                        return None
+            await (rate_limiter or self.exotel_rate_limiter).acquire()
+            session = await self.get_session()
+            auth = aiohttp.BasicAuth(self.exotel_api_key, self.exotel_api_token)
+            async with session.get(recording_url, auth=auth, timeout=timeout or self.request_timeout('download')) as resp:
+                if resp.status == 200:
+                    with open(filename, 'wb') as f:
+                        f.write(await resp.read())
+                    logger.info(f"Downloaded recording: {filename}")
+                    return filename
+                elif resp.status in (404, 410):
+                    raise PermanentCallError(f"Recording no longer available ({resp.status})")
+                else:
+                    logger.error(f"Failed to download recording: {resp.status}")
+                    return None
+        except PermanentCallError:
+            raise
         except Exception as e:
             logger.error(f"Error downloading recording: {e}")
             return None
     
     async def transcribe_audio(self, audio_file):
         """Transcribe audio using Deepgram."""
+        result = await self.transcribe_recording(audio_file)
+        return result['transcript'] if result else None
+    
+    async def transcribe_recording(self, audio_file, timeout=None):
+        """Transcribe audio using Deepgram, returning the transcript and word timings."""
         if not self.deepgram_api_key:
             logger.error("Deepgram API key not configured")
             return None
         
         try:
-            url = "https://api.deepgram.com/v1/listen"
-            
             with open(audio_file, 'rb') as f:
                 audio_data = f.read()
             
-            headers = {
-                "Authorization": f"Token {self.deepgram_api_key}",
-                "Content-Type": "audio/mpeg"
-            }
+            timeout = timeout or self.request_timeout('transcribe')
+            session = await self.get_session()
+            # Long recordings are split and transcribed concurrently
+            segments = self.segmenter.split(audio_data)
+            if segments:
+                logger.info(f"Transcribing {audio_file} in {len(segments)} parallel segments")
+                result = await self._transcribe_segments(session, segments, timeout)
+                if result is None:
+                    logger.warning("Segmented transcription failed, retrying as a single request")
+                    result = await self._deepgram_request(session, audio_data, timeout)
+            else:
+                result = await self._deepgram_request(session, audio_data, timeout)
             
-            async with aiohttp.ClientSession() as session:
-                async with session.post(url, headers=headers, data=audio_data) as resp:
-                    if resp.status == 200:
-                        data = await resp.json()
-                        transcript = data.get('results', {}).get('channels', [{}])[0].get('alternatives', [{}])[0].get('transcript', '')
-                        logger.info(f"Transcription completed: {len(transcript)} characters")
-                        return transcript
-                    else:
-                        logger.error(f"Transcription failed: {resp.status}")
-                        return None
+            if result is None:
+                return None
+            logger.info(f"Transcription completed: {len(result['transcript'])} characters")
+            return result
         except Exception as e:
             logger.error(f"Error transcribing audio: {e}")
             return None
     
-    async def analyze_concern_and_mood(self, transcript):
-        """Analyze concern and mood from transcript using OpenAI."""
-        if not self.openai_api_key:
-            logger.warning("OpenAI API key not configured, using keyword analysis")
+    async def _deepgram_request(self, session, audio_data, timeout):
+        """Send one chunk of MP3 audio to Deepgram."""
+        url = "https://api.deepgram.com/v1/listen"
+        
+        headers = {
+            "Authorization": f"Token {self.deepgram_api_key}",
+            "Content-Type": "audio/mpeg"
+        }
+        params = {
+            "punctuate": "true",
+            "diarize": "true"
+        }
+        
+        async with session.post(url, headers=headers, params=params, data=audio_data, timeout=timeout) as resp:
+            if resp.status == 200:
+                return parse_deepgram_response(await resp.json())
+            else:
+                logger.error(f"Transcription failed: {resp.status}")
+                return None
+    
+    async def _transcribe_segments(self, session, segments, timeout):
+        """Transcribe segments concurrently and stitch the results."""
+        semaphore = asyncio.Semaphore(self.segmenter.max_parallel)
+        
+        async def transcribe_segment(segment):
+            async with semaphore:
+                return await self._deepgram_request(session, segment['data'], timeout)
+        
+        results = await asyncio.gather(
+            *(transcribe_segment(segment) for segment in segments),
+            return_exceptions=True
+        )
+        for result in results:
+            if isinstance(result, Exception):
+                logger.error(f"Segment transcription error: {result}")
+                return None
+            if result is None:
+                return None
+        
+        return self.segmenter.stitch(segments, results)
+    
+    async def analyze_concern_and_mood(self, transcript, words=None):
+        """Analyze concern and mood, using the LLM only when keywords are not conclusive."""
+        local = self.analysis_router.classify_locally(transcript)
+        if local:
+            return local
+        
+        if not self.analysis_provider.configured:
+            logger.warning("No LLM provider configured, using keyword analysis")
+            self.analysis_router.record('fallback')
             return self._analyze_with_keywords(transcript)
         
+        # Batched request first; calls missing from a partly answered batch are
+        # retried alone, but a batch that failed outright goes straight to keywords.
+        # Transcripts are windowed to the provider's token budget, not truncated
         try:
-            url = "https://api.openai.com/v1/chat/completions"
-            
-            headers = {
-                "Authorization": f"Bearer {self.openai_api_key}",
-                "Content-Type": "application/json"
-            }
-            
-            payload = {
-                "model": "gpt-4o-mini",
-                "messages": [
-                    {
-                        "role": "system",
-                        "content": "You are an AI assistant analyzing customer service calls. Provide a brief concern summary (1-2 sentences) and mood (Positive/Neutral/Negative/Urgent)."
-                    },
-                    {
-                        "role": "user",
-                        "content": f"Analyze this call transcript and provide:\n1. Main concern (brief)\n2. Customer mood\n\nTranscript: {transcript[:1000]}"
-                    }
-                ],
-                "temperature": 0.3,
-                "max_tokens": 150
-            }
-            
-            async with aiohttp.ClientSession() as session:
-                async with session.post(url, headers=headers, json=payload) as resp:
-                    if resp.status == 200:
-                        data = await resp.json()
-                        response = data['choices'][0]['message']['content']
-                        
-                        # Parse response
-                        lines = response.split('\n')
-                        concern = "Call inquiry"
-                        mood = "Neutral"
-                        
-                        for line in lines:
-                            if 'concern' in line.lower() or '1.' in line:
-                                concern = line.split(':', 1)[-1].strip()
-                            elif 'mood' in line.lower() or '2.' in line:
-                                mood = line.split(':', 1)[-1].strip()
-                        
-                        return concern, mood
-                    else:
-                        logger.warning(f"OpenAI API error: {resp.status}, using keyword analysis")
-                        return self._analyze_with_keywords(transcript)
-                        
-        except Exception as e:
-            logger.warning(f"Error with OpenAI analysis: {e}, using keyword analysis")
+            result = await self.analysis_batcher.analyze(transcript, words=words)
+            if result is None:
+                logger.warning("Call missing from batched analysis, retrying individually")
+                results = await self._analyze_batch([{'id': '1', 'transcript': transcript, 'words': words}])
+                result = results.get('1')
+        except BatchAnalysisFailed as e:
+            logger.warning(f"Batched analysis failed ({e})")
+            result = None
+        
+        if result is None:
+            logger.warning(f"{self.analysis_provider.name} analysis unavailable, using keyword analysis")
+            self.analysis_router.record('fallback')
             return self._analyze_with_keywords(transcript)
+        
+        self.analysis_router.record('llm')
+        return result
     
     def _analyze_with_keywords(self, transcript):
         """Fallback keyword-based analysis."""
-        transcript_lower = transcript.lower()
-        
-        # Mood analysis
-        if any(word in transcript_lower for word in ['urgent', 'emergency', 'immediately', 'asap']):
-            mood = "Urgent"
-        elif any(word in transcript_lower for word in ['angry', 'frustrated', 'disappointed', 'upset']):
-            mood = "Negative"
-        elif any(word in transcript_lower for word in ['thank', 'great', 'happy', 'satisfied', 'excellent']):
-            mood = "Positive"
-        else:
-            mood = "Neutral"
-        
-        # Concern analysis
-        if any(word in transcript_lower for word in ['billing', 'payment', 'charge', 'invoice']):
-            concern = "Billing inquiry"
-        elif any(word in transcript_lower for word in ['technical', 'not working', 'error', 'problem', 'issue']):
-            concern = "Technical support request"
-        elif any(word in transcript_lower for word in ['refund', 'return', 'cancel']):
-            concern = "Refund/cancellation request"
-        elif any(word in transcript_lower for word in ['question', 'how to', 'help with']):
-            concern = "General inquiry - assistance needed"
-        else:
-            concern = f"Call regarding: {transcript[:100]}..."
+        result = self.keyword_analyzer.analyze(transcript)
         
-        return concern, mood
+        concern = result['concern'] or f"Call regarding: {transcript[:100]}..."
+        return concern, result['mood']
     
-    async def process_call(self, call):
+    async def process_call(self, call, rate_limiter=None):
+        """
+        Process a single call under a lease, so only one worker ever handles it.
+        rate_limiter overrides the Exotel request budget for its download (backfill).
+        """
+        call_id = call.get('Sid')
+        if not self.claim_store.claim(call_id):
+            logger.info(f"Call {call_id} is done or being processed by another worker, skipping")
+            return False
+        
+        self.held_claims.add(call_id)
+        try:
+            return await self._process_claimed_call(call, rate_limiter)
+        finally:
+            self.held_claims.discard(call_id)
+            if not self.claim_store.is_done(call_id):
+                self.claim_store.release(call_id)
+    
+    async def _process_claimed_call(self, call, rate_limiter=None):
         """Process a single call."""
         call_id = call.get('Sid')
         logger.info(f"Processing call: {call_id}")
@@ -572,27 +789,13 @@ class ZohoCallProcessor:
                     break
             
             if not agent_number:
-                logger.warning(f"No agent detected for call {call_id}, skipping")
-                return False
+                # Not a call for any configured agent: skipped on purpose, not a failure
+                logger.info(f"No agent detected for call {call_id}, skipping")
+                self.mark_processed(call_id)
+                return True
             
             agent_info = self.agent_manager.agents[agent_number]
             
-            # Step 1: Download recording
-            file_path = await self.download_recording(call_id, recording_url)
-            if not file_path:
-                logger.error(f"Failed to download recording for {call_id}")
-                return False
-            
-            # Step 2: Transcribe
-            transcript = await self.transcribe_audio(file_path)
-            if not transcript:
-                logger.error(f"Failed to transcribe {call_id}")
-                return False
-            
-            # Step 3: Analyze concern and mood
-            concern, mood = await self.analyze_concern_and_mood(transcript)
-            
-            # Step 4: Create Zoho Desk ticket
             ticket_data = {
                 "call_id": call_id,
                 "customer_number": customer_number,
@@ -602,72 +805,613 @@ class ZohoCallProcessor:
                 "duration": duration,
                 "formatted_date": call_time,
                 "recording_url": recording_url,
-                "call_direction": direction,
-                "concern": concern,
-                "mood": mood,
-                "transcript": transcript
+                "call_direction": direction
             }
             
-            success = await self.zoho_desk.create_ticket(ticket_data)
+            deadline = self.deadlines.start()
             
-            if success:
-                self.processed_calls.add(call_id)
-                self.save_processed_calls()
-                logger.info(f"Successfully processed call {call_id}")
-                return True
-            else:
-                logger.error(f"Failed to create ticket for {call_id}")
+            # Pre-screen: sub-threshold calls never need the recording
+            verdict = self.screener.screen_duration(duration_seconds)
+            if verdict != CONVERSATION:
+                if await deadline.run('ticket', self.handle_screened_call(ticket_data, verdict, deadline.timeout('ticket'))):
+                    return True
+                self.dead_letters.record_failure(call, 'ticket', "Failed to create ticket for screened call")
                 return False
+            
+            # Each stage starts as soon as its inputs are ready: the Zoho
+            # contact search only needs the customer number, so it runs
+            # alongside download, screening, transcription and analysis
+            # (the contact is only created once a ticket is being filed).
+            # Every stage is cancelled once its share of the call deadline is used up;
+            # the contact lookup is optional (create_ticket looks it up again on None).
+            graph = TaskGraph(name=f"call {call_id}", deadline=deadline)
+            graph.add('contact', lambda: self.zoho_desk.resolve_contact(
+                customer_number, timeout=deadline.timeout('contact')), optional=True)
+            graph.add('download', lambda: self._download_stage(
+                call_id, recording_url, deadline.timeout('download'), rate_limiter))
+            # The worker thread cannot be cancelled, so ffmpeg itself gets the stage's time
+            graph.add('screen', lambda file_path: asyncio.to_thread(
+                self.screen_recording, duration_seconds, file_path, deadline.stage_seconds('screen')), deps=['download'])
+            graph.add('transcribe', lambda file_path, verdict: self._transcribe_stage(
+                file_path, verdict, deadline.timeout('transcribe')), deps=['download', 'screen'])
+            graph.add('analyze', self._analyze_stage, deps=['screen', 'transcribe'])
+            graph.add('ticket', lambda verdict, analysis, contact_id: self._ticket_stage(
+                ticket_data, verdict, analysis, contact_id, deadline.timeout('ticket')),
+                deps=['screen', 'analyze', 'contact'])
+            
+            await graph.run()
+            logger.info(f"Successfully processed call {call_id}")
+            return True
                 
+        except TaskGraphError as e:
+            logger.error(f"Failed to process call {call_id} at stage '{e.stage}': {e.error}")
+            self.dead_letters.record_failure(call, e.stage, e.error,
+                                             permanent=isinstance(e.error, PermanentCallError))
+            return False
         except Exception as e:
             logger.error(f"Error processing call {call_id}: {e}")
+            self.dead_letters.record_failure(call, 'process', e)
             return False
     
+    async def _download_stage(self, call_id, recording_url, timeout, rate_limiter=None):
+        """Step 1: Download recording."""
+        file_path = await self.download_recording(call_id, recording_url, timeout, rate_limiter)
+        if not file_path:
+            raise RuntimeError("Failed to download recording")
+        return file_path
+    
+    async def _transcribe_stage(self, file_path, verdict, timeout):
+        """Step 2: Transcribe (skipped for screened recordings)."""
+        if verdict != CONVERSATION:
+            return None
+        transcription = await self.transcribe_recording(file_path, timeout)
+        if not transcription or not transcription['transcript']:
+            raise RuntimeError("Transcription failed")
+        return transcription
+    
+    async def _analyze_stage(self, verdict, transcription):
+        """Step 3: Analyze concern and mood."""
+        if verdict != CONVERSATION:
+            logger.info(f"Recording screened as '{verdict}', skipped transcription")
+            return SCREENED_CONCERNS[verdict], "Neutral", ""
+        transcript = transcription['transcript']
+        concern, mood = await self.analyze_concern_and_mood(transcript, transcription['words'])
+        return concern, mood, transcript
+    
+    async def _ticket_stage(self, ticket_data, verdict, analysis, contact_id, timeout=None):
+        """Step 4: Create Zoho Desk ticket with the pre-resolved contact."""
+        call_id = ticket_data["call_id"]
+        if verdict != CONVERSATION and self.screener.action == 'drop':
+            self.mark_processed(call_id)
+            return True
+        
+        # Speculative search found nothing (or gave up): create the contact now
+        if contact_id is None:
+            contact_id = await self.zoho_desk.resolve_contact(ticket_data["customer_number"], create=True,
+                                                              timeout=timeout)
+        
+        concern, mood, transcript = analysis
+        ticket_data.update({
+            "concern": concern,
+            "mood": mood,
+            "transcript": transcript
+        })
+        
+        # Urgent calls jump the ticket queue when tickets back up
+        if not await self.ticket_scheduler.submit(ticket_data, contact_id=contact_id, timeout=timeout):
+            raise RuntimeError("Failed to create Zoho Desk ticket")
+        
+        self.mark_processed(call_id)
+        self.archive_transcript(ticket_data)
+        return True
+    
+    def archive_transcript(self, ticket_data):
+        """Add a completed call to the local transcript archive."""
+        self.transcript_archive.add({
+            'sid': ticket_data['call_id'],
+            'call_time': ticket_data.get('formatted_date'),
+            'agent_name': ticket_data.get('agent_name'),
+            'agent_number': ticket_data.get('agent_number'),
+            'department': ticket_data.get('agent_department'),
+            'customer_number': ticket_data.get('customer_number'),
+            'direction': ticket_data.get('call_direction'),
+            'duration': ticket_data.get('duration'),
+            'concern': ticket_data.get('concern'),
+            'mood': ticket_data.get('mood'),
+            'recording_url': ticket_data.get('recording_url'),
+            'transcript': ticket_data.get('transcript')
+        })
+    
+    def mark_processed(self, call_id):
+        """Record a call as done so it is never processed again (by any worker)."""
+        self.claim_store.complete(call_id)
+        self.dead_letters.resolve(call_id)
+        self.processed_calls.add(call_id)
+    
+    def screen_recording(self, duration_seconds, file_path, timeout=30):
+        """Run audio screening on a downloaded recording (blocking, ffmpeg limited to timeout seconds)."""
+        try:
+            with open(file_path, 'rb') as f:
+                audio_bytes = f.read()
+            return self.screener.screen(duration_seconds, audio_bytes, timeout)
+        except Exception as e:
+            logger.warning(f"Error screening {file_path}: {e}")
+            return CONVERSATION
+    
+    async def handle_screened_call(self, ticket_data, verdict, timeout=None):
+        """Handle a call with no conversation without transcription or LLM analysis."""
+        call_id = ticket_data["call_id"]
+        logger.info(f"Call {call_id} screened as '{verdict}', skipping transcription")
+        
+        if self.screener.action == 'drop':
+            success = True
+        else:
+            ticket_data.update({
+                "concern": SCREENED_CONCERNS[verdict],
+                "mood": "Neutral",
+                "transcript": ""
+            })
+            success = await self.ticket_scheduler.submit(ticket_data, timeout=timeout)
+        
+        if success:
+            self.mark_processed(call_id)
+            return True
+        
+        logger.error(f"Failed to create ticket for screened call {call_id}")
+        return False
+    
     async def run_monitoring_cycle(self):
-        """Run one monitoring cycle."""
-        logger.info("Starting monitoring cycle...")
+        """Run one monitoring cycle; returns (new Exotel call count, whether the Exotel page was full)."""
+        logger.info(f"{self.label}Starting monitoring cycle...")
         
         # Fetch new calls
+        self.last_page_full = False
         calls = await self.fetch_latest_calls()
+        # Only fresh Exotel traffic drives the poll interval, not dead-letter retries
+        new_calls = len(calls)
+        calls += self.due_dead_letters(exclude={call.get('Sid') for call in calls})
         
         if not calls:
             logger.info("No new calls to process")
-            return
+            return 0, False
         
-        # Process each call
-        processed_count = 0
-        for call in calls:
-            success = await self.process_call(call)
-            if success:
-                processed_count += 1
+        # Process calls concurrently so their analysis requests can be batched
+        semaphore = asyncio.Semaphore(self.max_concurrent_calls)
         
-        logger.info(f"Monitoring cycle complete: {processed_count}/{len(calls)} calls processed")
+        async def process_with_limit(call):
+            async with semaphore, self.call_slot():
+                if self.shutdown_event.is_set():
+                    return False  # Left unclaimed for the next run
+                return await self.process_call(call)
+        
+        results = await asyncio.gather(*(process_with_limit(call) for call in calls))
+        processed_count = sum(1 for success in results if success)
+        self.save_processed_calls()
+        
+        logger.info(f"{self.label}Monitoring cycle complete: {processed_count}/{len(calls)} calls processed")
+        logger.info(f"{self.label}Analysis tiers: {self.analysis_router.summary()}")
+        return new_calls, self.last_page_full
+    
+    @asynccontextmanager
+    async def call_slot(self):
+        """Hold one of the process-wide call slots, shared fairly between tenants (no-op without tenants)."""
+        if self.shared is None:
+            yield
+            return
+        async with self.shared.call_slots.slot(self.tenant_name):
+            yield
+    
+    def due_dead_letters(self, exclude=()):
+        """Failed calls whose scheduled retry is due (at most one batch per cycle)."""
+        due = []
+        for call in self.dead_letters.due(limit=self.max_concurrent_calls):
+            sid = call.get('Sid')
+            if sid in exclude or not in_shard(sid, self.shard_index, self.shard_count):
+                continue
+            if self.claim_store.is_done(sid):
+                self.dead_letters.resolve(sid)
+                continue
+            due.append(call)
+        if due:
+            logger.info(f"Retrying {len(due)} failed calls from the dead-letter store")
+        return due
     
-    async def run_continuous(self, interval_minutes=1):
-        """Run continuous monitoring."""
-        logger.info(f"Starting continuous monitoring (checking every {interval_minutes} minute(s))")
-        logger.info(f"Configured agents: {list(self.agent_manager.agents.keys())}")
+    async def replay_dead_letters(self, calls):
+        """Run dead-lettered calls through the pipeline again (CLI replay)."""
+        semaphore = asyncio.Semaphore(self.max_concurrent_calls)
         
+        async def replay(call):
+            async with semaphore:
+                if self.shutdown_event.is_set():
+                    return False
+                if self.claim_store.is_done(call.get('Sid')):
+                    self.dead_letters.resolve(call.get('Sid'))
+                    return True
+                return await self.process_call(call)
+        
+        self.install_signal_handlers()
+        self.heartbeat_task = asyncio.create_task(self.heartbeat_claims())
+        try:
+            results = await self.drain(asyncio.gather(*(replay(call) for call in calls))) or []
+        finally:
+            await self.close()
+        
+        replayed = sum(1 for success in results if success)
+        logger.info(f"Replayed {replayed}/{len(calls)} dead-lettered calls")
+        return replayed == len(calls)
+    
+    async def heartbeat_claims(self):
+        """Keep leases on in-flight calls alive while they are being processed."""
+        interval = self.claim_store.lease_seconds / 3
         while True:
+            await asyncio.sleep(interval)
+            try:
+                self.claim_store.heartbeat(set(self.held_claims))
+            except Exception as e:
+                logger.error(f"Error renewing call leases: {e}")
+    
+    async def run_backfill(self, start, end, window_hours=6, reset=False, force=False):
+        """
+        Process historical calls created between start and end.
+        
+        The range is split into windows fetched from Exotel in parallel and fed
+        through the normal pipeline with their own concurrency and rate budget.
+        Completed windows are checkpointed, so re-running the same command
+        resumes where an interrupted run stopped.
+        
+        Calls processed before the dedupe window's oldest generation are
+        forgotten, so a range starting earlier is refused unless force is set
+        (they would be ticketed again).
+        """
+        if not all([self.exotel_api_key, self.exotel_api_token, self.exotel_sid]):
+            logger.error("Exotel API credentials not configured")
+            return False
+        
+        covered_since = self.processed_calls.covered_since
+        if covered_since and self.processed_calls.parse_created(start) < covered_since:
+            covered = datetime.fromtimestamp(covered_since, self.processed_calls.timezone)
+            if not force:
+                logger.error(f"{self.label}Backfill start {start} is before the dedupe window "
+                             f"({covered:%Y-%m-%d %H:%M:%S}); calls processed earlier would get duplicate "
+                             f"tickets. Start later or pass --force")
+                return False
+            logger.warning(f"{self.label}Backfill forced before the dedupe window ({covered:%Y-%m-%d %H:%M:%S}); "
+                           f"calls processed earlier may get duplicate tickets")
+        
+        checkpoint = BackfillCheckpoint(start, end, window_hours, path=tenant_path(self.tenant, 'backfill_checkpoint.json'))
+        if reset:
+            checkpoint.reset()
+        
+        windows = [w for w in split_windows(start, end, window_hours) if not checkpoint.is_done(w)]
+        logger.info(f"Backfill {start} -> {end}: {len(windows)} windows of {window_hours}h to process")
+        
+        window_semaphore = asyncio.Semaphore(int(os.getenv('BACKFILL_PARALLEL_WINDOWS', '4')))
+        call_semaphore = asyncio.Semaphore(int(os.getenv('BACKFILL_MAX_CONCURRENT_CALLS', '2')))
+        
+        async def process_with_limit(call):
+            async with call_semaphore:
+                if self.shutdown_event.is_set():
+                    return False
+                # Recording downloads share the backfill's Exotel budget with its page requests
+                return await self.process_call(call, rate_limiter=self.backfill_rate_limiter)
+        
+        async def run_window(session, window):
             try:
-                await self.run_monitoring_cycle()
+                async with window_semaphore:
+                    if self.shutdown_event.is_set():
+                        return False
+                    calls = await self.fetch_calls_in_window(session, window)
             except Exception as e:
-                logger.error(f"Error in monitoring cycle: {e}")
+                logger.error(f"Backfill window {window[0]} failed to fetch: {e}")
+                return False
+            
+            results = await asyncio.gather(*(process_with_limit(call) for call in calls))
+            processed_count = sum(1 for success in results if success)
+            self.save_processed_calls()
+            logger.info(f"Backfill window {window[0]} -> {window[1]}: {processed_count}/{len(calls)} calls processed")
             
-            # Wait before next cycle
-            await asyncio.sleep(interval_minutes * 60)
+            # Windows with failures stay open; a re-run retries them (successes are deduped)
+            if processed_count == len(calls):
+                checkpoint.mark_done(window, processed_count)
+                return True
+            return False
+        
+        self.install_signal_handlers()
+        self.heartbeat_task = asyncio.create_task(self.heartbeat_claims())
+        try:
+            session = await self.get_session()
+            results = await self.drain(asyncio.gather(*(run_window(session, window) for window in windows)))
+        finally:
+            await self.close()
+        
+        # Interrupted windows are not checkpointed and are resumed by the next run
+        remaining = len(windows) if results is None else results.count(False)
+        if remaining:
+            logger.warning(f"Backfill finished with {remaining} incomplete windows; re-run to retry them")
+        else:
+            logger.info("Backfill complete")
+        return remaining == 0
+    
+    async def run_continuous(self, interval_minutes=None):
+        """Run continuous monitoring with an adaptive poll interval."""
+        poller = AdaptivePoller(base_interval=interval_minutes * 60 if interval_minutes else None)
+        logger.info(f"{self.label}Starting continuous monitoring (polling every {poller.min_interval:.0f}-"
+                    f"{poller.max_interval:.0f}s, starting at {poller.interval:.0f}s)")
+        logger.info(f"{self.label}Configured agents: {list(self.agent_manager.agents.keys())}")
+        if self.shard_count > 1:
+            logger.info(f"Worker {self.claim_store.owner} handling shard {self.shard_index}/{self.shard_count}")
+        
+        self.install_signal_handlers()
+        self.heartbeat_task = asyncio.create_task(self.heartbeat_claims())
+        
+        try:
+            while not self.shutdown_event.is_set():
+                cycle_started = time.monotonic()
+                new_calls, page_full = 0, False
+                try:
+                    new_calls, page_full = await self.drain(self.run_monitoring_cycle()) or (0, False)
+                except Exception as e:
+                    logger.error(f"Error in monitoring cycle: {e}")
+                
+                # Wait before next cycle, counting the time this cycle already took;
+                # a shutdown request ends the wait immediately
+                poller.update(new_calls, page_full)
+                try:
+                    await asyncio.wait_for(self.shutdown_event.wait(), timeout=poller.sleep_seconds(cycle_started))
+                except asyncio.TimeoutError:
+                    pass
+        finally:
+            await self.close()
+    
+    def install_signal_handlers(self):
+        """Turn SIGTERM/SIGINT into a graceful shutdown request."""
+        loop = asyncio.get_running_loop()
+        for sig in (signal.SIGTERM, signal.SIGINT):
+            try:
+                loop.add_signal_handler(sig, self.request_shutdown, sig.name)
+            except (NotImplementedError, RuntimeError):
+                pass  # Not supported on Windows; Ctrl+C still cancels the run and closes below
+    
+    def request_shutdown(self, reason="shutdown requested"):
+        """Stop polling and starting new calls; in-flight calls are drained."""
+        if not self.shutdown_event.is_set():
+            logger.info(f"Received {reason}, finishing in-flight calls (up to {self.drain_seconds:.0f}s)...")
+            self.shutdown_event.set()
+    
+    async def drain(self, work):
+        """
+        Await work (a coroutine or future), allowing it up to SHUTDOWN_DRAIN_SECONDS
+        to finish once shutdown is requested. Returns None if it had to be cancelled.
+        """
+        task = asyncio.ensure_future(work)
+        stop = asyncio.create_task(self.shutdown_event.wait())
+        try:
+            await asyncio.wait({task, stop}, return_when=asyncio.FIRST_COMPLETED)
+        finally:
+            stop.cancel()
+        
+        if not task.done():
+            done, _ = await asyncio.wait({task}, timeout=self.drain_seconds)
+            if not done:
+                logger.warning(f"Drain deadline reached, cancelling {len(self.held_claims)} unfinished calls")
+                task.cancel()
+                await asyncio.gather(task, return_exceptions=True)
+                return None
+        return task.result()
+    
+    async def close(self):
+        """Release leases, stop background workers, flush dedupe state and close HTTP sessions."""
+        if self.heartbeat_task is not None:
+            self.heartbeat_task.cancel()
+            self.heartbeat_task = None
+        for call_id in list(self.held_claims):
+            self.claim_store.release(call_id)
+        self.held_claims.clear()
+        
+        await self.ticket_scheduler.close()
+        await self.analysis_batcher.close()
+        self.save_processed_calls(full=True)
+        self.claim_store.close()
+        self.dead_letters.close()
+        self.transcript_archive.close()
+        
+        await self.zoho_desk.close()
+        if self.session is not None and not self.session.closed:
+            await self.session.close()
+        logger.info(f"{self.label}Shutdown complete")
+
+
+async def run_tenants(tenants):
+    """Monitor every tenant in one process, sharing the connection pool, caches and call slots."""
+    shared = SharedResources()
+    processors = [ZohoCallProcessor(tenant, shared) for tenant in tenants.values()]
+    logger.info(f"Monitoring {len(processors)} tenants: {', '.join(tenants)}")
+    try:
+        await asyncio.gather(*(processor.run_continuous() for processor in processors))
+    finally:
+        await shared.close()
+
+
+def inspect_dead_letters(args, tenant=None):
+    """Print dead letters for the 'list' and 'show' commands (or prune them); returns the exit code."""
+    store = DeadLetterStore(tenant_path(tenant, 'dead_letters.db'))
+    try:
+        if args.action == 'prune':
+            print(f"Pruned {store.prune()} dead letters")
+            return 0
+        if args.action == 'show':
+            entry = store.get(args.sid)
+            if entry is None:
+                print(f"No dead letter for {args.sid}")
+                return 1
+            for key in ('sid', 'status', 'stage', 'error', 'attempts'):
+                print(f"{key:>16}: {entry[key]}")
+            for key in ('first_failed_at', 'last_failed_at', 'next_retry_at'):
+                value = entry[key]
+                print(f"{key:>16}: {datetime.fromtimestamp(value):%Y-%m-%d %H:%M:%S}" if value else f"{key:>16}: -")
+            print(json.dumps(entry['call'], indent=2))
+            return 0
+        
+        entries = store.list(status=args.status, stage=args.stage)
+        for entry in entries:
+            print(f"{entry['sid']:<36} {entry['status']:<9} {entry['stage']:<11} {entry['attempts']:>3}  "
+                  f"{datetime.fromtimestamp(entry['last_failed_at']):%Y-%m-%d %H:%M}  {entry['error'][:60]}")
+        print(f"{len(entries)} dead letters")
+        return 0
+    finally:
+        store.close()
+
+
+def query_transcripts(args, tenant=None):
+    """Run the 'transcripts' commands against the local archive; returns the exit code."""
+    archive = TranscriptArchive(tenant_path(tenant, 'transcripts.db'))
+    if not archive.enabled:
+        print("Transcript archive is disabled (TRANSCRIPT_ARCHIVE_ENABLED=false)")
+        return 1
+    try:
+        if args.action == 'prune':
+            print(f"Pruned {archive.prune()} archived calls")
+            return 0
+        
+        if args.action == 'show':
+            record = archive.get(args.sid)
+            if record is None:
+                print(f"No archived transcript for {args.sid}")
+                return 1
+            for key, value in record.items():
+                if key != 'transcript':
+                    print(f"{key:>16}: {value}")
+            print()
+            print(record['transcript'])
+            return 0
+        
+        try:
+            results = archive.search(args.query, since=args.since, until=args.until,
+                                     agent=args.agent, mood=args.mood, limit=args.limit)
+        except ValueError as e:
+            print(e)
+            return 1
+        for record in results:
+            print(f"{record['sid']}  {record['call_time']}  {record['agent_name']}  {record['mood']}  {record['concern']}")
+            print(f"    {record['excerpt']}")
+        print(f"{len(results)} matching calls")
+        return 0
+    finally:
+        archive.close()
 
 
 def main():
     """Main entry point."""
+    parser = argparse.ArgumentParser(description="Zoho Desk Call Ticket Processor")
+    parser.add_argument('--tenants-file', default=os.getenv('TENANTS_FILE'),
+                        help='Tenant registry (JSON); enables multi-tenant mode')
+    parser.add_argument('--tenant', help='Run a command (or monitoring) for this tenant only')
+    subparsers = parser.add_subparsers(dest='command')
+    
+    backfill_parser = subparsers.add_parser('backfill', help='Process historical calls in a date range')
+    backfill_parser.add_argument('--start', required=True, help="Start date ('YYYY-MM-DD' or 'YYYY-MM-DD HH:MM:SS')")
+    backfill_parser.add_argument('--end', required=True, help="End date, inclusive when given as 'YYYY-MM-DD'")
+    backfill_parser.add_argument('--window-hours', type=positive_hours, default=float(os.getenv('BACKFILL_WINDOW_HOURS', '6')),
+                                 help='Size of each Exotel fetch window (default: 6)')
+    backfill_parser.add_argument('--reset', action='store_true', help='Ignore the checkpoint and start over')
+    backfill_parser.add_argument('--force', action='store_true',
+                                 help='Run even if --start is older than the dedupe window remembers')
+    
+    dead_letter_parser = subparsers.add_parser('dead-letters', help='List, inspect or replay failed calls')
+    dead_letter_actions = dead_letter_parser.add_subparsers(dest='action', required=True)
+    list_parser = dead_letter_actions.add_parser('list', help='List failed calls')
+    show_parser = dead_letter_actions.add_parser('show', help='Show one failed call in full')
+    show_parser.add_argument('sid', help='Exotel call Sid')
+    replay_parser = dead_letter_actions.add_parser('replay', help='Run failed calls through the pipeline again')
+    replay_parser.add_argument('sids', nargs='*', help='Call Sids to replay (default: all matching the filters)')
+    dead_letter_actions.add_parser('prune', help='Apply the retention limit now')
+    for action_parser in (list_parser, replay_parser):
+        action_parser.add_argument('--status', choices=['retrying', 'dead'], help='Only calls with this status')
+        action_parser.add_argument('--stage', help="Only calls that failed at this stage (e.g. 'download', 'ticket')")
+    
+    transcripts_parser = subparsers.add_parser('transcripts', help='Search the local transcript archive')
+    transcript_actions = transcripts_parser.add_subparsers(dest='action', required=True)
+    search_parser = transcript_actions.add_parser('search', help='Full-text search (FTS5 syntax)')
+    search_parser.add_argument('query', help="e.g. 'refund', 'refund OR return', '\"wrong address\"'")
+    search_parser.add_argument('--since', help="Calls at or after this time ('YYYY-MM-DD[ HH:MM:SS]')")
+    search_parser.add_argument('--until', help="Calls before this time ('YYYY-MM-DD[ HH:MM:SS]')")
+    search_parser.add_argument('--agent', help='Only calls handled by this agent name')
+    search_parser.add_argument('--mood', help='Only calls with this mood')
+    search_parser.add_argument('--limit', type=int, default=20, help='Maximum results (default: 20)')
+    transcript_show_parser = transcript_actions.add_parser('show', help='Print one archived call in full')
+    transcript_show_parser.add_argument('sid', help='Exotel call Sid')
+    transcript_actions.add_parser('prune', help='Apply the retention limits now')
+    
+    args = parser.parse_args()
+    
+    if args.command == 'backfill':
+        try:
+            args.start = parse_backfill_time(args.start)
+            args.end = parse_backfill_time(args.end, end_of_day=True)
+        except ValueError:
+            parser.error("--start/--end must be 'YYYY-MM-DD' or 'YYYY-MM-DD HH:MM:SS'")
+        if args.start >= args.end:
+            parser.error("--start must be before --end")
+        if args.window_hours <= 0:
+            parser.error("--window-hours must be greater than 0")  # BACKFILL_WINDOW_HOURS default
+    
+    tenant = None
+    if args.tenants_file or args.tenant:
+        try:
+            tenants = load_tenants(args.tenants_file)
+        except (OSError, ValueError) as e:
+            logger.error(f"Cannot load tenants: {e}")
+            sys.exit(1)
+        if args.tenant:
+            tenant = tenants.get(args.tenant)
+            if tenant is None:
+                logger.error(f"Unknown or disabled tenant '{args.tenant}' (known: {', '.join(tenants) or 'none'})")
+                sys.exit(1)
+        elif args.command:
+            logger.error(f"'{args.command}' needs --tenant in multi-tenant mode")
+            sys.exit(1)
+        else:
+            logger.info("=" * 60)
+            logger.info("Zoho Desk Call Ticket Processor Starting (multi-tenant)...")
+            logger.info("=" * 60)
+            try:
+                asyncio.run(run_tenants(tenants))
+            except KeyboardInterrupt:
+                logger.info("\nShutting down gracefully...")
+            except Exception as e:
+                logger.error(f"Fatal error: {e}")
+            return
+    
+    if args.command == 'dead-letters' and args.action != 'replay':
+        sys.exit(inspect_dead_letters(args, tenant))
+    if args.command == 'transcripts':
+        sys.exit(query_transcripts(args, tenant))
+    
     logger.info("=" * 60)
     logger.info("Zoho Desk Call Ticket Processor Starting...")
     logger.info("=" * 60)
     
-    processor = ZohoCallProcessor()
+    processor = ZohoCallProcessor(tenant)
     
     try:
-        asyncio.run(processor.run_continuous(interval_minutes=1))
+        if args.command == 'backfill':
+            success = asyncio.run(processor.run_backfill(args.start, args.end, args.window_hours,
+                                                         reset=args.reset, force=args.force))
+            sys.exit(0 if success else 1)
+        
+        if args.command == 'dead-letters':
+            if args.sids:
+                entries = [processor.dead_letters.get(sid) for sid in args.sids]
+                missing = [sid for sid, entry in zip(args.sids, entries) if entry is None]
+                if missing:
+                    logger.error(f"Not in the dead-letter store: {', '.join(missing)}")
+                    sys.exit(1)
+            else:
+                entries = processor.dead_letters.list(status=args.status, stage=args.stage)
+            success = asyncio.run(processor.replay_dead_letters([entry['call'] for entry in entries]))
+            sys.exit(0 if success else 1)
+        
+        asyncio.run(processor.run_continuous())
     except KeyboardInterrupt:
         logger.info("\nShutting down gracefully...")
     except Exception as e: